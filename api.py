@@ -1,8 +1,384 @@
 # api.py
-from fastapi import FastAPI
+from dotenv import load_dotenv
+
+load_dotenv()  # before the utils read their settings from the environment
+
+from contextlib import asynccontextmanager
+from enum import Enum
+from functools import lru_cache
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, Field
+
+from gics_search_utils import search_gics_hierarchy
+from naics_search_utils import search_naics_hierarchy
+from utils.hierarchy_snapshot import SnapshotCache, build_gics_snapshot, build_naics_snapshot
+from utils.db import GICS_DB_PATH, NAICS_DB_PATH, get_engine
+from utils.batch_classifier import BatchClassifier
+from utils.code_index import get_code_index
+from utils.crosswalk import lookup_crosswalk, reverse_crosswalk
+from utils.hierarchy_tables import MAX_DEPTH, fetch_ancestors, fetch_subtree
+from utils.naics_releases import changes_between, get_release_snapshot, list_releases
+from utils.snapshot_file import mapped_or_built, mapped_stats
+from utils.taxonomy_stats import compute_stats, read_stats
+from utils.profiling import METRIC_PREFIX, METRICS, start_profile
+from utils.ranking import paginate
+from utils.search_results import SEARCH_CACHE
+from utils.warmup import start_warmup, warm_snapshot
+
+@asynccontextmanager
+async def lifespan(_app):
+    # Snapshots, search indexes and rapidfuzz load in the background; requests don't wait on it
+    start_warmup(lambda: [store.get() for _, store, _ in STORES.values()])
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+CACHE_CONTROL = "public, max-age=300, stale-while-revalidate=60"
+
+
+class Taxonomy(str, Enum):
+    naics = "naics"
+    gics = "gics"
+
+
+# (database path, snapshot cache, search function) per taxonomy. A swapped-in database is
+# reloaded in the background (indexes included) while requests keep using the current snapshot.
+STORES = {
+    Taxonomy.naics: (NAICS_DB_PATH, SnapshotCache(NAICS_DB_PATH, mapped_or_built("naics", NAICS_DB_PATH, build_naics_snapshot),
+                                                  prepare=warm_snapshot),
+                     search_naics_hierarchy),
+    Taxonomy.gics: (GICS_DB_PATH, SnapshotCache(GICS_DB_PATH, mapped_or_built("gics", GICS_DB_PATH, build_gics_snapshot),
+                                                prepare=warm_snapshot),
+                    search_gics_hierarchy),
+}
+
+
+def _cached_json(request: Request, taxonomy: Taxonomy, version: str, payload) -> Response:
+    """Attach an ETag derived from the data version and answer If-None-Match with 304."""
+    etag = f'"{taxonomy.value}-{version}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload, headers=headers)
+
+
+def _node_json(snapshot, node: int) -> dict:
+    return {
+        "code": snapshot.codes[node],
+        "name": snapshot.names[node],
+        "level": snapshot.level_names[snapshot.levels[node]],
+    }
+
+
+def _subtree_json(snapshot, node: int, depth: Optional[int]) -> dict:
+    data = _node_json(snapshot, node)
+    if depth is None or depth > 0:
+        next_depth = None if depth is None else depth - 1
+        data["children"] = [_subtree_json(snapshot, int(child), next_depth) for child in snapshot.children(node)]
+    return data
+
+
+def _row_json(snapshot, row) -> dict:
+    return {"code": row.key, "name": row.name, "level": snapshot.level_names[row.level]}
+
+
+def _closure_rows(store, snapshot, fetch, node: int, *args) -> list:
+    """
+    One closure-table statement (fetch_subtree / fetch_ancestors) for ``node``, read from the
+    database file the snapshot was built from. Empty mid-swap, when that file is already gone.
+    """
+    engine = store.engine_for(snapshot)
+    if engine is None:
+        return []
+    with engine.connect() as conn:
+        return fetch(conn, int(snapshot.levels[node]), snapshot.codes[node], *args)
+
+
+def _subtree_payload(store, snapshot, node: int, depth: Optional[int]) -> dict:
+    rows = _closure_rows(store, snapshot, fetch_subtree, node, MAX_DEPTH if depth is None else depth)
+    if not rows:
+        return _subtree_json(snapshot, node, depth)
+    # Rows come in pre-order with parent ids, so every parent is placed before its children
+    placed = {}
+    for row in rows:
+        data = placed[row.node_id] = _row_json(snapshot, row)
+        if depth is None or row.depth < depth:
+            data["children"] = []
+        if row.depth > 0:
+            placed[row.parent_id]["children"].append(data)
+    return placed[rows[0].node_id]
+
+
+def _ancestors_payload(store, snapshot, node: int) -> List[dict]:
+    rows = _closure_rows(store, snapshot, fetch_ancestors, node)
+    if not rows and snapshot.parents[node] >= 0:
+        return [_node_json(snapshot, a) for a in snapshot.ancestors(node)]
+    return [_row_json(snapshot, row) for row in rows]
+
+
+def _find(snapshot, code: str, level: Optional[str]) -> int:
+    level_index = None
+    if level is not None:
+        if level not in snapshot.level_names:
+            raise HTTPException(status_code=400, detail=f"Unknown level '{level}'")
+        level_index = snapshot.level_names.index(level)
+    if snapshot.taxonomy == "naics" and level_index is None:
+        node = get_code_index(snapshot).find(code)  # also resolves "32" to the 31-33 sector
+    else:
+        node = snapshot.find(code, level_index)
+    if node is None:
+        raise HTTPException(status_code=404, detail=f"Code '{code}' not found")
+    return node
+
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Per-request profile; SQL counts and total time go out as response headers and metrics."""
+    profile = start_profile(request.url.path)
+    response = await call_next(request)
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    METRICS.inc(f"{METRIC_PREFIX}_requests_total", route=route, status=str(response.status_code))
+    METRICS.observe(f"{METRIC_PREFIX}_request_seconds", profile.elapsed_ms / 1000, route=route)
+    response.headers["Server-Timing"] = f"app;dur={profile.elapsed_ms:.2f}, sql;dur={profile.sql_ms:.2f}"
+    response.headers["X-SQL-Queries"] = str(profile.queries)
+    response.headers["X-SQL-Rows"] = str(profile.rows)
+    return response
 
-app = FastAPI()
 
 @app.get("/")
 def ping():
-    return {"message": "pong from FastAPI"}
\ No newline at end of file
+    return {"message": "pong from FastAPI"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of request, span and SQL counters."""
+    return METRICS.render({
+        f"{METRIC_PREFIX}_search_cache_hits": SEARCH_CACHE.hits,
+        f"{METRIC_PREFIX}_search_cache_misses": SEARCH_CACHE.misses,
+        f"{METRIC_PREFIX}_search_cache_entries": len(SEARCH_CACHE),
+    })
+
+
+@app.get("/{taxonomy}/sectors")
+async def list_sectors(taxonomy: Taxonomy, request: Request):
+    _, store, _ = STORES[taxonomy]
+    snapshot = store.get()
+    payload = [_node_json(snapshot, int(node)) for node in snapshot.roots]
+    return _cached_json(request, taxonomy, snapshot.version, payload)
+
+
+@lru_cache(maxsize=4)
+def _stats(taxonomy: Taxonomy, snapshot) -> dict:
+    path, _, _ = STORES[taxonomy]
+    return mapped_stats(taxonomy.value, path) or read_stats(get_engine(path)) or compute_stats(snapshot)
+
+
+@app.get("/{taxonomy}/stats")
+async def stats(taxonomy: Taxonomy, request: Request):
+    _, store, _ = STORES[taxonomy]
+    snapshot = store.get()
+    # A cache miss reads the snapshot file or the stats table, so keep it off the event loop
+    payload = await run_in_threadpool(_stats, taxonomy, snapshot)
+    return _cached_json(request, taxonomy, snapshot.version, payload)
+
+
+def _release_snapshot(taxonomy: Taxonomy, release: str):
+    if taxonomy != Taxonomy.naics:
+        raise HTTPException(status_code=400, detail="Only NAICS has releases")
+    try:
+        return get_release_snapshot(NAICS_DB_PATH, release)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"NAICS release '{release}' is not loaded")
+
+
+@app.get("/{taxonomy}/search")
+async def search(taxonomy: Taxonomy, request: Request, q: str = Query(..., min_length=1),
+                 limit: int = Query(50, ge=1, le=500), cursor: Optional[str] = None, release: Optional[str] = None):
+    """Ranked matches, best first, one page at a time; pass ``next_cursor`` back as ``cursor`` for the next page."""
+    _, store, search_fn = STORES[taxonomy]
+    if release:
+        # The FTS index covers the current release only; pinned searches scan the pinned snapshot
+        snapshot = await run_in_threadpool(_release_snapshot, taxonomy, release)
+        result = await run_in_threadpool(search_fn, snapshot, q)
+    else:
+        snapshot = store.get()
+        # Cache misses touch SQLite, so keep searches off the event loop. Mid-swap the file is
+        # already newer than the snapshot, so its FTS rows would not line up: scan instead.
+        result = await run_in_threadpool(search_fn, snapshot, q, store.engine_for(snapshot))
+    try:
+        page = paginate(result, snapshot.version, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _cached_json(request, taxonomy, snapshot.version, _search_json(snapshot, q, result, page))
+
+
+def _search_json(snapshot, q: str, result, page) -> dict:
+    return {
+        "query": q,
+        "suggestion": result.suggestion,
+        "total": page.total,
+        "next_cursor": page.next_cursor,
+        "sectors": [_node_json(snapshot, node) for node in result.sectors],
+        "matches": [
+            {
+                **_node_json(snapshot, match.node),
+                "score": match.score,
+                "spans": match.spans,
+                "ancestors": [_node_json(snapshot, a) for a in snapshot.ancestors(match.node)],
+            }
+            for match in page.matches
+        ],
+    }
+
+
+def _read_naics(read, *args):
+    """Run ``read(conn, *args)`` on a NAICS read connection (call it through run_in_threadpool)."""
+    with get_engine(NAICS_DB_PATH).connect() as conn:
+        return read(conn, *args)
+
+
+@app.get("/naics/releases")
+async def naics_releases(request: Request):
+    snapshot = STORES[Taxonomy.naics][1].get()
+    releases = await run_in_threadpool(_read_naics, list_releases)
+    return _cached_json(request, Taxonomy.naics, snapshot.version, releases)
+
+
+@app.get("/naics/changes")
+async def naics_changes(request: Request, to_release: str, from_release: str = "", sector: Optional[str] = None):
+    """What changed between two releases (optionally under one sector); no from_release = Census indicators."""
+    snapshot = STORES[Taxonomy.naics][1].get()
+    changes = await run_in_threadpool(_read_naics, changes_between, from_release, to_release, sector)
+    payload = {
+        "from_release": from_release or None,
+        "to_release": to_release,
+        "sector": sector,
+        "changes": [change._asdict() for change in changes],
+    }
+    return _cached_json(request, Taxonomy.naics, snapshot.version, payload)
+
+
+@app.get("/naics/prefix/{prefix}")
+async def naics_prefix(prefix: str, request: Request, limit: int = Query(1000, ge=1, le=10_000),
+                       offset: int = Query(0, ge=0)):
+    """Every NAICS code starting with ``prefix`` ("3111" → its industries and national industries)."""
+    snapshot = STORES[Taxonomy.naics][1].get()
+    nodes = get_code_index(snapshot).prefix_range(prefix)
+    payload = {
+        "prefix": prefix,
+        "total": len(nodes),
+        "codes": [_node_json(snapshot, int(node)) for node in nodes[offset:offset + limit]],
+    }
+    return _cached_json(request, Taxonomy.naics, snapshot.version, payload)
+
+
+class ValidateRequest(BaseModel):
+    codes: List[str] = Field(..., max_length=1_000_000)
+    ancestors: bool = False
+
+
+@app.post("/naics/codes/validate")
+async def validate_naics_codes(body: ValidateRequest):
+    """Bulk existence check without touching the database; optionally returns ancestor chains."""
+    snapshot = STORES[Taxonomy.naics][1].get()
+    index = get_code_index(snapshot)
+    nodes = await run_in_threadpool(index.find_many, body.codes)
+    missing = nodes < 0
+    payload = {
+        "total": len(body.codes),
+        "valid": int(len(nodes) - missing.sum()),
+        "invalid": sorted({code for code, bad in zip(body.codes, missing) if bad}),
+    }
+    if body.ancestors:
+        payload["ancestors"] = {
+            snapshot.codes[node]: [snapshot.codes[a] for a in snapshot.ancestors(node)]
+            for node in {int(n) for n in nodes[~missing]}
+        }
+    return payload
+
+
+@app.get("/{taxonomy}/codes/{code}")
+async def lookup_code(taxonomy: Taxonomy, code: str, request: Request, level: Optional[str] = None):
+    _, store, _ = STORES[taxonomy]
+    snapshot = store.get()
+    node = _find(snapshot, code, level)
+    payload = {
+        **_node_json(snapshot, node),
+        "ancestors": await run_in_threadpool(_ancestors_payload, store, snapshot, node),
+        "children": [_node_json(snapshot, int(child)) for child in snapshot.children(node)],
+    }
+    return _cached_json(request, taxonomy, snapshot.version, payload)
+
+
+@app.get("/{taxonomy}/codes/{code}/subtree")
+async def subtree(taxonomy: Taxonomy, code: str, request: Request, level: Optional[str] = None,
+                  depth: Optional[int] = Query(None, ge=0)):
+    _, store, _ = STORES[taxonomy]
+    snapshot = store.get()
+    node = _find(snapshot, code, level)
+    payload = await run_in_threadpool(_subtree_payload, store, snapshot, node, depth)
+    return _cached_json(request, taxonomy, snapshot.version, payload)
+
+
+def _gics_path(gics_snapshot, gics_id: int) -> List[str]:
+    node = gics_snapshot.find(str(gics_id), len(gics_snapshot.level_names) - 1)
+    if node is None:
+        return []
+    return [gics_snapshot.names[a] for a in gics_snapshot.ancestors(node)]
+
+
+@app.get("/crosswalk/naics/{code}")
+async def crosswalk_naics(code: str, request: Request):
+    """Precomputed GICS sub-industries for a NAICS code, best first."""
+    naics_snapshot = STORES[Taxonomy.naics][1].get()
+    gics_snapshot = STORES[Taxonomy.gics][1].get()
+    node = _find(naics_snapshot, code, None)
+    matches = await run_in_threadpool(_read_naics, lookup_crosswalk, naics_snapshot.codes[node])
+    payload = {
+        **_node_json(naics_snapshot, node),
+        "matches": [{**m._asdict(), "gics_path": _gics_path(gics_snapshot, m.gics_id)} for m in matches],
+    }
+    return _cached_json(request, Taxonomy.naics, naics_snapshot.version, payload)
+
+
+@app.get("/crosswalk/gics/{sub_industry_id}")
+async def crosswalk_gics(sub_industry_id: int, request: Request, limit: int = Query(20, ge=1, le=500)):
+    """NAICS codes that list this GICS sub-industry among their top matches."""
+    naics_snapshot = STORES[Taxonomy.naics][1].get()
+    matches = await run_in_threadpool(_read_naics, reverse_crosswalk, sub_industry_id, limit)
+    nodes = [(naics_snapshot.find(m.naics_code), m) for m in matches]
+    payload = [
+        {**_node_json(naics_snapshot, node), "rank": m.rank, "score": m.score}
+        for node, m in nodes if node is not None
+    ]
+    return _cached_json(request, Taxonomy.naics, naics_snapshot.version, payload)
+
+
+class ClassifyRequest(BaseModel):
+    descriptions: List[str] = Field(..., max_length=10_000)
+    top_k: int = Field(5, ge=1, le=50)
+
+
+@lru_cache(maxsize=1)
+def _classifier(naics_snapshot, gics_snapshot) -> BatchClassifier:
+    # Keyed on the snapshot objects, so a data reload builds a fresh corpus
+    return BatchClassifier(naics_snapshot, gics_snapshot)
+
+
+@app.post("/classify")
+async def classify(body: ClassifyRequest):
+    classifier = _classifier(STORES[Taxonomy.naics][1].get(), STORES[Taxonomy.gics][1].get())
+    results = await run_in_threadpool(classifier.classify, body.descriptions, body.top_k)
+    return [
+        {
+            "description": description,
+            **{taxonomy: [candidate._asdict() for candidate in candidates] for taxonomy, candidates in result.items()},
+        }
+        for description, result in zip(body.descriptions, results)
+    ]
@@ -1,55 +1,184 @@
 import os
-import requests
+from dotenv import load_dotenv
+
+load_dotenv()  # before the utils read their settings from the environment
+
 import streamlit as st
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from streamlit_agraph import agraph, Node, Edge, Config
-from models.models import Sector as GICSSector, IndustryGroup as GICSGroup, Industry as GICSIndustry, SubIndustry as GICSSub
-from models.naics_models import Sector, IndustryGroup, Industry, SubIndustry  # NAICS models
-from gics_search_utils import search_gics_hierarchy
 from naics_search_utils import search_naics_hierarchy
 from utils.html_naics_view import generate_naics_html
+from utils.html_hits_view import generate_hits_html
+from utils.hierarchy_snapshot import SnapshotCache, build_naics_snapshot, build_gics_snapshot
+from utils.db import NAICS_DB_PATH, GICS_DB_PATH, get_engine
+from utils.ranking import DEFAULT_PAGE_SIZE, paginate
+from utils.search_box import search_box
+from utils.tree_filter import tree_filter, tree_payload
+from utils.tree_graph import LAYOUTS, build_tree_graph
+from utils.taxonomy_stats import compute_stats, read_stats
+from utils.profiling import span, start_profile
+from utils.snapshot_file import mapped_or_built, mapped_stats
+from utils.checkout import submit_checkout
+from utils.warmup import start_warmup, warm_snapshot
 
 # --- Page Setup ---
 st.set_page_config(page_title="NAICS Hierarchy Explorer", page_icon="📊", layout="wide")
 
+# --- Profiling (spans and SQL counters for this rerun; panel via ?debug=1 or APP_DEBUG=1) ---
+profile = start_profile("rerun")
+show_debug_panel = st.query_params.get("debug") == "1" or os.getenv("APP_DEBUG") == "1"
+
 # --- Buy Me a Coffee ---
+# The checkout call runs on a worker thread (pooled session, timeouts, retries, circuit
+# breaker); this fragment polls its Future without blocking the rest of the page.
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
-API_URL = "https://oqviryuptkdwbcbwkyxc.supabase.co/functions/v1/create-checkout-session"
 
-if st.button("☕ Buy Me a Coffee ($5)"):
-    if not SUPABASE_ANON_KEY:
-        st.error("❌ SUPABASE_ANON_KEY not set in environment variables.")
+def show_checkout_result(result):
+    if result.url:
+        st.markdown(f"""
+            <a href="{result.url}" target="_blank">
+                <button style='padding:0.5rem 1rem; font-size:1rem; background:#635bff; color:white; border:none; border-radius:6px; cursor:pointer;'>
+                    👉 Continue to Stripe Checkout
+                </button>
+            </a>
+        """, unsafe_allow_html=True)
     else:
-        try:
-            response = requests.post(
-                API_URL,
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
-                },
-                json={"items": [{"name": "Coffee", "price": 500, "quantity": 1}]}
-            )
-            checkout_url = response.json().get("url")
-            if checkout_url:
-                st.markdown(f"""
-                    <a href="{checkout_url}" target="_blank">
-                        <button style='padding:0.5rem 1rem; font-size:1rem; background:#635bff; color:white; border:none; border-radius:6px; cursor:pointer;'>
-                            👉 Continue to Stripe Checkout
-                        </button>
-                    </a>
-                """, unsafe_allow_html=True)
-            else:
-                st.error("❌ No checkout URL returned.")
-        except Exception as e:
-            st.error(f"❌ Could not reach checkout function: {e}")
-
-# --- Database Connections ---
-naics_engine = create_engine(f"sqlite:///{os.path.abspath('naics.db')}")
-naics_session = sessionmaker(bind=naics_engine)()
-
-gics_engine = create_engine(f"sqlite:///{os.path.abspath('gics.db')}")
-gics_session = sessionmaker(bind=gics_engine)()
+        st.error(f"❌ {result.error}")
+
+def buy_me_a_coffee():
+    future = st.session_state.get("checkout_future")
+    pending = future is not None and not future.done()
+    if st.button("☕ Buy Me a Coffee ($5)", disabled=pending):
+        if not SUPABASE_ANON_KEY:
+            st.error("❌ SUPABASE_ANON_KEY not set in environment variables.")
+            return
+        st.session_state.pop("checkout_result", None)
+        st.session_state["checkout_future"] = submit_checkout(SUPABASE_ANON_KEY)
+        st.rerun()  # a full rerun registers the fragment with polling on
+    if pending:
+        st.info("⏳ Creating your checkout session…")
+        return
+    if future is not None:
+        # Done: keep just the result for display and let the Future go
+        st.session_state["checkout_result"] = future.result()
+        del st.session_state["checkout_future"]
+        if st.session_state.get("checkout_polling"):
+            st.rerun()  # one full rerun turns polling off again
+    result = st.session_state.get("checkout_result")
+    if result is not None:
+        show_checkout_result(result)
+
+# Poll once a second (fragment-only reruns) while a checkout call is in flight
+checkout_future = st.session_state.get("checkout_future")
+st.session_state["checkout_polling"] = checkout_future is not None and not checkout_future.done()
+st.fragment(buy_me_a_coffee, run_every=1.0 if st.session_state["checkout_polling"] else None)()
+
+# --- Databases (not committed; a fresh checkout builds them from the CSVs once per process) ---
+@st.cache_resource(show_spinner="Building the taxonomy databases…")
+def ensure_databases():
+    import subprocess, sys
+    # GICS first, so the NAICS load can build the crosswalk against it
+    for script, path in (("init_db.py", GICS_DB_PATH), ("load_naics.py", NAICS_DB_PATH)):
+        if not os.path.exists(path):
+            subprocess.run([sys.executable, script, "--database-url", f"sqlite:///{path}"],
+                           cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+
+ensure_databases()
+
+# --- Hierarchy Snapshots (mapped from the loaders' snapshot file when it matches, else built from SQLite) ---
+# One cache per process. When a loader swaps in a new database, reruns keep the current
+# snapshot while the new one (search indexes included) builds in the background.
+@st.cache_resource(show_spinner=False)
+def snapshot_caches():
+    return (
+        SnapshotCache(NAICS_DB_PATH, mapped_or_built("naics", NAICS_DB_PATH, build_naics_snapshot), prepare=warm_snapshot),
+        SnapshotCache(GICS_DB_PATH, mapped_or_built("gics", GICS_DB_PATH, build_gics_snapshot), prepare=warm_snapshot),
+    )
+
+naics_cache, gics_cache = snapshot_caches()
+with span("load_snapshots"):
+    naics_snapshot = naics_cache.get()
+    gics_snapshot = gics_cache.get()
+
+data_versions = (naics_snapshot.version, gics_snapshot.version)
+if st.session_state.get("data_versions", data_versions) != data_versions:
+    st.toast("🔁 Taxonomy data was refreshed.")
+st.session_state["data_versions"] = data_versions
+
+# --- Warm-up (once per process: search indexes and rapidfuzz load on a background thread) ---
+@st.cache_resource(show_spinner=False)
+def warm_up(_snapshots):
+    return start_warmup(lambda: _snapshots)
+
+warm_up((naics_snapshot, gics_snapshot))
+
+# --- Taxonomy Stats (materialized by the loaders; computed from the snapshot for older databases) ---
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_naics_stats(version, _snapshot):
+    return mapped_stats("naics", NAICS_DB_PATH) or read_stats(get_engine(NAICS_DB_PATH)) or compute_stats(_snapshot)
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_gics_stats(version, _snapshot):
+    return mapped_stats("gics", GICS_DB_PATH) or read_stats(get_engine(GICS_DB_PATH)) or compute_stats(_snapshot)
+
+def show_sector_breakdown(stats):
+    with st.expander("Per-sector breakdown"):
+        st.dataframe(
+            [{"Sector": sector["name"], **sector["counts"]} for sector in stats["sectors"]],
+            hide_index=True,
+        )
+        st.caption("Average children per node: " + ", ".join(
+            f"{level} {fan['mean']}" for level, fan in stats["fan_out"].items()
+        ))
+
+# --- GICS Tree Graph (nodes, edges and every layout built once per data version) ---
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_gics_graph(version, _snapshot):
+    from streamlit_agraph import Edge, Node
+
+    graph = build_tree_graph(_snapshot)
+    edges = [Edge(source=source, target=target, type="CURVE_SMOOTH") for source, target in graph.edges]
+    nodes_by_layout = {}
+    for layout, positions in graph.positions.items():
+        nodes_by_layout[layout] = [
+            Node(id=n["id"], label=n["label"], title=n["label"], size=n["size"], color=n["color"],
+                 x=positions[n["id"]][0], y=positions[n["id"]][1])
+            for n in graph.nodes
+        ]
+    return nodes_by_layout, edges
+
+# --- Tree Payloads for the in-browser filter (serialized once per data version) ---
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_naics_tree_payload(version, _snapshot):
+    return tree_payload(_snapshot)
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_gics_tree_payload(version, _snapshot):
+    return tree_payload(_snapshot, with_code=False)
+
+NAICS_AUTO_EXPAND = 3  # expand automatically when a selection yields this few sectors
+
+# --- Ranked Search Hits (one page per rerun; cursors of the pages seen so far kept per query) ---
+def show_ranked_hits(snapshot, result, key, query, with_code=True):
+    view = (snapshot.version, query)
+    if st.session_state.get(f"{key}_hits_view") != view:
+        st.session_state[f"{key}_hits_view"] = view
+        st.session_state[f"{key}_cursors"] = [None]
+    cursors = st.session_state[f"{key}_cursors"]
+    page = paginate(result, snapshot.version, DEFAULT_PAGE_SIZE, cursors[-1])
+    if not page.total:
+        st.info("No matches.")
+        return
+
+    pages = -(-page.total // DEFAULT_PAGE_SIZE)
+    st.caption(f"{page.total} matches, best first · page {len(cursors)} of {pages}")
+    st.markdown(generate_hits_html(snapshot, page.matches, with_code), unsafe_allow_html=True)
+
+    prev_col, next_col = st.columns(2)
+    if prev_col.button("◀ Previous", key=f"{key}_prev_page", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if next_col.button("Next ▶", key=f"{key}_next_page", disabled=page.next_cursor is None):
+        cursors.append(page.next_cursor)
+        st.rerun()
 
 # --- Title ---
 st.title("📊 NAICS Hierarchy Explorer")
@@ -69,21 +198,24 @@ st.header("📂 NAICS Hierarchical View & Data Statistics")
 col1, col2 = st.columns([3, 1])
 
 with col1:
-    # Initial search input
-    search_query_naics = st.text_input(
+    # Search as you type (debounced in the browser); a new generation replaces the text
+    search_query_naics = search_box(
         "🔍 Search NAICS by keyword (e.g., 'rice')",
         value=st.session_state.get("naics_query", ""),
-        key="naics_input"
-    ).strip()
+        key=f"naics_input_{st.session_state.get('naics_input_generation', 0)}",
+    )
 
-    # Run search
-    sectors_to_display, suggestion = search_naics_hierarchy(naics_session, search_query_naics)
+    # Run search (refinements narrow the previous keystroke's candidates)
+    with span("naics.search"):
+        naics_result = search_naics_hierarchy(naics_snapshot, search_query_naics, incremental=True)
+    suggestion = naics_result.suggestion
 
     # Show suggestion if fuzzy matched
     if suggestion and suggestion.lower() != search_query_naics.lower():
         # Create a unique key for the suggestion button
         if st.button(f"🔁 Did you mean: {suggestion}", key="suggestion_button"):
             st.session_state["naics_query"] = suggestion
+            st.session_state["naics_input_generation"] = st.session_state.get("naics_input_generation", 0) + 1
             st.rerun()
 
         # Inject yellow styling for the Streamlit button via CSS
@@ -101,31 +233,49 @@ with col1:
             st.session_state["naics_query"] = st.session_state["corrected"]
             st.rerun()
             
-    # Fallback to full list if no input
-    if not search_query_naics:
-        sectors = naics_session.query(Sector).all()
-        selected_sector = st.selectbox("Select Sector", ["All"] + [s.name for s in sectors], index=0)
+    if search_query_naics:
+        # Ranked hits with their ancestor path, one page at a time, instead of whole sectors
+        with span("naics.render"):
+            show_ranked_hits(naics_snapshot, naics_result, "naics", search_query_naics)
+    else:
+        # Fallback to full list if no input
+        sectors = list(naics_snapshot.roots)
+        selected_sector = st.selectbox("Select Sector", ["All"] + [naics_snapshot.names[s] for s in sectors], index=0)
+        naics_view = f"sector:{selected_sector}"
         if selected_sector == "All":
             sectors_to_display = sectors
         else:
-            sectors_to_display = [s for s in sectors if s.name == selected_sector]
-
-    html = generate_naics_html(sectors_to_display, search_query_naics)
-    st.markdown(html, unsafe_allow_html=True)
+            sectors_to_display = [s for s in sectors if naics_snapshot.names[s] == selected_sector]
 
-with col2:
-    st.header("📊 NAICS Data Stats")
-    st.metric("Total Sectors", naics_session.query(Sector).count())
-    st.metric("Total Industry Groups", naics_session.query(IndustryGroup).count())
-    st.metric("Total Industries", naics_session.query(Industry).count())
-    st.metric("Total Sub-Industries", naics_session.query(SubIndustry).count())
+        # Only expanded sectors have their subtree rendered; the rest are one-line placeholders
+        sectors_to_display = [int(s) for s in sectors_to_display]
+        if len(sectors_to_display) <= NAICS_AUTO_EXPAND:
+            default_expanded = sectors_to_display
+        else:
+            default_expanded = []
+        expanded_sectors = st.multiselect(
+            "📂 Expand sectors",
+            options=sectors_to_display,
+            default=default_expanded,
+            format_func=lambda s: naics_snapshot.names[s],
+            key=f"naics_expanded_{naics_view}",
+        )
+
+        with span("naics.render"):
+            html = generate_naics_html(naics_snapshot, sectors_to_display, "", expanded=set(expanded_sectors))
+            st.markdown(html, unsafe_allow_html=True)
 
 with col2:
     st.header("📊 NAICS Data Stats")
-    st.metric("Total Sectors", naics_session.query(Sector).count())
-    st.metric("Total Industry Groups", naics_session.query(IndustryGroup).count())
-    st.metric("Total Industries", naics_session.query(Industry).count())
-    st.metric("Total Sub-Industries", naics_session.query(SubIndustry).count())
+    with span("naics.stats"):
+        naics_stats = load_naics_stats(naics_snapshot.version, naics_snapshot)
+    naics_counts = naics_stats["level_counts"]
+    st.metric("Total Sectors", naics_counts["sector"])
+    st.metric("Total Industry Groups", naics_counts["industry_group"])
+    st.metric("Total Industries", naics_counts["industry"])
+    st.metric("Total Sub-Industries", naics_counts["sub_industry"])
+    st.metric("Total National Industries", naics_counts["national_industry"])
+    show_sector_breakdown(naics_stats)
 
 
 
@@ -147,34 +297,25 @@ col1, col2 = st.columns([3, 1])
 
 
 with col1:
-    search_query = st.text_input("🔍 Search GICS by keyword (e.g., 'Oil')", "").strip()
-
-    if search_query:
-        gics_sectors_to_display = search_gics_hierarchy(gics_session, search_query)
-    else:
-        gics_sectors = gics_session.query(GICSSector).all()
-        selected_gics_sector = st.selectbox("Select GICS Sector", ["All"] + [s.name for s in gics_sectors], index=0)
-        if selected_gics_sector == "All":
-            gics_sectors_to_display = gics_sectors
-        else:
-            gics_sectors_to_display = [s for s in gics_sectors if s.name == selected_gics_sector]
-
-    for sector in gics_sectors_to_display:
-        with st.expander(f"📁 {sector.name}", expanded=False):
-            for ig in sector.industry_groups:
-                st.markdown(f"&nbsp;&nbsp;&nbsp;&nbsp;📂 **{ig.name}**", unsafe_allow_html=True)
-                for ind in ig.industries:
-                    st.markdown(f"&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;🏭 **{ind.name}**", unsafe_allow_html=True)
-                    for sub in ind.sub_industries:
-                        st.markdown(f"&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;🏷 {sub.name}", unsafe_allow_html=True)
+    # The tree is filtered, expanded and highlighted in the browser: typing costs no reruns
+    include_naics = st.toggle("Also browse NAICS here", value=False, key="tree_filter_naics")
+    trees = [("GICS", gics_snapshot.version, load_gics_tree_payload(gics_snapshot.version, gics_snapshot))]
+    if include_naics:
+        trees.append(("NAICS", naics_snapshot.version, load_naics_tree_payload(naics_snapshot.version, naics_snapshot)))
+    with span("gics.render"):
+        tree_filter(trees, key="gics_tree", placeholder="🔍 Filter by keyword or code (e.g., 'Oil')")
     st.markdown("---")
 
 with col2:
     st.header("📊 GICS Data Stats")
-    st.metric("Total Sectors", gics_session.query(GICSSector).count())
-    st.metric("Total Industry Groups", gics_session.query(GICSGroup).count())
-    st.metric("Total Industries", gics_session.query(GICSIndustry).count())
-    st.metric("Total Sub-Industries", gics_session.query(GICSSub).count())
+    with span("gics.stats"):
+        gics_stats = load_gics_stats(gics_snapshot.version, gics_snapshot)
+    gics_counts = gics_stats["level_counts"]
+    st.metric("Total Sectors", gics_counts["sector"])
+    st.metric("Total Industry Groups", gics_counts["industry_group"])
+    st.metric("Total Industries", gics_counts["industry"])
+    st.metric("Total Sub-Industries", gics_counts["sub_industry"])
+    show_sector_breakdown(gics_stats)
 
 
 
@@ -185,66 +326,37 @@ st.header(" Tree Graph - GICS")
 show_tree = st.toggle("📈 Show GICS Tree Graph", value=False)
 
 if show_tree:
-    layout_option = st.radio("Select Graph Layout", ["Hierarchical", "Force Directed"])
+    from streamlit_agraph import Config, agraph  # only needed once the graph is switched on
+
+    layout_option = st.radio("Select Graph Layout", LAYOUTS)
     graph_placeholder = st.empty()
 
     with graph_placeholder.container():
         st.info("🔄 Initializing GICS Tree Graph...")
         with st.spinner(f"Building {layout_option} structure..."):
-            nodes, edges = [], []
-
-            root_id = "root_GICS"
-            nodes.append(Node(id=root_id, label="GICS", title="GICS", size=25, color="#FF4B4B"))
-
-            gics_sectors = gics_session.query(GICSSector).all()
-            for sector in gics_sectors:
-                sector_id = f"sector_{sector.id}"
-                nodes.append(Node(id=sector_id, label=sector.name, title=sector.name, size=20, color="#FF9B9B"))
-                edges.append(Edge(source=root_id, target=sector_id, type="CURVE_SMOOTH"))
-
-                for ig in sector.industry_groups:
-                    ig_id = f"ig_{ig.id}"
-                    nodes.append(Node(id=ig_id, label=ig.name, title=ig.name, size=15, color="#4B4BFF"))
-                    edges.append(Edge(source=sector_id, target=ig_id, type="CURVE_SMOOTH"))
-
-                    for industry in ig.industries:
-                        industry_id = f"ind_{industry.id}"
-                        nodes.append(Node(id=industry_id, label=industry.name, title=industry.name, size=10, color="#9B9BFF"))
-                        edges.append(Edge(source=ig_id, target=industry_id, type="CURVE_SMOOTH"))
-
-                        for sub in industry.sub_industries:
-                            sub_id = f"sub_{sub.id}"
-                            nodes.append(Node(id=sub_id, label=sub.name, title=sub.name, size=5, color="#DEDEDE"))
-                            edges.append(Edge(source=industry_id, target=sub_id, type="CURVE_SMOOTH"))
-
-            config_kwargs = {
-                "width": 1200,
-                "height": 800,
-                "directed": True,
-                "physics": True,
-                "hierarchical": layout_option == "Hierarchical",
-                "node_size": 1000,
-                "node_color": "#666",
-                "node_text_size": 10,
-                "edge_color": "#666",
-                "edge_width": 1,
-                "drag_nodes": True,
-                "drag_edges": False,
-                "fit_view": True
-            }
-
-            if layout_option == "Hierarchical":
-                config_kwargs.update({
-                    "hierarchical_sort_method": "directed",
-                    "hierarchical_direction": "UD",
-                    "hierarchical_level_separation": 150,
-                    "hierarchical_node_separation": 150
-                })
-
-            config = Config(**config_kwargs)
+            with span("gics.graph.build"):
+                nodes_by_layout, edges = load_gics_graph(gics_snapshot.version, gics_snapshot)
+
+            # Positions are precomputed server-side, so the browser doesn't run physics
+            config = Config(
+                width=1200,
+                height=800,
+                directed=True,
+                physics=False,
+                hierarchical=False,
+                node_size=1000,
+                node_color="#666",
+                node_text_size=10,
+                edge_color="#666",
+                edge_width=1,
+                drag_nodes=True,
+                drag_edges=False,
+                fit_view=True,
+            )
             graph_placeholder.empty()
             with graph_placeholder.container():
-                agraph(nodes=nodes, edges=edges, config=config)
+                with span("gics.graph.render"):
+                    agraph(nodes=nodes_by_layout[layout_option], edges=edges, config=config)
 
 
 # --- Footer ---
@@ -256,6 +368,13 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-# --- Close sessions ---
-naics_session.close()
-gics_session.close()
\ No newline at end of file
+# --- Debug Panel ---
+if show_debug_panel:
+    with st.expander("🛠 Profiling (this rerun)", expanded=True):
+        st.caption(f"Total {profile.elapsed_ms:.1f} ms · {profile.queries} SQL queries "
+                   f"({profile.sql_ms:.1f} ms) · {profile.rows} rows")
+        st.dataframe(
+            [{"Span": "  " * record.depth + record.name, "ms": round(record.ms, 2),
+              "Queries": record.queries, "Rows": record.rows} for record in profile.records()],
+            hide_index=True,
+        )
\ No newline at end of file
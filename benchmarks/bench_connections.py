@@ -0,0 +1,53 @@
+"""
+Per-rerun connection overhead: a fresh engine + session per Streamlit rerun (the old
+app.py) versus a checkout from the shared read-only pool in utils/db.py.
+
+    python -m benchmarks.bench_connections --reruns 500
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from utils.db import NAICS_DB_PATH, get_engine
+
+QUERY = text("SELECT name FROM sectors WHERE code = '11'")
+
+
+def per_rerun_engine(path: str) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    session = sessionmaker(bind=engine)()
+    session.execute(QUERY).all()
+    session.close()
+    engine.dispose()
+
+
+def pooled(path: str) -> None:
+    with get_engine(path).connect() as conn:
+        conn.execute(QUERY).all()
+
+
+def measure(fn, path: str, reruns: int) -> float:
+    fn(path)  # warm-up
+    start = time.perf_counter()
+    for _ in range(reruns):
+        fn(path)
+    return (time.perf_counter() - start) / reruns * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reruns", type=int, default=500)
+    parser.add_argument("--database", default=NAICS_DB_PATH)
+    args = parser.parse_args()
+
+    before = measure(per_rerun_engine, args.database, args.reruns)
+    after = measure(pooled, args.database, args.reruns)
+    print(f"engine per rerun : {before:8.1f} µs/rerun")
+    print(f"shared pool      : {after:8.1f} µs/rerun")
+    print(f"speed-up         : {before / after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
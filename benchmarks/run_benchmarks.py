@@ -0,0 +1,273 @@
+"""
+Benchmark the hot paths on synthetic taxonomies at several multiples of the real size.
+
+    python -m benchmarks.run_benchmarks --scales 1 10 100 --output bench_results.json
+    python -m benchmarks.run_benchmarks --compare bench_results.json   # after a change
+
+Each benchmark reports the median / min wall time over ``--repeat`` runs and the peak
+Python allocation of one extra run under tracemalloc. Results are keyed
+"<benchmark>@<scale>x" so files from different commits can be compared.
+"""
+import argparse
+import ast
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.synthetic import load_vocabulary, write_gics_csv, write_naics_csv
+from gics_search_utils import search_gics_hierarchy
+from naics_search_utils import search_naics_hierarchy
+from utils.db import get_engine
+from utils.fts_index import build_search_index
+from utils.hierarchy_snapshot import build_gics_snapshot, build_naics_snapshot
+from utils.incremental_search import CANDIDATE_CACHE, SubstringIndex, get_substring_index
+from utils.html_hits_view import generate_hits_html
+from utils.html_naics_view import generate_naics_html
+from utils.ranking import paginate
+from utils.search_results import SEARCH_CACHE
+from utils.snapshot_file import SnapshotFile, write_snapshot_file
+from utils.tree_graph import build_tree_graph
+
+REGRESSION_THRESHOLD = 0.10
+
+
+def measure(fn, repeat: int, setup=None) -> dict:
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_ms": round(statistics.median(times), 3),
+        "min_ms": round(min(times), 3),
+        "repeat": repeat,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def _quiet(fn):
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return run
+
+
+def _queries(snapshot):
+    """An all-keywords query, a broad single-word query and a typo that only the fuzzy tier can answer."""
+    name = snapshot.names[len(snapshot) // 2]
+    exact = " ".join(name.split()[:2])
+    partial = snapshot.names[len(snapshot) // 3].split()[0]
+    corpus = "\n".join(snapshot.names_lower)
+    for word in sorted({w for n in snapshot.names_lower for w in n.split() if len(w) >= 7}):
+        typo = word[:2] + word[3] + word[2] + word[4:]
+        if typo not in corpus:
+            return exact, partial, typo
+    return exact, partial, "zzzzzzz"
+
+
+def run_scale(scale: float, repeat: int, vocabulary, workdir: str) -> dict:
+    import init_db
+    import load_naics
+
+    results = {}
+    naics_csv = os.path.join(workdir, f"naics_{scale}.csv")
+    gics_csv = os.path.join(workdir, f"gics_{scale}.csv")
+    write_naics_csv(naics_csv, scale, vocabulary)
+    write_gics_csv(gics_csv, scale, vocabulary)
+
+    # --- Loaders ---
+    naics_paths = iter(os.path.join(workdir, f"naics_{scale}_{i}.db") for i in range(repeat + 1))
+    naics_writers = {}
+
+    def fresh_naics_db():
+        naics_writers["engine"] = _quiet(lambda: load_naics.create_tables_if_not_exist(f"sqlite:///{next(naics_paths)}"))()
+
+    results["load_naics"] = measure(lambda: load_naics.bulk_load(naics_writers["engine"], load_naics.read_naics_csv(naics_csv)),
+                                    repeat, setup=fresh_naics_db)
+    naics_writer = naics_writers["engine"]
+    naics_path = naics_writer.url.database
+    # Same CSV again: every content hash matches, so nothing is written
+    results["reload_naics_unchanged"] = measure(
+        lambda: load_naics.bulk_load(naics_writer, load_naics.read_naics_csv(naics_csv)), repeat)
+
+    gics_paths = iter(os.path.join(workdir, f"gics_{scale}_{i}.db") for i in range(repeat + 1))
+    gics_writer = {}
+
+    def fresh_gics_db():
+        gics_writer["engine"] = _quiet(lambda: init_db.create_tables_if_not_exist(f"sqlite:///{next(gics_paths)}"))()
+
+    results["load_gics"] = measure(lambda: init_db.bulk_upsert(gics_writer["engine"], init_db.read_gics_csv(gics_csv)),
+                                   repeat, setup=fresh_gics_db)
+    gics_path = gics_writer["engine"].url.database
+
+    # --- Snapshots and indexes ---
+    results["build_snapshot_naics"] = measure(lambda: build_naics_snapshot(naics_writer), repeat)
+    naics_snapshot = build_naics_snapshot(naics_writer, "bench")
+    gics_snapshot = build_gics_snapshot(gics_writer["engine"], "bench")
+    results["build_fts_index_naics"] = measure(lambda: build_search_index(naics_writer, naics_snapshot), repeat)
+    build_search_index(gics_writer["engine"], gics_snapshot)
+    snap_path = os.path.join(workdir, f"taxonomy_{scale}.snap")
+    write_snapshot_file(snap_path, {"naics": naics_snapshot, "gics": gics_snapshot}, {}, {"naics": "", "gics": ""})
+    results["map_snapshot_file"] = measure(
+        lambda: [SnapshotFile(snap_path).snapshot(t) for t in ("naics", "gics")], repeat)
+    naics_writer.dispose()
+    gics_writer["engine"].dispose()
+
+    # --- Search tiers (query cache cleared so every run does the work) ---
+    naics_engine, gics_engine = get_engine(naics_path), get_engine(gics_path)
+    exact, partial, typo = _queries(naics_snapshot)
+    for tier, query in (("exact", exact), ("partial", partial), ("fuzzy", typo)):
+        results[f"search_naics_{tier}"] = measure(
+            lambda q=query: search_naics_hierarchy(naics_snapshot, q, naics_engine), repeat, setup=SEARCH_CACHE.clear)
+        results[f"search_naics_{tier}"]["query"] = query
+    gics_query = gics_snapshot.names[len(gics_snapshot) // 2].split()[0]
+    results["search_gics"] = measure(
+        lambda: search_gics_hierarchy(gics_snapshot, gics_query, gics_engine), repeat, setup=SEARCH_CACHE.clear)
+    results["search_naics_cached"] = measure(lambda: search_naics_hierarchy(naics_snapshot, exact, naics_engine), repeat)
+
+    # --- Search as you type: every keystroke of the exact query, from scratch vs narrowing ---
+    def clear_search_caches():
+        SEARCH_CACHE.clear()
+        CANDIDATE_CACHE.clear()
+
+    keystrokes = [exact[:end] for end in range(1, len(exact) + 1)]
+    results["build_substring_index"] = measure(lambda: SubstringIndex(naics_snapshot.names_lower), repeat)
+    get_substring_index(naics_snapshot)
+    for mode, incremental in (("typing_fts", False), ("typing_incremental", True)):
+        results[f"search_naics_{mode}"] = measure(
+            lambda inc=incremental: [search_naics_hierarchy(naics_snapshot, q, naics_engine, incremental=inc)
+                                     for q in keystrokes], repeat, setup=clear_search_caches)
+        results[f"search_naics_{mode}"]["query"] = exact
+
+    # --- Rendering and graph ---
+    sectors = [int(s) for s in naics_snapshot.roots]
+    results["render_html_expanded"] = measure(lambda: generate_naics_html(naics_snapshot, sectors, partial), repeat)
+    results["render_html_collapsed"] = measure(
+        lambda: generate_naics_html(naics_snapshot, sectors, partial, expanded=set()), repeat)
+    partial_result = search_naics_hierarchy(naics_snapshot, partial, naics_engine)
+    results["render_hits_page"] = measure(
+        lambda: generate_hits_html(naics_snapshot, paginate(partial_result, naics_snapshot.version).matches), repeat)
+    results["build_tree_graph"] = measure(lambda: build_tree_graph(gics_snapshot), repeat)
+
+    for result in results.values():
+        result["naics_nodes"] = len(naics_snapshot)
+        result["gics_nodes"] = len(gics_snapshot)
+    return results
+
+
+def _module_imports(path: str) -> str:
+    """The top-level import statements of a script, e.g. everything app.py imports before it renders."""
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def measure_cold_import(code: str, repeat: int) -> dict:
+    """Wall time of ``code`` in a fresh interpreter each run (nothing cached in sys.modules)."""
+    script = f"import time\n_start = time.perf_counter()\n{code}\nprint((time.perf_counter() - _start) * 1000)"
+    times = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", script], text=True, stderr=subprocess.DEVNULL)
+        times.append(float(output.strip().splitlines()[-1]))
+    return {"median_ms": round(statistics.median(times), 3), "min_ms": round(min(times), 3),
+            "repeat": repeat, "peak_kib": 0.0}
+
+
+def run_cold_start(repeat: int) -> dict:
+    """Import cost of the app and API entry points, against the Streamlit import they cannot avoid."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return {
+        "cold_import_streamlit": measure_cold_import("import streamlit", repeat),
+        "cold_import_app": measure_cold_import(_module_imports(os.path.join(root, "app.py")), repeat),
+        "cold_import_api": measure_cold_import("import api", repeat),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(previous: dict, current: dict) -> int:
+    """Print a side-by-side table; returns the number of regressions beyond the threshold."""
+    regressions = 0
+    print(f"\n{'benchmark':40} {'before ms':>12} {'after ms':>12} {'ratio':>8}")
+    for key, result in current["results"].items():
+        old = previous.get("results", {}).get(key)
+        if not old:
+            continue
+        ratio = result["median_ms"] / max(old["median_ms"], 1e-9)
+        flag = ""
+        if ratio > 1 + REGRESSION_THRESHOLD:
+            flag = "  ⚠️ regression"
+            regressions += 1
+        print(f"{key:40} {old['median_ms']:12.3f} {result['median_ms']:12.3f} {ratio:8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    vocabulary = load_vocabulary()
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {},
+    }
+    print("🧊 Cold start")
+    for name, result in run_cold_start(args.repeat).items():
+        report["results"][name] = result
+        print(f"  {name:28} {result['median_ms']:10.3f} ms")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for scale in args.scales:
+            label = f"{scale:g}x"
+            print(f"📏 Scale {label}")
+            for name, result in run_scale(scale, args.repeat, vocabulary, workdir).items():
+                report["results"][f"{name}@{label}"] = result
+                print(f"  {name:28} {result['median_ms']:10.3f} ms  peak {result['peak_kib']:10.1f} KiB")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Wrote {args.output}")
+
+    if previous:
+        regressions = compare(previous, report)
+        raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
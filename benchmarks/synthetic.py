@@ -0,0 +1,99 @@
+"""
+Synthetic NAICS / GICS source files at a multiple of the real taxonomy sizes.
+
+Names are drawn from the vocabulary of the real 2022 NAICS titles so search behaves
+realistically; codes follow the NAICS digit-per-level scheme the loader expects, which
+caps deep levels at large scales (at 100x the tree has ~174k rather than ~212k codes).
+"""
+import csv
+import re
+from typing import List
+
+import numpy as np
+
+NAICS_LEVEL_SIZES = (20, 96, 308, 689, 1012)  # 2022 release
+GICS_LEVEL_SIZES = (11, 24, 66, 147)          # sample_data/GICS.csv
+MAX_SECTORS = 89                               # two-digit sector codes 10..98
+MAX_FAN_OUT = 9                                # one digit per level
+
+
+def load_vocabulary(path: str = "2022_NAICS_Structure.csv") -> List[str]:
+    with open(path, newline="", encoding="utf-8", errors="ignore") as f:
+        # Titles carry a trailing "T" footnote marker in the Census file
+        text = " ".join(re.sub(r"T\s*$", "", row[2]) for row in csv.reader(f) if len(row) > 2)
+    words = {w for w in re.findall(r"[A-Za-z]{3,}", text)}
+    return sorted(words)
+
+
+def _names(rng, vocabulary: List[str], count: int) -> List[str]:
+    lengths = rng.integers(2, 6, size=count)
+    picks = rng.integers(0, len(vocabulary), size=int(lengths.sum()))
+    names, cursor = [], 0
+    for length in lengths:
+        names.append(" ".join(vocabulary[i] for i in picks[cursor:cursor + length]))
+        cursor += length
+    return names
+
+
+def _fan_out(rng, parents: int, target: int) -> np.ndarray:
+    """Children per parent summing to roughly ``target``, each between 1 and MAX_FAN_OUT."""
+    counts = np.full(parents, max(target // max(parents, 1), 1))
+    extra = target - int(counts.sum())
+    if extra > 0:
+        counts += np.bincount(rng.integers(0, parents, size=extra), minlength=parents)
+    return np.clip(counts, 1, MAX_FAN_OUT)
+
+
+def naics_rows(scale: float, vocabulary: List[str], seed: int = 0):
+    """(code, title) rows for a NAICS-shaped tree with ``scale`` times the real level sizes."""
+    rng = np.random.default_rng(seed)
+    targets = [max(int(round(size * scale)), 1) for size in NAICS_LEVEL_SIZES]
+    level_codes = [[str(10 + i) for i in range(min(targets[0], MAX_SECTORS))]]
+    for target in targets[1:]:
+        parents = level_codes[-1]
+        counts = _fan_out(rng, len(parents), target)
+        level_codes.append([parent + str(d) for parent, n in zip(parents, counts) for d in range(1, n + 1)])
+
+    # Emit in pre-order, like the Census file
+    children = {}
+    for codes in level_codes[1:]:
+        for code in codes:
+            children.setdefault(code[:-1], []).append(code)
+    ordered = []
+    stack = list(reversed(level_codes[0]))
+    while stack:
+        code = stack.pop()
+        ordered.append(code)
+        stack.extend(reversed(children.get(code, ())))
+    return list(zip(ordered, _names(rng, vocabulary, len(ordered))))
+
+
+def write_naics_csv(path: str, scale: float, vocabulary: List[str], seed: int = 0) -> int:
+    rows = naics_rows(scale, vocabulary, seed)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Table 1"])
+        writer.writerow(["Synthetic NAICS Structure", "", "", "", "", ""])
+        writer.writerow(["Change Indicator", "NAICS Code", "NAICS Title", "", "", ""])
+        for code, title in rows:
+            writer.writerow(["", code, title, "", "", ""])
+    return len(rows)
+
+
+def write_gics_csv(path: str, scale: float, vocabulary: List[str], seed: int = 0) -> int:
+    """GICS-shaped CSV; names carry a numeric suffix because GICS names are unique per level."""
+    rng = np.random.default_rng(seed)
+    targets = [max(int(round(size * scale)), 1) for size in GICS_LEVEL_SIZES]
+    paths = [[(f"{name} S{i}",) for i, name in enumerate(_names(rng, vocabulary, targets[0]))]]
+    for level, target in enumerate(targets[1:], start=1):
+        parents = paths[-1]
+        counts = _fan_out(rng, len(parents), target)
+        names = iter(_names(rng, vocabulary, int(counts.sum())))
+        suffix = iter(range(int(counts.sum())))
+        paths.append([parent + (f"{next(names)} L{level}-{next(suffix)}",)
+                      for parent, n in zip(parents, counts) for _ in range(n)])
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Sector", "Industry Group", "Industry", "Sub-Industry"])
+        writer.writerows(paths[-1])
+    return len(paths[-1])
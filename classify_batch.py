@@ -0,0 +1,71 @@
+import argparse
+import csv
+import itertools
+import os
+import sys
+import time
+
+import pandas as pd
+from utils.hierarchy_snapshot import build_naics_snapshot, build_gics_snapshot
+from utils.batch_classifier import BatchClassifier
+from utils.db import NAICS_DB_PATH, GICS_DB_PATH, get_engine
+
+
+def _flatten(result, top_k):
+    row = {}
+    for taxonomy in ("naics", "gics"):
+        for rank in range(top_k):
+            candidate = result[taxonomy][rank] if rank < len(result[taxonomy]) else None
+            row[f"{taxonomy}_code_{rank + 1}"] = candidate.code if candidate else ""
+            row[f"{taxonomy}_name_{rank + 1}"] = candidate.name if candidate else ""
+            row[f"{taxonomy}_score_{rank + 1}"] = candidate.score if candidate else ""
+    return row
+
+
+def _descriptions(path, column, chunk_size):
+    # Streamed in chunks so inputs larger than memory still work
+    for chunk in pd.read_csv(path, usecols=[column], dtype=str, chunksize=chunk_size):
+        yield from chunk[column].fillna("").tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify company descriptions into NAICS and GICS codes.")
+    parser.add_argument("input", help="CSV file with one description per row ('-' for stdin)")
+    parser.add_argument("--column", default="description", help="Column holding the description text")
+    parser.add_argument("--output", default="-", help="Output CSV path ('-' for stdout)")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=2_000)
+    parser.add_argument("--all-levels", action="store_true", help="Score every level, not just the most specific")
+    args = parser.parse_args()
+
+    naics_snapshot = build_naics_snapshot(get_engine(NAICS_DB_PATH))
+    gics_snapshot = build_gics_snapshot(get_engine(GICS_DB_PATH))
+    classifier = BatchClassifier(naics_snapshot, gics_snapshot, leaf_only=not args.all_levels)
+
+    source = sys.stdin if args.input == "-" else args.input
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    start = time.perf_counter()
+    count = 0
+    try:
+        writer = None
+        # tee only buffers the chunks currently in flight in the pool
+        descriptions, echo = itertools.tee(_descriptions(source, args.column, args.chunk_size))
+        results = classifier.classify_stream(descriptions, args.top_k, args.processes, args.chunk_size)
+        for description, result in zip(echo, results):
+            row = {args.column: description, **_flatten(result, args.top_k)}
+            if writer is None:
+                writer = csv.DictWriter(out, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Classified {count} descriptions in {elapsed:.2f}s ({count / max(elapsed, 1e-9):,.0f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,45 @@
-from typing import List, Set
-from sqlalchemy.orm import Session
-from models.models import Sector, IndustryGroup, Industry, SubIndustry
-
-def highlight_keyword(text: str, keyword: str) -> str:
-    if not keyword:
-        return text
-    keyword_lower = keyword.lower()
-    if keyword_lower in text.lower():
-        index = text.lower().index(keyword_lower)
-        return (
-            text[:index] +
-            f"<span style='background-color: #ffff66'><b>{text[index:index+len(keyword)]}</b></span>" +
-            text[index+len(keyword):]
-        )
-    return text
-
-def search_gics_hierarchy(session: Session, keyword: str) -> List[Sector]:
+from utils.hierarchy_snapshot import HierarchySnapshot
+from utils.fts_index import match_search_index
+from utils.incremental_search import incremental_matches
+from utils.profiling import span
+from utils.ranking import bm25_scores, rank_matches
+from utils.search_results import MatchView, SearchResult, SEARCH_CACHE, find_spans, normalize_query
+
+def search_gics_hierarchy(snapshot: HierarchySnapshot, keyword: str, engine=None,
+                          incremental: bool = False) -> SearchResult:
     """
-    Search all GICS levels and return a list of matching sectors.
-    Highlights keyword in names (HTML-safe).
+    Search all GICS levels and return immutable match views plus their sectors.
+    Uses the FTS5 index when an engine is given, else scans the snapshot.
+    ``incremental`` (search-as-you-type) narrows an earlier prefix's candidates in memory instead.
+    Matches are ranked by BM25 across all levels; results are cached per
+    (taxonomy, data version, normalized query).
     """
-    keyword = keyword.strip()
-    if not keyword:
-        return session.query(Sector).all()
-
-    query = f"%{keyword}%"
-    matching_sectors: Set[Sector] = set()
-
-    subs = session.query(SubIndustry).filter(SubIndustry.name.ilike(query)).all()
-    for sub in subs:
-        sub.name = highlight_keyword(sub.name, keyword)
-        if sub.industry:
-            matching_sectors.add(sub.industry.industry_group.sector)
-
-    inds = session.query(Industry).filter(Industry.name.ilike(query)).all()
-    for ind in inds:
-        ind.name = highlight_keyword(ind.name, keyword)
-        matching_sectors.add(ind.industry_group.sector)
-
-    igs = session.query(IndustryGroup).filter(IndustryGroup.name.ilike(query)).all()
-    for ig in igs:
-        ig.name = highlight_keyword(ig.name, keyword)
-        matching_sectors.add(ig.sector)
-
-    secs = session.query(Sector).filter(Sector.name.ilike(query)).all()
-    for sec in secs:
-        sec.name = highlight_keyword(sec.name, keyword)
-        matching_sectors.add(sec)
-
-    return list(matching_sectors)
+    query = normalize_query(keyword)
+    if not query:
+        return SearchResult(tuple(int(s) for s in snapshot.roots), ())
+    key = ("gics", snapshot.version, query)
+    return SEARCH_CACHE.get_or_compute(key, lambda: _search_gics(snapshot, query, engine, incremental))
+
+def _search_gics(snapshot: HierarchySnapshot, query: str, engine=None, incremental: bool = False) -> SearchResult:
+    fts_hits = None
+    if engine is not None and not incremental:
+        with span("gics.search.fts"), engine.connect() as conn:
+            fts_hits = match_search_index(conn, [query])
+    if incremental:
+        with span("gics.search.incremental"):
+            nodes = incremental_matches(snapshot, query, phrase=True).tolist()
+    elif fts_hits is not None:
+        nodes = [snapshot.find(hit.code, hit.level) for hit in fts_hits]
+        nodes = [node for node in nodes if node is not None]
+    else:
+        with span("gics.search.scan"):
+            nodes = [i for i, name in enumerate(snapshot.names_lower) if query in name]
+
+    with span("gics.search.rank"):
+        matches = rank_matches([
+            MatchView(node, snapshot.codes[node], int(snapshot.levels[node]), snapshot.names[node],
+                      find_spans(snapshot.names[node], [query]))
+            for node in nodes
+        ], bm25_scores(snapshot, nodes, query))
+    sectors = sorted({snapshot.sector_of(match.node) for match in matches})
+    return SearchResult(tuple(sectors), matches)
@@ -1,35 +1,157 @@
-import pandas as pd
-from models.models import Sector, IndustryGroup, Industry, SubIndustry, create_tables_if_not_exist
-from sqlalchemy.orm import sessionmaker
+import argparse
 import os
+import time
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy import create_engine, select
+from models.models import Base, Sector, IndustryGroup, Industry, SubIndustry, create_tables_if_not_exist
+from utils.hierarchy_snapshot import build_gics_snapshot, build_naics_snapshot
+from utils.crosswalk import build_crosswalk
+from utils.db import NAICS_DB_PATH
+from utils.snapshot_file import SNAPSHOT_PATH, export_snapshot_file
+from utils.fts_index import build_search_index
+from utils.hierarchy_tables import build_hierarchy_tables, ensure_foreign_key_indexes
+from utils.hot_reload import diff_rows, hash_rows, merged_sources, staged_databases
+from utils.taxonomy_stats import write_stats
+
+# CSV column → (model, parent CSV column, parent foreign key), top level first
+LEVELS = (
+    ('Sector', Sector, None, None),
+    ('Industry Group', IndustryGroup, 'Sector', 'sector_id'),
+    ('Industry', Industry, 'Industry Group', 'industry_group_id'),
+    ('Sub-Industry', SubIndustry, 'Industry', 'industry_id'),
+)
+
+
+def _insert(engine):
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def read_gics_csv(path: str) -> pd.DataFrame:
+    df = pd.read_csv(path, dtype=str)
+    return df.apply(lambda col: col.str.strip()).dropna(subset=[level[0] for level in LEVELS])
+
+
+def bulk_upsert(engine, df: pd.DataFrame) -> dict:
+    """
+    One upsert per level, resolving parents through in-memory name → id maps.
+    Only rows whose content hash (name, parent name) changed are written; rows no longer
+    in the CSV are deleted bottom-up. Returns {table: RowDiff}.
+    """
+    insert = _insert(engine)
+    diffs = {}
+    ids = {}  # CSV column → {name: id}
+    with engine.begin() as conn:
+        for column, model, parent_column, parent_key in LEVELS:
+            table = model.__table__
+            if parent_column:
+                pairs = df[[column, parent_column]].drop_duplicates(subset=column)
+                incoming = dict(zip(pairs[column], pairs[parent_column]))
+                parent_names = {id_: name for name, id_ in ids[parent_column].items()}
+                stored = {name: parent_names.get(parent)
+                          for name, parent in conn.execute(select(table.c.name, table.c[parent_key]))}
+            else:
+                incoming = {name: None for name in df[column].drop_duplicates()}
+                stored = {name: None for name in conn.execute(select(table.c.name)).scalars()}
+            diff = diffs[model.__tablename__] = diff_rows(hash_rows(stored), hash_rows(incoming))
+
+            changed = diff.inserted + diff.updated
+            if parent_column:
+                records = [{'name': name, parent_key: ids[parent_column][incoming[name]]} for name in changed]
+            else:
+                records = [{'name': name} for name in changed]
+
+            if records:
+                stmt = insert(table)
+                if parent_key:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[table.c.name],
+                        set_={parent_key: stmt.excluded[parent_key]},
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.name])
+                conn.execute(stmt, records)
+
+            ids[column] = dict(conn.execute(select(table.c.name, table.c.id)).all())
+
+        for _, model, _, _ in reversed(LEVELS):
+            deleted = diffs[model.__tablename__].deleted
+            if deleted:
+                table = model.__table__
+                conn.execute(table.delete().where(table.c.name.in_(deleted)))
+    return diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import or refresh GICS from a CSV file.")
+    parser.add_argument("--csv", default="sample_data/GICS.csv")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///gics.db"))
+    args = parser.parse_args()
+
+    # Everything is written to staged copies (GICS, plus NAICS for the crosswalk) that are
+    # swapped in together; the running app keeps reading the live files
+    urls = [args.database_url]
+    if os.path.exists(NAICS_DB_PATH):
+        urls.append(f"sqlite:///{NAICS_DB_PATH}")
+    with staged_databases(*urls) as staged_files:
+        engine = create_tables_if_not_exist(staged_files[0].url)
+        naics_url = staged_files[1].url if len(staged_files) > 1 else None
+        try:
+            changed = load(engine, args.csv, naics_url, merged_sources(staged_files))
+        finally:
+            engine.dispose()
+        if not changed:
+            for staged in staged_files:
+                staged.discard()
+            print("✅ GICS data is unchanged (content hashes match); the live database was left alone.")
+    if changed:
+        for staged in staged_files:
+            if staged.path:
+                print(f"🔁 Swapped {staged.path} in; the running app and API reload it in the background.")
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///gics.db")
-engine = create_tables_if_not_exist(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-session = Session()
 
-df = pd.read_csv("sample_data/GICS.csv")
+def load(engine, csv_path: str, naics_url: Optional[str], sources: dict) -> bool:
+    """
+    Every loader step against ``engine`` (the staged GICS copy) and ``naics_url`` (the
+    staged NAICS copy, if there is one). Returns whether anything changed.
+    """
+    start = time.perf_counter()
+    df = read_gics_csv(csv_path)
+    diffs = bulk_upsert(engine, df)
+    elapsed = time.perf_counter() - start
+    if not any(diffs.values()):
+        return False
 
-for _, row in df.iterrows():
-    sector = session.query(Sector).filter_by(name=row['Sector']).first()
-    if not sector:
-        sector = Sector(name=row['Sector'])
-        session.add(sector)
+    print(", ".join(f"{table}: {diff.summary()}" for table, diff in diffs.items()))
+    print(f"⏱ Upserted {len(df)} CSV rows in {elapsed * 1000:.1f} ms ({len(df) / max(elapsed, 1e-9):,.0f} rows/s)")
 
-    ig = session.query(IndustryGroup).filter_by(name=row['Industry Group']).first()
-    if not ig:
-        ig = IndustryGroup(name=row['Industry Group'], sector=sector)
-        session.add(ig)
+    # Full-text search index over all four levels, plus materialized stats
+    snapshot = build_gics_snapshot(engine)
+    build_search_index(engine, snapshot)
+    write_stats(engine, snapshot)
+    # Foreign-key indexes (for databases created before they were declared) and the closure table
+    ensure_foreign_key_indexes(engine, Base)
+    build_hierarchy_tables(engine, snapshot)
+    print("✅ GICS data loaded.")
 
-    ind = session.query(Industry).filter_by(name=row['Industry']).first()
-    if not ind:
-        ind = Industry(name=row['Industry'], industry_group=ig)
-        session.add(ind)
+    # The crosswalk lives next to the NAICS data; refresh it against the new GICS tree
+    if naics_url:
+        naics_engine = create_engine(naics_url)
+        try:
+            stored = build_crosswalk(naics_engine, build_naics_snapshot(naics_engine), snapshot)
+        finally:
+            naics_engine.dispose()
+        print(f"✅ Stored {stored} NAICS → GICS crosswalk rows.")
 
-    sub = session.query(SubIndustry).filter_by(name=row['Sub-Industry']).first()
-    if not sub:
-        sub = SubIndustry(name=row['Sub-Industry'], industry=ind)
-        session.add(sub)
+    # Memory-mapped snapshot of both taxonomies, written from the staged copies before the swap
+    size = export_snapshot_file(sources=sources)
+    print(f"✅ Wrote {SNAPSHOT_PATH} ({size / 1024:.0f} KiB).")
+    return True
 
-session.commit()
-session.close()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,74 +1,194 @@
-import pandas as pd
-from models.naics_models import Sector, IndustryGroup, Industry, SubIndustry, create_tables_if_not_exist
-from sqlalchemy.orm import sessionmaker
+import argparse
 import os
+import time
+
+import pandas as pd
+from sqlalchemy import bindparam, null, select
+from models.naics_models import Base, Sector, IndustryGroup, Industry, SubIndustry, NationalIndustry, create_tables_if_not_exist
+from utils.hierarchy_snapshot import build_gics_snapshot, build_naics_snapshot
+from utils.crosswalk import build_crosswalk
+from utils.db import GICS_DB_PATH, get_engine
+from utils.naics_releases import list_releases, release_from_csv, release_unchanged, store_release
+from utils.hot_reload import diff_rows, hash_rows, staged_database
+from utils.snapshot_file import SNAPSHOT_PATH, export_snapshot_file
+from utils.fts_index import build_search_index
+from utils.hierarchy_tables import build_hierarchy_tables, ensure_foreign_key_indexes
+from utils.taxonomy_stats import write_stats
+
+# Code length → (model, parent key column). Sectors may be ranges such as "31-33".
+LEVELS = {
+    2: (Sector, None),
+    3: (IndustryGroup, "sector_code"),
+    4: (Industry, "industry_group_code"),
+    5: (SubIndustry, "industry_code"),
+    6: (NationalIndustry, "sub_industry_code"),
+}
+
+
+def read_naics_csv(path: str) -> pd.DataFrame:
+    """Clean the Census structure file and derive level and parent code for every row."""
+    df = pd.read_csv(path, skiprows=2, dtype=str)
+    # Columns are named per vintage ("2022 NAICS Code", "2017 NAICS US Title", ...)
+    code_column = next(c for c in df.columns if 'Code' in c)
+    title_column = next(c for c in df.columns if 'Title' in c)
+    indicator = df['Change Indicator'].str.strip() if 'Change Indicator' in df.columns else None
+    df = pd.DataFrame({'change_indicator': indicator, 'code': df[code_column], 'title': df[title_column]})
+    df = df.dropna(subset=['code'])
+    df['code'] = df['code'].str.strip().str.split('.').str[0]
+    # A trailing "T" marks titles with a cross-reference footnote; it is not part of the name
+    df['title'] = df['title'].str.strip().str.replace(r'T$', '', regex=True).str.strip()
+    df = df.drop_duplicates(subset='code')
+
+    is_sector = df['code'].str.fullmatch(r'\d{2}(-\d{2})?')
+    df['level'] = df['code'].str.len().where(~is_sector, 2)
+
+    # "31-33" owns subsectors 31x, 32x and 33x
+    ranges = df.loc[is_sector, 'code'].str.extract(r'^(\d{2})-(\d{2})$').dropna().astype(int)
+    sector_alias = {
+        f"{prefix:02d}": df.at[row, 'code']
+        for row, (start, end) in ranges.iterrows()
+        for prefix in range(start, end + 1)
+    }
+    parent = df['code'].str[:-1]
+    parent = parent.where(df['level'] != 3, df['code'].str[:2].replace(sector_alias))
+    df['parent_code'] = parent.where(df['level'] > 2)
+
+    df = df[df['level'].isin(LEVELS)]
+    # Keep only rows whose parent made it in, level by level from the top
+    kept = set()
+    keep_mask = pd.Series(False, index=df.index)
+    for level in sorted(LEVELS):
+        rows = (df['level'] == level) & (df['parent_code'].isin(kept) if level > 2 else True)
+        keep_mask |= rows
+        kept.update(df.loc[rows, 'code'])
+    return df[keep_mask]
+
+
+def _records(rows: dict, codes) -> list:
+    return [{'b_code': code, 'b_name': rows[code][0], 'b_parent': rows[code][1]} for code in codes]
+
+
+def bulk_load(engine, df: pd.DataFrame) -> dict:
+    """
+    Bring every NAICS level in line with the CSV in one transaction, writing only the rows
+    whose content hash changed: deletes bottom-up, then inserts and updates top-down.
+    Returns {table: RowDiff}.
+    """
+    diffs, incoming = {}, {}
+    with engine.begin() as conn:
+        for level in sorted(LEVELS):
+            model, parent_column = LEVELS[level]
+            table = model.__table__
+            rows = df[df['level'] == level].sort_values('code')
+            parents = rows['parent_code'] if parent_column else [None] * len(rows)
+            incoming[level] = {code: (name, parent) for code, name, parent in zip(rows['code'], rows['title'], parents)}
+            columns = [table.c.code, table.c.name, table.c[parent_column] if parent_column else null()]
+            stored = {code: (name, parent) for code, name, parent in conn.execute(select(*columns))}
+            diffs[level] = diff_rows(hash_rows(stored), hash_rows(incoming[level]))
+
+        for level in sorted(LEVELS, reverse=True):
+            table = LEVELS[level][0].__table__
+            if diffs[level].deleted:
+                conn.execute(table.delete().where(table.c.code == bindparam('b_code')),
+                             [{'b_code': code} for code in diffs[level].deleted])
+        for level in sorted(LEVELS):
+            model, parent_column = LEVELS[level]
+            table = model.__table__
+            values = {'name': bindparam('b_name')}
+            if parent_column:
+                values[parent_column] = bindparam('b_parent')
+            if diffs[level].inserted:
+                conn.execute(table.insert().values(code=bindparam('b_code'), **values),
+                             _records(incoming[level], diffs[level].inserted))
+            if diffs[level].updated:
+                conn.execute(table.update().where(table.c.code == bindparam('b_code')).values(**values),
+                             _records(incoming[level], diffs[level].updated))
+    return {LEVELS[level][0].__tablename__: diff for level, diff in diffs.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the NAICS structure file into the normalized hierarchy.")
+    parser.add_argument("--csv", default="2022_NAICS_Structure.csv")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///naics.db"))
+    parser.add_argument("--release", help="NAICS vintage, e.g. 2017 (default: read from the CSV header)")
+    args = parser.parse_args()
+    release = args.release or release_from_csv(args.csv)
+    if not release:
+        parser.error("could not read the NAICS release from the CSV header; pass --release")
+
+    # === Load and Clean CSV ===
+    start = time.perf_counter()
+    df = read_naics_csv(args.csv)
+    parsed = time.perf_counter()
+
+    # === Setup (a staged copy of the database; the running app keeps reading the live file) ===
+    with staged_database(args.database_url) as staged:
+        engine = create_tables_if_not_exist(staged.url)
+        try:
+            changed = load(engine, df, release, os.path.basename(args.csv), start, parsed, staged.sources())
+        finally:
+            engine.dispose()
+        if not changed:
+            staged.discard()
+            print(f"✅ NAICS {release} is unchanged (content hashes match); the live database was left alone.")
+    if changed and staged.path:
+        print(f"🔁 Swapped {staged.path} in; the running app and API reload it in the background.")
+
+
+def load(engine, df: pd.DataFrame, release: str, source: str, start: float, parsed: float, sources: dict) -> bool:
+    """Every loader step against ``engine`` (the staged copy). Returns whether anything changed."""
+    # === Versioned Store (every release, unchanged nodes shared) ===
+    with engine.connect() as conn:
+        release_changed = not release_unchanged(conn, release, df)
+    if release_changed:
+        stored = store_release(engine, release, df, source=source)
+        print(f"🗂 Release {release}: {stored['nodes']} codes ({stored['shared']} shared with other releases), "
+              f"{stored['changes']} diff rows")
+    with engine.connect() as conn:
+        latest = list_releases(conn)[-1]
+    if release != latest:
+        if release_changed:
+            print(f"✅ Stored NAICS {release}; the browsable tables keep the newer {latest} release.")
+            export_snapshot_file(sources=sources)  # the fingerprint changed with the release store
+        return release_changed
+
+    # === Bulk Upsert (only rows whose content hash changed) ===
+    upsert_start = time.perf_counter()
+    diffs = bulk_load(engine, df)
+    loaded = time.perf_counter()
+    tree_changed = any(diffs.values())
+    if not (release_changed or tree_changed):
+        return False
+
+    total = sum(len(diff.inserted) + len(diff.updated) + len(diff.deleted) for diff in diffs.values())
+    print(", ".join(f"{table}: {diff.summary()}" for table, diff in diffs.items()))
+    elapsed = (parsed - start) + (loaded - upsert_start)  # parse + diff/write, not the release store
+    print(f"⏱ Parsed in {(parsed - start) * 1000:.1f} ms, wrote {total} changed rows in {(loaded - upsert_start) * 1000:.1f} ms "
+          f"({len(df) / max(elapsed, 1e-9):,.0f} rows/s)")
+    print("✅ NAICS data loaded into normalized hierarchy.")
+
+    snapshot = build_naics_snapshot(engine)
+    if tree_changed:
+        # === Full-Text Search Index and Stats ===
+        indexed = build_search_index(engine, snapshot)
+        write_stats(engine, snapshot)
+        print(f"✅ Indexed {indexed} NAICS names for full-text search and refreshed stats.")
+
+        # === Foreign-Key Indexes and Closure Table (one-statement subtree / ancestor queries) ===
+        ensure_foreign_key_indexes(engine, Base)
+        closure_rows = build_hierarchy_tables(engine, snapshot)
+        print(f"✅ Stored {closure_rows} hierarchy closure rows.")
+
+        # === NAICS → GICS Crosswalk ===
+        if os.path.exists(GICS_DB_PATH):
+            stored = build_crosswalk(engine, snapshot, build_gics_snapshot(get_engine(GICS_DB_PATH)))
+            print(f"✅ Stored {stored} NAICS → GICS crosswalk rows.")
+
+    # === Memory-Mapped Snapshot (written from the staged copy, before it is swapped in) ===
+    size = export_snapshot_file(sources=sources)
+    print(f"✅ Wrote {SNAPSHOT_PATH} ({size / 1024:.0f} KiB).")
+    return True
+
 
-# === Setup ===
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///naics.db")
-engine = create_tables_if_not_exist(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-session = Session()
-
-# === Load and Clean CSV ===
-df = pd.read_csv("2022_NAICS_Structure.csv", skiprows=2)
-df.columns = ['change_indicator', 'code', 'title', 'col4', 'col5', 'col6']
-df = df.dropna(subset=['code'])
-df['code'] = df['code'].astype(str).str.strip().str.split('.').str[0]  # Ensure string
-df['title'] = df['title'].str.replace('T', '', regex=False).str.strip()
-
-# === In-Memory Code-to-Object Maps ===
-code_map = {}
-
-# === Load Hierarchy ===
-for idx, row in df.iterrows():
-    code = row['code']
-    title = row['title']
-    level = len(code)
-
-    if level == 2:  # Sector
-        sector = Sector(code=code, name=title)
-        session.add(sector)
-        session.flush()
-        code_map[code] = sector
-
-    elif level == 3:  # Subsector
-        parent_code = code[:2]
-        parent = code_map.get(parent_code)
-        if parent:
-            ig = IndustryGroup(code=code, name=title, sector=parent)
-            session.add(ig)
-            session.flush()
-            code_map[code] = ig
-
-    elif level == 4:  # Industry Group
-        parent_code = code[:3]
-        parent = code_map.get(parent_code)
-        if parent:
-            industry = Industry(code=code, name=title, industry_group=parent)
-            session.add(industry)
-            session.flush()
-            code_map[code] = industry
-
-    elif level == 5:  # Industry
-        parent_code = code[:4]
-        parent = code_map.get(parent_code)
-        if parent:
-            sub = SubIndustry(code=code, name=title, industry=parent)
-            session.add(sub)
-            session.flush()
-            code_map[code] = sub
-
-    elif level == 6:  # National Industry
-        parent_code = code[:5]
-        parent = code_map.get(parent_code)
-        if parent:
-            # Reuse SubIndustry model for now
-            sub = SubIndustry(code=code, name=title, industry=parent.industry if hasattr(parent, 'industry') else parent)
-            session.add(sub)
-            session.flush()
-            code_map[code] = sub
-
-# === Finalize ===
-session.commit()
-session.close()
-print("✅ NAICS data loaded into normalized hierarchy.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
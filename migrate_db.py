@@ -0,0 +1,74 @@
+"""
+Bring existing naics.db / gics.db up to the current schema, idempotently. Both files are
+migrated as staged copies that are swapped in together at the end, so a running app never
+reads a half-migrated database:
+
+  1. index every foreign-key column (sector_code, industry_group_code, sector_id, ...);
+  2. (re)build the hierarchy node + closure tables behind fetch_subtree / fetch_ancestors;
+  3. check that the repository queries plan as index searches; on a full scan the staged
+     copy is discarded, the live file is left as it was and the script exits 1;
+  4. re-export the memory-mapped snapshot from the staged copies, before they are swapped in.
+
+    python migrate_db.py
+"""
+import os
+import sys
+
+from sqlalchemy import create_engine
+
+from models import models as gics_models
+from models import naics_models
+from utils.db import GICS_DB_PATH, NAICS_DB_PATH
+from utils.hierarchy_snapshot import build_gics_snapshot, build_naics_snapshot
+from utils.hierarchy_tables import build_hierarchy_tables, ensure_foreign_key_indexes, full_scans
+from utils.hot_reload import merged_sources, staged_databases
+from utils.snapshot_file import SNAPSHOT_PATH, export_snapshot_file
+
+TAXONOMIES = (
+    ("NAICS", NAICS_DB_PATH, naics_models.Base, build_naics_snapshot),
+    ("GICS", GICS_DB_PATH, gics_models.Base, build_gics_snapshot),
+)
+
+
+def migrate(staged, base, builder) -> dict:
+    """Migrate one StagedDatabase; it is discarded if a repository query would scan."""
+    engine = create_engine(staged.url)
+    try:
+        created = ensure_foreign_key_indexes(engine, base)
+        closure_rows = build_hierarchy_tables(engine, builder(engine))
+        with engine.connect() as conn:
+            problems = full_scans(conn, base)
+    finally:
+        engine.dispose()
+    if problems:
+        staged.discard()
+    return {"indexes": created, "closure_rows": closure_rows, "full_scans": problems}
+
+
+def main() -> int:
+    failed = False
+    taxonomies = []
+    for label, path, base, builder in TAXONOMIES:
+        if os.path.exists(path):
+            taxonomies.append((label, path, base, builder))
+        else:
+            print(f"⚠️ {path} does not exist; skipping {label}")
+
+    with staged_databases(*(f"sqlite:///{path}" for _, path, _, _ in taxonomies)) as staged_files:
+        for staged, (label, path, base, builder) in zip(staged_files, taxonomies):
+            result = migrate(staged, base, builder)
+            if result["full_scans"]:
+                failed = True
+                for query, plan in result["full_scans"].items():
+                    print(f"❌ {label} {query} no longer uses an index:\n    " + "\n    ".join(plan))
+                print(f"❌ {label}: migration discarded; {path} was left unchanged.")
+                continue
+            print(f"✅ {label}: {len(result['indexes'])} foreign-key indexes added "
+                  f"({', '.join(result['indexes']) or 'none missing'}), {result['closure_rows']} closure rows")
+
+        size = export_snapshot_file(sources=merged_sources(staged_files))
+        print(f"✅ Wrote {SNAPSHOT_PATH} ({size / 1024:.0f} KiB).")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -21,7 +21,7 @@ class IndustryGroup(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String(100), unique=True)
-    sector_id = Column(Integer, ForeignKey('sectors.id'))
+    sector_id = Column(Integer, ForeignKey('sectors.id'), index=True)
     sector = relationship("Sector", back_populates="industry_groups")
     industries = relationship("Industry", back_populates="industry_group")
 
@@ -31,7 +31,7 @@ class Industry(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String(100), unique=True)
-    industry_group_id = Column(Integer, ForeignKey('industry_groups.id'))
+    industry_group_id = Column(Integer, ForeignKey('industry_groups.id'), index=True)
     industry_group = relationship("IndustryGroup", back_populates="industries")
     sub_industries = relationship("SubIndustry", back_populates="industry")
 
@@ -41,7 +41,7 @@ class SubIndustry(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String(100), unique=True)
-    industry_id = Column(Integer, ForeignKey('industries.id'))
+    industry_id = Column(Integer, ForeignKey('industries.id'), index=True)
     industry = relationship("Industry", back_populates="sub_industries")
 
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, create_engine
+from sqlalchemy import Column, String, Integer, ForeignKey, Index, create_engine
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -14,7 +14,7 @@ class IndustryGroup(Base):
     __tablename__ = "industry_groups"
     code = Column(String, primary_key=True)  # 👈 ADD THIS
     name = Column(String, nullable=False)
-    sector_code = Column(String, ForeignKey("sectors.code"))
+    sector_code = Column(String, ForeignKey("sectors.code"), index=True)
     sector = relationship("Sector", back_populates="industry_groups")
     industries = relationship("Industry", back_populates="industry_group")
 
@@ -23,7 +23,7 @@ class Industry(Base):
     __tablename__ = "industries"
     code = Column(String, primary_key=True)  # 👈 ADD THIS
     name = Column(String, nullable=False)
-    industry_group_code = Column(String, ForeignKey("industry_groups.code"))
+    industry_group_code = Column(String, ForeignKey("industry_groups.code"), index=True)
     industry_group = relationship("IndustryGroup", back_populates="industries")
     sub_industries = relationship("SubIndustry", back_populates="industry")
 
@@ -32,8 +32,51 @@ class SubIndustry(Base):
     __tablename__ = "sub_industries"
     code = Column(String, primary_key=True)  # 👈 ADD THIS
     name = Column(String, nullable=False)
-    industry_code = Column(String, ForeignKey("industries.code"))
+    industry_code = Column(String, ForeignKey("industries.code"), index=True)
     industry = relationship("Industry", back_populates="sub_industries")
+    national_industries = relationship("NationalIndustry", back_populates="sub_industry")
+
+
+class NationalIndustry(Base):
+    __tablename__ = "national_industries"
+    code = Column(String, primary_key=True)  # 6-digit national industry
+    name = Column(String, nullable=False)
+    sub_industry_code = Column(String, ForeignKey("sub_industries.code"), index=True)
+    sub_industry = relationship("SubIndustry", back_populates="national_industries")
+
+
+# --- Versioned store: every loaded NAICS release, sharing unchanged nodes ---
+class NaicsRelease(Base):
+    __tablename__ = "naics_releases"
+    release = Column(String, primary_key=True)  # e.g. "2017", "2022"
+    bit = Column(Integer, nullable=False, unique=True)  # position in NaicsNode.releases
+    source = Column(String)
+    node_count = Column(Integer, nullable=False, default=0)
+
+
+class NaicsNode(Base):
+    """One (code, title, parent) definition; ``releases`` is a bitmask of the releases containing it."""
+    __tablename__ = "naics_nodes"
+    id = Column(Integer, primary_key=True)
+    code = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    level = Column(Integer, nullable=False)
+    parent_code = Column(String)
+    releases = Column(Integer, nullable=False, default=0)
+    __table_args__ = (Index("ix_naics_nodes_definition", "code", "name", "parent_code", unique=True),)
+
+
+class NaicsChange(Base):
+    """Precomputed diff between two releases, keyed for "what changed under sector X" lookups."""
+    __tablename__ = "naics_changes"
+    from_release = Column(String, primary_key=True)
+    to_release = Column(String, primary_key=True)
+    sector_code = Column(String, primary_key=True)
+    code = Column(String, primary_key=True)
+    change = Column(String, nullable=False)  # added / removed / renamed / moved / content
+    indicator = Column(String)  # Census change indicator in the newer release, if any
+    old_name = Column(String)
+    new_name = Column(String)
 
 def create_tables_if_not_exist(database_url: str):
     print(f"Connecting to database: {database_url}")
@@ -1,122 +1,82 @@
-from typing import List, Set, Tuple, Optional
-from sqlalchemy.orm import Session
-from models.naics_models import Sector, IndustryGroup, Industry, SubIndustry
-from rapidfuzz import fuzz
-
-def highlight_keyword(text: str, keyword: str) -> str:
-    if not keyword:
-        return text
-    keyword_lower = keyword.lower()
-    if keyword_lower in text.lower():
-        index = text.lower().index(keyword_lower)
-        return (
-            text[:index] +
-            f"<span style='background-color: #ffff66'><b>{text[index:index+len(keyword)]}</b></span>" +
-            text[index+len(keyword):]
-        )
-    return text
-
-def search_naics_hierarchy(session: Session, keyword: str) -> Tuple[List[Sector], Optional[str]]:
+from typing import List
+from utils.hierarchy_snapshot import HierarchySnapshot
+from utils.fts_index import match_search_index
+from utils.fuzzy_index import get_fuzzy_index
+from utils.incremental_search import incremental_matches
+from utils.profiling import span
+from utils.ranking import bm25_scores, rank_matches
+from utils.search_results import MatchView, SearchResult, SEARCH_CACHE, find_spans, normalize_query
+
+def _result(snapshot: HierarchySnapshot, matches: List[MatchView], scores: List[float], suggestion=None) -> SearchResult:
+    sectors = sorted({snapshot.sector_of(match.node) for match in matches})
+    return SearchResult(tuple(sectors), rank_matches(matches, scores), suggestion)
+
+def _view(snapshot: HierarchySnapshot, node: int, spans) -> MatchView:
+    node = int(node)
+    return MatchView(node, snapshot.codes[node], int(snapshot.levels[node]), snapshot.names[node], spans)
+
+def search_naics_hierarchy(snapshot: HierarchySnapshot, keyword: str, engine=None,
+                           incremental: bool = False) -> SearchResult:
     """
-    Smart search with All Keywords → Partial → Fuzzy.
-    Returns matching sectors and an optional 'did you mean' suggestion.
+    Smart search with All Keywords → Partial → Fuzzy; matches are ranked best first
+    (BM25 across all levels for keyword hits, similarity for fuzzy ones).
+    Results are immutable views cached per (taxonomy, data version, normalized query);
+    the engine is only touched on a cache miss.
+    With ``incremental`` (search-as-you-type) the keyword tiers are answered in memory,
+    narrowing the candidates of an earlier prefix of the query when one is cached.
     """
-    keyword = keyword.strip()
-    if not keyword:
-        return session.query(Sector).all(), None
-
-    words = keyword.split()
-    matching_sectors: Set[Sector] = set()
-    suggestion = None  # typo suggestion
-
-    # === 1. All Keywords Match ===
-    def match_all_keywords(queryset, field_getter):
-        q = queryset
-        for word in words:
-            q = q.filter(field_getter().ilike(f"%{word}%"))
-        return q.all()
-
-    subs = match_all_keywords(session.query(SubIndustry), lambda: SubIndustry.name)
-    for sub in subs:
-        sub.name = highlight_keyword(sub.name, keyword)
-        if sub.industry:
-            matching_sectors.add(sub.industry.industry_group.sector)
-
-    inds = match_all_keywords(session.query(Industry), lambda: Industry.name)
-    for ind in inds:
-        ind.name = highlight_keyword(ind.name, keyword)
-        matching_sectors.add(ind.industry_group.sector)
-
-    igs = match_all_keywords(session.query(IndustryGroup), lambda: IndustryGroup.name)
-    for ig in igs:
-        ig.name = highlight_keyword(ig.name, keyword)
-        matching_sectors.add(ig.sector)
-
-    secs = match_all_keywords(session.query(Sector), lambda: Sector.name)
-    for sec in secs:
-        sec.name = highlight_keyword(sec.name, keyword)
-        matching_sectors.add(sec)
-
-    # === 2. Partial Match ===
-    if not matching_sectors:
-        partial_query = f"%{keyword}%"
-
-        subs = session.query(SubIndustry).filter(SubIndustry.name.ilike(partial_query)).all()
-        for sub in subs:
-            sub.name = highlight_keyword(sub.name, keyword)
-            if sub.industry:
-                matching_sectors.add(sub.industry.industry_group.sector)
-
-        inds = session.query(Industry).filter(Industry.name.ilike(partial_query)).all()
-        for ind in inds:
-            ind.name = highlight_keyword(ind.name, keyword)
-            matching_sectors.add(ind.industry_group.sector)
-
-        igs = session.query(IndustryGroup).filter(IndustryGroup.name.ilike(partial_query)).all()
-        for ig in igs:
-            ig.name = highlight_keyword(ig.name, keyword)
-            matching_sectors.add(ig.sector)
-
-        secs = session.query(Sector).filter(Sector.name.ilike(partial_query)).all()
-        for sec in secs:
-            sec.name = highlight_keyword(sec.name, keyword)
-            matching_sectors.add(sec)
+    query = normalize_query(keyword)
+    if not query:
+        return SearchResult(tuple(int(s) for s in snapshot.roots), ())
+    key = ("naics", snapshot.version, query)
+    return SEARCH_CACHE.get_or_compute(key, lambda: _search_naics(snapshot, query, engine, incremental))
+
+def _search_naics(snapshot: HierarchySnapshot, query: str, engine=None, incremental: bool = False) -> SearchResult:
+    words = query.split()
+    names = snapshot.names_lower
+
+    # === 1 + 2. All Keywords / Partial Match via FTS5 ===
+    fts_hits = None
+    if engine is not None and not incremental:
+        with span("naics.search.fts"), engine.connect() as conn:
+            fts_hits = match_search_index(conn, words, query)
+    if incremental:
+        # A name containing the whole query contains every word, so Partial adds nothing here
+        with span("naics.search.incremental"):
+            nodes = incremental_matches(snapshot, query).tolist()
+    elif fts_hits is not None:
+        nodes = [snapshot.find(hit.code, hit.level) for hit in fts_hits]
+        nodes = [node for node in nodes if node is not None]
+    else:
+        with span("naics.search.scan"):
+            # === 1. All Keywords Match ===
+            nodes = [i for i, name in enumerate(names) if all(word in name for word in words)]
+
+            # === 2. Partial Match ===
+            if not nodes:
+                nodes = [i for i, name in enumerate(names) if query in name]
+
+    if nodes:
+        with span("naics.search.rank"):
+            return _result(snapshot, [_view(snapshot, i, find_spans(snapshot.names[i], words)) for i in nodes],
+                           bm25_scores(snapshot, nodes, query))
 
     # === 3. Fuzzy Match with Suggestion ===
-    if not matching_sectors:
-        all_names = (
-            session.query(SubIndustry.name).all() +
-            session.query(Industry.name).all() +
-            session.query(IndustryGroup.name).all() +
-            session.query(Sector.name).all()
-        )
-        all_flat = [name for (name,) in all_names]
-        scored = [(name, fuzz.partial_ratio(keyword.lower(), name.lower())) for name in all_flat]
-        best_match = max(scored, key=lambda x: x[1], default=(None, 0))
-
-        if best_match[1] > 80:
-            suggestion = best_match[0]
-
-        # Fuzzy fallback (same as before)
-        def fuzzy_top_matches(items, name_attr):
-            scored = [(item, fuzz.partial_ratio(keyword.lower(), getattr(item, name_attr).lower())) for item in items]
-            return [i for i, score in sorted(scored, key=lambda x: x[1], reverse=True) if score > 80][:10]
-
-        for sub in fuzzy_top_matches(session.query(SubIndustry).all(), "name"):
-            sub.name = highlight_keyword(sub.name, keyword)
-            if sub.industry:
-                matching_sectors.add(sub.industry.industry_group.sector)
-
-        for ind in fuzzy_top_matches(session.query(Industry).all(), "name"):
-            ind.name = highlight_keyword(ind.name, keyword)
-            matching_sectors.add(ind.industry_group.sector)
-
-        for ig in fuzzy_top_matches(session.query(IndustryGroup).all(), "name"):
-            ig.name = highlight_keyword(ig.name, keyword)
-            matching_sectors.add(ig.sector)
-
-        for sec in fuzzy_top_matches(session.query(Sector).all(), "name"):
-            sec.name = highlight_keyword(sec.name, keyword)
-            matching_sectors.add(sec)
-
-    return list(matching_sectors), suggestion
\ No newline at end of file
+    with span("naics.search.fuzzy"):
+        fuzzy_nodes, fuzzy_scores = get_fuzzy_index(snapshot).search(query)
+    suggestion = snapshot.names[fuzzy_nodes[0]] if len(fuzzy_nodes) else None
+
+    # Top 10 fuzzy hits per level, ranked by similarity
+    from rapidfuzz import fuzz  # only the fuzzy tier needs it
+
+    matches, scores = [], []
+    fuzzy_levels = snapshot.levels[fuzzy_nodes]
+    for level in range(len(snapshot.level_names)):
+        at_level = fuzzy_levels == level
+        for node, score in zip(fuzzy_nodes[at_level][:10], fuzzy_scores[at_level][:10]):
+            alignment = fuzz.partial_ratio_alignment(query, names[node])
+            spans = ((alignment.dest_start, alignment.dest_end),) if alignment.dest_end > alignment.dest_start else ()
+            matches.append(_view(snapshot, node, spans))
+            scores.append(round(float(score), 4))
+
+    return _result(snapshot, matches, scores, suggestion)
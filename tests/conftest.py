@@ -0,0 +1,52 @@
+"""
+Shared fixtures. The databases and snapshot file are built from the committed CSVs by the
+real loaders into a temporary directory, and the environment points every module at them
+before anything from the app is imported.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = tempfile.mkdtemp(prefix="gics-app-tests-")
+NAICS_DB = os.path.join(DATA_DIR, "naics.db")
+GICS_DB = os.path.join(DATA_DIR, "gics.db")
+
+os.environ.update({
+    "NAICS_DB_PATH": NAICS_DB,
+    "GICS_DB_PATH": GICS_DB,
+    "SNAPSHOT_PATH": os.path.join(DATA_DIR, "taxonomy.snap"),
+})
+sys.path.insert(0, ROOT)
+
+
+def _run_loader(script: str, database: str) -> None:
+    subprocess.run([sys.executable, script, "--database-url", f"sqlite:///{database}"],
+                   cwd=ROOT, env=os.environ, check=True, stdout=subprocess.DEVNULL)
+
+
+# GICS first, so the NAICS load can build the crosswalk against it
+_run_loader("init_db.py", GICS_DB)
+_run_loader("load_naics.py", NAICS_DB)
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def naics_snapshot():
+    from utils.db import get_engine
+    from utils.hierarchy_snapshot import build_naics_snapshot
+    return build_naics_snapshot(get_engine(NAICS_DB))
+
+
+@pytest.fixture(scope="session")
+def gics_snapshot():
+    from utils.db import get_engine
+    from utils.hierarchy_snapshot import build_gics_snapshot
+    return build_gics_snapshot(get_engine(GICS_DB))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
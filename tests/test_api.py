@@ -0,0 +1,120 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import api
+from utils.ranking import encode_cursor
+from utils.search_results import MatchView
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(api.app)
+
+
+def _search(client, q, taxonomy="naics", **params):
+    response = client.get(f"/{taxonomy}/search", params={"q": q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+# === Search tiers ===
+def test_keyword_tier_puts_the_exact_title_first(client):
+    body = _search(client, "soybean farming")
+    assert body["suggestion"] is None
+    assert [m["name"] for m in body["matches"][:2]] == ["Soybean Farming", "Soybean Farming"]
+    assert body["matches"][0]["spans"] == [[0, 7], [8, 15]]
+    assert all("soybean" in m["name"].lower() and "farming" in m["name"].lower() for m in body["matches"])
+
+
+def test_partial_tier_matches_inside_words(client):
+    names = [m["name"] for m in _search(client, "ice mill")["matches"]]
+    assert "Rice Milling" in names
+
+
+def test_fuzzy_tier_suggests_a_correction(client):
+    body = _search(client, "manufacturng")
+    assert body["suggestion"] and "Manufacturing" in body["suggestion"]
+    assert body["matches"] and "Manufacturing" in body["matches"][0]["name"]
+
+
+def test_no_match_is_an_empty_page(client):
+    body = _search(client, "xqzv")
+    assert body["total"] == 0 and body["matches"] == [] and body["next_cursor"] is None
+
+
+def test_matches_are_ranked_best_first_with_ancestors(client):
+    for taxonomy, q in (("naics", "food"), ("gics", "bank")):
+        matches = _search(client, q, taxonomy, limit=500)["matches"]
+        keys = [(-m["score"], i) for i, m in enumerate(matches)]
+        assert keys == sorted(keys)
+        assert all(m["code"] not in [a["code"] for a in m["ancestors"]] for m in matches)
+        assert all(m["ancestors"][0]["level"] == "sector" for m in matches if m["ancestors"])
+
+
+# === Cursor pagination ===
+def test_cursor_pages_cover_the_result_once(client):
+    full = _search(client, "manufacturing", limit=500)
+    seen, cursor = [], None
+    while True:
+        page = _search(client, "manufacturing", limit=7, **({"cursor": cursor} if cursor else {}))
+        assert page["total"] == full["total"]
+        seen += [m["code"] for m in page["matches"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [m["code"] for m in full["matches"]]
+
+
+def test_malformed_and_stale_cursors_are_rejected(client):
+    assert client.get("/naics/search", params={"q": "rice", "cursor": "garbage"}).status_code == 400
+    stale = encode_cursor("old-version", MatchView(0, "11", 0, "x", (), 1.0))
+    response = client.get("/naics/search", params={"q": "rice", "cursor": stale})
+    assert response.status_code == 400 and "older version" in response.json()["detail"]
+
+
+# === ETag / 304 ===
+def test_etag_answers_if_none_match_with_304(client):
+    first = client.get("/naics/codes/311111")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and etag.startswith('"naics-')
+    again = client.get("/naics/codes/311111", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b"" and again.headers["etag"] == etag
+    assert client.get("/gics/sectors", headers={"If-None-Match": etag}).status_code == 200
+
+
+# === Codes, subtrees, releases ===
+def test_lookup_returns_ancestors_and_children(client):
+    body = client.get("/naics/codes/3111").json()
+    assert [a["code"] for a in body["ancestors"]] == ["31-33", "311"]
+    assert {c["code"] for c in body["children"]} and all(c["code"].startswith("3111") for c in body["children"])
+    assert client.get("/naics/codes/999999").status_code == 404
+    assert client.get("/naics/codes/311", params={"level": "galaxy"}).status_code == 400
+
+
+def test_subtree_nests_children_to_the_requested_depth(client):
+    shallow = client.get("/naics/codes/311/subtree", params={"depth": 1}).json()
+    assert shallow["code"] == "311" and shallow["children"]
+    assert all("children" not in child or child["children"] == [] for child in shallow["children"])
+    deep = client.get("/naics/codes/311/subtree").json()
+    assert any(child["children"] for child in deep["children"])
+
+
+def test_release_search_needs_a_loaded_naics_release(client):
+    assert client.get("/naics/search", params={"q": "rice", "release": "1987"}).status_code == 404
+    assert client.get("/gics/search", params={"q": "bank", "release": "2022"}).status_code == 400
+
+
+# === Crosswalk and classification ===
+def test_crosswalk_both_directions(client):
+    forward = client.get("/crosswalk/naics/325412").json()
+    best = forward["matches"][0]
+    assert best["gics_name"] == "Pharmaceuticals" and best["gics_path"][-1] == "Pharmaceuticals"
+    reverse = client.get(f"/crosswalk/gics/{best['gics_id']}", params={"limit": 5}).json()
+    assert "325412" in [row["code"] for row in reverse]
+
+
+def test_classify_returns_candidates_per_description(client):
+    body = client.post("/classify", json={"descriptions": ["soybean farming", "zzzz"], "top_k": 2}).json()
+    assert [row["description"] for row in body] == ["soybean farming", "zzzz"]
+    assert body[0]["naics"][0]["code"] == "111110"
+    assert body[1]["naics"] == [] and body[1]["gics"] == []
@@ -0,0 +1,35 @@
+import pytest
+
+from utils.batch_classifier import MIN_SCORE, BatchClassifier
+
+DESCRIPTIONS = ["rice farm", "airline", "pharmaceutical company", "dog food manufacturer", "xyzzy", ""]
+
+
+@pytest.fixture(scope="module")
+def results(naics_snapshot, gics_snapshot):
+    return dict(zip(DESCRIPTIONS, BatchClassifier(naics_snapshot, gics_snapshot).classify(DESCRIPTIONS, top_k=3)))
+
+
+def _names(candidates):
+    return [candidate.name for candidate in candidates]
+
+
+def test_confident_matches_rank_first(results):
+    assert _names(results["rice farm"]["naics"])[0] == "Rice Farming"
+    assert _names(results["airline"]["gics"])[0] == "Airlines"
+    assert _names(results["pharmaceutical company"]["gics"])[0] == "Pharmaceuticals"
+    assert _names(results["dog food manufacturer"]["naics"])[0] == "Dog and Cat Food Manufacturing"
+
+
+def test_weak_matches_are_dropped(results):
+    assert results["rice farm"]["gics"] == []  # was Airport Services at 56
+    assert "Automobile Manufacturers" not in _names(results["dog food manufacturer"]["gics"])
+    for description in ("xyzzy", ""):
+        assert results[description] == {"naics": [], "gics": []}
+    assert all(c.score >= MIN_SCORE for result in results.values() for cs in result.values() for c in cs)
+
+
+def test_stream_matches_in_process_scoring(naics_snapshot, gics_snapshot, results):
+    classifier = BatchClassifier(naics_snapshot, gics_snapshot)
+    streamed = list(classifier.classify_stream(DESCRIPTIONS, top_k=3, processes=1, chunk_size=2))
+    assert streamed == [results[description] for description in DESCRIPTIONS]
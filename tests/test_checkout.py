@@ -0,0 +1,77 @@
+import socket
+import time
+
+import pytest
+
+from utils.checkout import COFFEE, CircuitBreaker, create_checkout_session, get_session, serve_stub, submit_checkout
+
+
+@pytest.fixture
+def stub(request):
+    server = serve_stub(port=0, **getattr(request, "param", {}))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def test_checkout_returns_the_session_url(stub):
+    result = create_checkout_session("key", url=_url(stub), breaker=CircuitBreaker())
+    assert result.error is None and result.url.endswith(f"/checkout/{len(COFFEE)}")
+
+
+def test_submit_checkout_resolves_off_thread(stub):
+    future = submit_checkout("key", url=_url(stub))
+    assert future.result(timeout=5).url
+
+
+@pytest.mark.parametrize("stub", [{"status": 503}], indirect=True)
+def test_server_errors_are_not_retried_and_open_the_breaker(stub):
+    breaker = CircuitBreaker(threshold=3, reset_timeout=60)
+    for _ in range(3):
+        assert create_checkout_session("key", url=_url(stub), breaker=breaker).error
+    assert stub.calls == 3  # one POST per call: a request that reached the function is never resent
+    assert breaker.state == "open"
+
+    result = create_checkout_session("key", url=_url(stub), breaker=breaker)
+    assert "unavailable" in result.error and stub.calls == 3  # failed fast
+
+
+@pytest.mark.parametrize("stub", [{"status": 400}], indirect=True)
+def test_client_errors_do_not_trip_the_breaker(stub):
+    breaker = CircuitBreaker(threshold=3, reset_timeout=60)
+    for _ in range(5):
+        assert "rejected" in create_checkout_session("key", url=_url(stub), breaker=breaker).error
+    assert stub.calls == 5 and breaker.state == "closed"
+
+
+def test_half_open_trial_closes_the_breaker_again(stub):
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0.05)
+    assert create_checkout_session("key", url=_closed_port_url(), breaker=breaker).error
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert create_checkout_session("key", url=_url(stub), breaker=breaker).url
+    assert breaker.state == "closed"
+
+
+def test_only_connect_errors_are_retried():
+    retry = get_session().get_adapter("http://127.0.0.1").max_retries
+    assert retry.connect == 2 and retry.read == 0 and retry.status == 0
+    assert not retry.status_forcelist
+    assert not retry.is_retry("POST", 503)
+
+    breaker = CircuitBreaker()
+    started = time.perf_counter()
+    assert "Could not reach" in create_checkout_session("key", url=_closed_port_url(), breaker=breaker).error
+    assert time.perf_counter() - started >= 0.5  # 0 s + 0.6 s backoff between the connect attempts
+    assert breaker.failures == 1  # retries within one call are one failure
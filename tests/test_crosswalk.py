@@ -0,0 +1,42 @@
+import pytest
+
+from utils.crosswalk import MIN_SCORE, lookup_crosswalk, reverse_crosswalk
+from utils.db import NAICS_DB_PATH, get_engine
+
+# NAICS code → GICS sub-industry that must be its best match
+KNOWN_GOOD = {
+    "311": "Packaged Foods & Meats",
+    "211": "Oil & Gas Storage & Transportation",
+    "2211": "Electric Utilities",
+    "325412": "Pharmaceuticals",
+    "336110": "Automobile Manufacturers",
+    "4451": "Food Retail",
+}
+
+
+def _matches(code):
+    with get_engine(NAICS_DB_PATH).connect() as conn:
+        return lookup_crosswalk(conn, code)
+
+
+@pytest.mark.parametrize("code, best", KNOWN_GOOD.items())
+def test_known_good_mappings_rank_first(code, best):
+    matches = _matches(code)
+    assert matches and matches[0].gics_name == best
+    assert [m.rank for m in matches] == list(range(1, len(matches) + 1))
+
+
+def test_unrelated_sub_industries_are_cut_off():
+    assert _matches("111160") == []  # Rice Farming shares no word with any GICS title
+    food = [m.gics_name for m in _matches("311")]
+    assert "Packaged Foods & Meats" in food and "Electronic Manufacturing Services" not in food
+    assert "Electronic Manufacturing Services" not in [m.gics_name for m in _matches("336110")]
+
+
+def test_stored_scores_respect_the_cutoff():
+    with get_engine(NAICS_DB_PATH).connect() as conn:
+        lowest = conn.exec_driver_sql("SELECT MIN(score) FROM naics_gics_crosswalk").scalar()
+        reverse = reverse_crosswalk(conn, _matches("325412")[0].gics_id, limit=5)
+    assert lowest >= MIN_SCORE
+    assert "325412" in [m.naics_code for m in reverse]
+    assert [m.score for m in reverse] == sorted((m.score for m in reverse), reverse=True)
@@ -0,0 +1,32 @@
+import os
+import shutil
+
+from utils.db import NAICS_DB_PATH, database_fingerprint, database_version, get_engine
+from utils.snapshot_file import mapped_snapshot
+
+
+def test_fingerprint_follows_content_not_file_identity(tmp_path):
+    copy = str(tmp_path / "copy.db")
+    shutil.copy(NAICS_DB_PATH, copy)
+    assert database_version(copy) != database_version(NAICS_DB_PATH)
+    assert database_fingerprint(copy) == database_fingerprint(NAICS_DB_PATH)
+
+    # Same size and same header change counter, different bytes
+    with open(copy, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+    assert os.path.getsize(copy) == os.path.getsize(NAICS_DB_PATH)
+    assert database_fingerprint(copy) != database_fingerprint(NAICS_DB_PATH)
+    assert database_fingerprint(str(tmp_path / "absent.db")) == "missing"
+
+
+def test_loader_exported_snapshot_matches_the_live_database(naics_snapshot):
+    mapped = mapped_snapshot("naics", NAICS_DB_PATH, database_version(NAICS_DB_PATH))
+    assert mapped is not None
+    assert list(mapped.codes) == list(naics_snapshot.codes)
+
+
+def test_read_engine_is_shared_per_version():
+    assert get_engine(NAICS_DB_PATH) is get_engine(NAICS_DB_PATH)
@@ -0,0 +1,77 @@
+import os
+import shutil
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import migrate_db
+from models import models as gics_models
+from models import naics_models
+from utils.db import GICS_DB_PATH as GICS_DB, NAICS_DB_PATH as NAICS_DB, get_engine
+from utils.hierarchy_tables import (
+    ANCESTORS_SQL, CLOSURE_TABLE, MAX_DEPTH, SUBTREE_SQL, fetch_ancestors, fetch_subtree, full_scans, query_plan,
+)
+from utils.hot_reload import staged_database
+
+
+def _scans(plan):
+    return [line for line in plan if line.startswith("SCAN") or "TEMP B-TREE" in line]
+
+
+@pytest.mark.parametrize("database", [NAICS_DB, GICS_DB])
+def test_subtree_and_ancestor_queries_search_indexes(database):
+    with get_engine(database).connect() as conn:
+        subtree = query_plan(conn, SUBTREE_SQL, {"level": 1, "key": "311", "max_depth": MAX_DEPTH})
+        ancestors = query_plan(conn, ANCESTORS_SQL, {"level": 4, "key": "311111"})
+    assert subtree and not _scans(subtree)
+    assert ancestors and not _scans(ancestors)
+
+
+@pytest.mark.parametrize("database, base", [(NAICS_DB, naics_models.Base), (GICS_DB, gics_models.Base)])
+def test_foreign_key_lookups_search_indexes(database, base):
+    with get_engine(database).connect() as conn:
+        assert full_scans(conn, base) == {}
+
+
+def test_fetch_subtree_matches_snapshot(naics_snapshot):
+    node = naics_snapshot.find("3111", 2)
+    with get_engine(NAICS_DB).connect() as conn:
+        rows = fetch_subtree(conn, 2, "3111")
+        shallow = fetch_subtree(conn, 2, "3111", max_depth=1)
+    assert rows[0].key == "3111" and rows[0].depth == 0
+    assert [row.key for row in rows[1:]] == [naics_snapshot.codes[n] for n in naics_snapshot.descendants(node)]
+    assert [row.key for row in shallow[1:]] == [naics_snapshot.codes[c] for c in naics_snapshot.children(node)]
+
+
+def test_fetch_ancestors_matches_snapshot(naics_snapshot):
+    node = naics_snapshot.find("311111", 4)
+    with get_engine(NAICS_DB).connect() as conn:
+        rows = fetch_ancestors(conn, 4, "311111")
+    assert [row.key for row in rows] == [naics_snapshot.codes[a] for a in naics_snapshot.ancestors(node)]
+    assert [row.depth for row in rows] == [4, 3, 2, 1]
+
+
+def test_migration_with_a_full_scan_is_discarded(tmp_path, monkeypatch):
+    path = str(tmp_path / "naics.db")
+    shutil.copy(NAICS_DB, path)
+    before = os.stat(path)
+
+    def build_without_closure_index(engine, snapshot):
+        rows = real_build(engine, snapshot)
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX ix_{CLOSURE_TABLE}_descendant"))
+        return rows
+
+    real_build = migrate_db.build_hierarchy_tables
+    monkeypatch.setattr(migrate_db, "build_hierarchy_tables", build_without_closure_index)
+    with staged_database(f"sqlite:///{path}") as staged:
+        result = migrate_db.migrate(staged, naics_models.Base, migrate_db.build_naics_snapshot)
+
+    assert "ancestors" in result["full_scans"]
+    assert os.stat(path).st_ino == before.st_ino and os.stat(path).st_mtime_ns == before.st_mtime_ns
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".staging")]
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as conn:
+        assert full_scans(conn, naics_models.Base) == {}
+    engine.dispose()
+
@@ -0,0 +1,83 @@
+import os
+import shutil
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from utils.db import NAICS_DB_PATH, database_version, get_engine
+from utils.hierarchy_snapshot import SnapshotCache, build_naics_snapshot
+from utils.hot_reload import staged_database, staged_databases
+
+
+def _rename_sector(url, code, name):
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE sectors SET name = :name WHERE code = :code"), {"name": name, "code": code})
+    engine.dispose()
+
+
+def _wait_for(cache, version, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        snapshot = cache.get()
+        if snapshot.version == version:
+            return snapshot
+        time.sleep(0.02)
+    raise AssertionError("reloaded snapshot never went live")
+
+
+@pytest.fixture
+def live_copy(tmp_path):
+    path = str(tmp_path / "naics.db")
+    shutil.copy(NAICS_DB_PATH, path)
+    return path
+
+
+def test_swap_serves_the_old_snapshot_until_the_new_one_is_built(live_copy):
+    cache = SnapshotCache(live_copy, build_naics_snapshot)
+    old = cache.get()
+    sector = old.find("11", 0)
+
+    with staged_database(f"sqlite:///{live_copy}") as staged:
+        _rename_sector(staged.url, "11", "Farming")
+        assert cache.get() is old  # the live file is untouched while the loader writes
+    assert old.names[sector] != "Farming"
+
+    assert cache.get() is old  # the first read after the swap starts the rebuild without waiting for it
+    assert cache.engine_for(old) is None  # mid-swap: the file is already newer than the served snapshot
+    new = _wait_for(cache, database_version(live_copy))
+    assert new.names[new.find("11", 0)] == "Farming"
+    assert cache.engine_for(new) is not None
+    assert not [name for name in os.listdir(os.path.dirname(live_copy)) if name.endswith(".staging")]
+
+
+def test_failed_or_discarded_loads_leave_the_live_file_alone(live_copy):
+    before = database_version(live_copy)
+    with pytest.raises(RuntimeError):
+        with staged_database(f"sqlite:///{live_copy}") as staged:
+            _rename_sector(staged.url, "11", "Farming")
+            raise RuntimeError("loader failed")
+    with staged_database(f"sqlite:///{live_copy}") as staged:
+        _rename_sector(staged.url, "11", "Farming")
+        staged.discard()
+    assert database_version(live_copy) == before
+    assert not [name for name in os.listdir(os.path.dirname(live_copy)) if name.endswith(".staging")]
+
+
+def test_staged_databases_swap_together(tmp_path, live_copy):
+    other = str(tmp_path / "other.db")
+    shutil.copy(live_copy, other)
+    versions = [database_version(live_copy), database_version(other)]
+    with pytest.raises(RuntimeError):
+        with staged_databases(f"sqlite:///{live_copy}", f"sqlite:///{other}") as staged_files:
+            for staged in staged_files:
+                _rename_sector(staged.url, "11", "Farming")
+            raise RuntimeError("second loader failed")
+    assert [database_version(live_copy), database_version(other)] == versions
+
+    with staged_databases(f"sqlite:///{live_copy}", f"sqlite:///{other}") as staged_files:
+        for staged in staged_files:
+            _rename_sector(staged.url, "11", "Farming")
+    for path in (live_copy, other):
+        assert build_naics_snapshot(get_engine(path)).names[0] == "Farming"
@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from utils.profiling import METRIC_PREFIX, METRICS, instrument_engine, start_profile
+
+
+def _counter(name: str) -> float:
+    for line in METRICS.render().splitlines():
+        if line.startswith(f"{name} "):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def test_failed_queries_do_not_leak_start_times():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    errors = _counter(f"{METRIC_PREFIX}_sql_errors_total")
+    profile = start_profile("test")
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        assert not conn.info.get("query_start")
+        conn.execute(text("SELECT 1")).all()
+        assert not conn.info.get("query_start")
+    engine.dispose()
+
+    assert profile.queries == 1
+    assert _counter(f"{METRIC_PREFIX}_sql_errors_total") == errors + 3
@@ -0,0 +1,42 @@
+import pytest
+
+from gics_search_utils import search_gics_hierarchy
+from naics_search_utils import search_naics_hierarchy
+from utils.db import GICS_DB_PATH, NAICS_DB_PATH, get_engine
+from utils.incremental_search import CANDIDATE_CACHE
+from utils.search_results import SEARCH_CACHE
+
+QUERIES = ["rice milling", "motor vehicle parts", "oil and gas", "food", "soft drink", "ice mill"]
+
+
+def _nodes(search, snapshot, query, engine=None, incremental=False):
+    SEARCH_CACHE.clear()  # the three paths share cache keys
+    return {m.node for m in search(snapshot, query, engine, incremental=incremental).matches}
+
+
+def _prefixes(query):
+    return [query[:end] for end in range(1, len(query) + 1)]
+
+
+@pytest.mark.parametrize("taxonomy", ["naics", "gics"])
+@pytest.mark.parametrize("query", QUERIES)
+def test_fts_incremental_and_scan_agree_on_every_keystroke(taxonomy, query, request):
+    search, database = {"naics": (search_naics_hierarchy, NAICS_DB_PATH),
+                        "gics": (search_gics_hierarchy, GICS_DB_PATH)}[taxonomy]
+    snapshot = request.getfixturevalue(f"{taxonomy}_snapshot")
+    engine = get_engine(database)
+    CANDIDATE_CACHE.clear()
+    for prefix in _prefixes(query):
+        scan = _nodes(search, snapshot, prefix)
+        assert _nodes(search, snapshot, prefix, engine) == scan, prefix
+        assert _nodes(search, snapshot, prefix, incremental=True) == scan, prefix
+
+
+def test_typing_ranks_the_same_as_a_fresh_search(naics_snapshot):
+    CANDIDATE_CACHE.clear()
+    for prefix in _prefixes("rice mill"):
+        SEARCH_CACHE.clear()
+        typed = search_naics_hierarchy(naics_snapshot, prefix, incremental=True)
+        SEARCH_CACHE.clear()
+        fresh = search_naics_hierarchy(naics_snapshot, prefix)
+        assert [(m.node, m.score) for m in typed.matches] == [(m.node, m.score) for m in fresh.matches]
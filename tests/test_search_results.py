@@ -0,0 +1,12 @@
+from utils.search_results import find_spans, highlight_spans
+
+
+def test_find_spans_merges_overlapping_terms_case_insensitively():
+    assert find_spans("Rice Milling and rice", ["rice", "ice m"]) == ((0, 6), (17, 21))
+    assert find_spans("Rice", ["", "wheat"]) == ()
+
+
+def test_highlight_spans_escapes_every_piece():
+    html = highlight_spans("Oil & <Gas>", find_spans("Oil & <Gas>", ["gas"]))
+    assert html.startswith("Oil &amp; &lt;<span") and "<b>Gas</b>" in html and html.endswith("&gt;")
+    assert highlight_spans("<b>", ()) == "&lt;b&gt;"
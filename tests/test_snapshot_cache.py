@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from utils.db import database_version
+from utils.hierarchy_snapshot import SnapshotCache
+
+
+class FlakyBuilder:
+    """Stand-in snapshot builder that fails on the versions in ``failing``."""
+
+    def __init__(self):
+        self.calls = []
+        self.failing = set()
+        self.done = threading.Event()
+
+    def __call__(self, engine, version):
+        self.calls.append(version)
+        self.done.set()
+        if version in self.failing:
+            raise RuntimeError("half-written file")
+        return SimpleNamespace(version=version)
+
+
+def _rewrite(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))  # a new version even within one tick
+
+
+def _wait(builder):
+    assert builder.done.wait(5)
+    builder.done.clear()
+    time.sleep(0.05)  # let the reload thread publish its result
+
+
+def test_swapped_file_is_reloaded_in_the_background(tmp_path):
+    path = str(tmp_path / "data.db")
+    _rewrite(path, "v1")
+    builder = FlakyBuilder()
+    cache = SnapshotCache(path, builder)
+    first = cache.get()
+    assert first.version == database_version(path)
+    assert cache.engine_for(first) is not None
+
+    builder.done.clear()
+    _rewrite(path, "v2")
+    assert cache.get() is first  # served from the old snapshot while the new one builds
+    assert cache.engine_for(first) is None
+    _wait(builder)
+    assert cache.get().version == database_version(path)
+
+
+def test_failed_reload_is_not_retried_on_every_get(tmp_path):
+    path = str(tmp_path / "data.db")
+    _rewrite(path, "v1")
+    builder = FlakyBuilder()
+    cache = SnapshotCache(path, builder, retry_after=0.3)
+    first = cache.get()
+
+    builder.done.clear()
+    _rewrite(path, "broken")
+    broken = database_version(path)
+    builder.failing.add(broken)
+    cache.get()
+    _wait(builder)
+    for _ in range(20):
+        assert cache.get() is first
+    time.sleep(0.05)
+    assert builder.calls.count(broken) == 1
+
+    time.sleep(0.3)
+    builder.failing.clear()
+    cache.get()  # retry window has passed
+    _wait(builder)
+    assert builder.calls.count(broken) == 2
+    assert cache.get().version == broken
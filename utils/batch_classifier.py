@@ -0,0 +1,136 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+from rapidfuzz import fuzz, process, utils as fuzz_utils
+
+CHUNK_SIZE = 2_000
+# token_set_ratio below this is character-level noise, and a candidate must also share
+# a meaningful word: "rice farm" scored GICS Airport Services at 56 on letters alone
+MIN_SCORE = 60.0
+WORD_PREFIX = 5  # words compare on their first letters, so "restaurant" meets "Restaurants"
+STOPWORDS = frozenset({
+    "and", "or", "of", "the", "for", "in", "on", "to", "with", "except", "other", "all",
+    "inc", "company", "companies", "service", "services", "product", "products", "equipment",
+    "manufacturer", "manufacturers", "manufacturing",
+})
+
+
+class Candidate(NamedTuple):
+    code: str
+    name: str
+    level: str
+    score: float
+
+
+class Corpus(NamedTuple):
+    """Pre-processed names of one taxonomy; plain lists so it pickles cheaply to workers."""
+    taxonomy: str
+    codes: List[str]
+    names: List[str]
+    levels: List[str]
+    processed: List[str]
+    words: List[frozenset]
+
+
+def _words(processed: str) -> frozenset:
+    return frozenset(word[:WORD_PREFIX] for word in processed.split() if word not in STOPWORDS)
+
+
+def build_corpus(snapshot, leaf_only: bool = True) -> Corpus:
+    """Names to score against; by default only the most specific level of each taxonomy."""
+    deepest = len(snapshot.level_names) - 1
+    nodes = [i for i in range(len(snapshot)) if not leaf_only or snapshot.levels[i] == deepest]
+    processed = [fuzz_utils.default_process(snapshot.names[i]) for i in nodes]
+    return Corpus(
+        snapshot.taxonomy,
+        [snapshot.codes[i] for i in nodes],
+        [snapshot.names[i] for i in nodes],
+        [snapshot.level_names[snapshot.levels[i]] for i in nodes],
+        processed,
+        [_words(name) for name in processed],
+    )
+
+
+def score_chunk(corpora: Sequence[Corpus], descriptions: Sequence[str], top_k: int,
+                workers: int = 1, min_score: float = MIN_SCORE) -> List[Dict[str, List[Candidate]]]:
+    """
+    Top-k candidates per description and taxonomy from one cdist call per corpus. A
+    candidate must score at least ``min_score`` and share a word with the description;
+    a description with none gets an empty list rather than a confident guess.
+    """
+    queries = [fuzz_utils.default_process(d or "") for d in descriptions]
+    query_words = [_words(query) for query in queries]
+    results: List[Dict[str, List[Candidate]]] = [{} for _ in queries]
+    for corpus in corpora:
+        scores = process.cdist(queries, corpus.processed, scorer=fuzz.token_set_ratio,
+                               dtype=np.uint8, workers=workers)
+        # Look a little past k: a high scorer without a shared word makes room for the next one
+        k = min(top_k * 3, scores.shape[1])
+        top = np.argpartition(scores, -k, axis=1)[:, -k:] if k else np.empty((len(queries), 0), int)
+        for row, result in enumerate(results):
+            ranked = sorted((col for col in top[row] if scores[row, col] >= min_score
+                             and query_words[row] & corpus.words[col]),
+                            key=lambda col: (-int(scores[row, col]), col))
+            result[corpus.taxonomy] = [
+                Candidate(corpus.codes[col], corpus.names[col], corpus.levels[col], float(scores[row, col]))
+                for col in ranked[:top_k]
+            ]
+    return results
+
+
+_worker_corpora: Optional[Sequence[Corpus]] = None
+
+
+def _init_worker(corpora: Sequence[Corpus]) -> None:
+    global _worker_corpora
+    _worker_corpora = corpora
+
+
+def _score_in_worker(descriptions: Sequence[str], top_k: int, min_score: float):
+    return score_chunk(_worker_corpora, descriptions, top_k, min_score=min_score)
+
+
+def _chunks(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BatchClassifier:
+    """Maps free-text company descriptions to their closest NAICS and GICS codes."""
+
+    def __init__(self, naics_snapshot, gics_snapshot, leaf_only: bool = True, min_score: float = MIN_SCORE):
+        self.corpora = (build_corpus(naics_snapshot, leaf_only), build_corpus(gics_snapshot, leaf_only))
+        self.min_score = min_score
+
+    def classify(self, descriptions: Sequence[str], top_k: int = 5) -> List[Dict[str, List[Candidate]]]:
+        """In-process scoring; rapidfuzz spreads each cdist call over all cores."""
+        return score_chunk(self.corpora, descriptions, top_k, workers=-1, min_score=self.min_score)
+
+    def classify_stream(self, descriptions: Iterable[str], top_k: int = 5, processes: Optional[int] = None,
+                        chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, List[Candidate]]]:
+        """
+        Score an arbitrarily long stream in chunks across a process pool, yielding results
+        in input order. Corpora are sent to each worker once, not per chunk.
+        """
+        processes = processes or os.cpu_count() or 1
+        if processes == 1:
+            for chunk in _chunks(descriptions, chunk_size):
+                yield from score_chunk(self.corpora, chunk, top_k, min_score=self.min_score)
+            return
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(self.corpora,)) as pool:
+            pending = []
+            for chunk in _chunks(descriptions, chunk_size):
+                pending.append(pool.submit(_score_in_worker, chunk, top_k, self.min_score))
+                # Bound the number of chunks in flight so huge inputs don't pile up in memory
+                if len(pending) >= processes * 2:
+                    yield from pending.pop(0).result()
+            for future in pending:
+                yield from future.result()
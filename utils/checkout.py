@@ -0,0 +1,193 @@
+"""
+Stripe checkout via the Supabase edge function, kept off the Streamlit render thread.
+
+Calls go through one pooled ``requests.Session`` with connect/read timeouts, behind a
+circuit breaker that fails fast while the function is down. Creating a checkout session
+is not idempotent, so only failed connects are retried (the request never left); a POST
+that reached the function is never sent twice. 4xx answers mean the function is up and
+do not count against the breaker. ``submit_checkout`` returns a Future; the app
+stores it in session state and shows the result on a later rerun.
+
+Run a local stand-in for the edge function (point CHECKOUT_URL at it):
+
+    python -m utils.checkout --stub --port 8787 [--delay 3] [--fail | --status 400]
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+CHECKOUT_URL = os.getenv("CHECKOUT_URL", "https://oqviryuptkdwbcbwkyxc.supabase.co/functions/v1/create-checkout-session")
+TIMEOUT = (3.05, 10.0)  # (connect, read) seconds
+RETRIES = 2
+POOL_SIZE = 10
+FAILURE_THRESHOLD = 3   # consecutive failures that open the circuit
+RESET_TIMEOUT = 30.0    # seconds before a single trial call is let through
+
+COFFEE = [{"name": "Coffee", "price": 500, "quantity": 1}]
+
+
+class CheckoutResult(NamedTuple):
+    url: Optional[str] = None
+    error: Optional[str] = None
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Closed → open after ``threshold`` consecutive failures → half-open (one trial) after ``reset_timeout``."""
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half-open" and self._trial):
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+                raise CircuitOpenError(f"checkout is unavailable; retrying in {retry_in:.0f}s")
+            self._trial = state == "half-open"
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures, self.opened_at, self._trial = 0, None, False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+BREAKER = CircuitBreaker()
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="checkout")
+
+
+def get_session() -> "requests.Session":
+    """Process-wide session; connections to the edge function are kept alive and reused."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # requests is only imported once someone actually buys a coffee
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            # Connect errors only: after a read timeout or a 5xx the session may already exist.
+            # (The default allowed_methods leave POST out of read retries as well.)
+            retry = Retry(total=RETRIES, connect=RETRIES, read=0, status=0, other=0, backoff_factor=0.3,
+                          raise_on_status=False)
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_maxsize=POOL_SIZE, max_retries=retry))
+            session.mount("http://", HTTPAdapter(pool_maxsize=POOL_SIZE, max_retries=retry))
+            _session = session
+        return _session
+
+
+def create_checkout_session(anon_key: str, items: List[dict] = COFFEE, url: str = CHECKOUT_URL,
+                            breaker: CircuitBreaker = BREAKER) -> CheckoutResult:
+    """Blocking call to the edge function; never raises, errors come back in the result."""
+    from requests import HTTPError, RequestException
+
+    try:
+        breaker.before_call()
+    except CircuitOpenError as e:
+        return CheckoutResult(error=str(e))
+    try:
+        response = get_session().post(
+            url,
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {anon_key}"},
+            json={"items": items},
+            timeout=TIMEOUT,
+        )
+        response.raise_for_status()
+        checkout_url = response.json().get("url")
+    except HTTPError as e:
+        if e.response is not None and e.response.status_code < 500:
+            breaker.record_success()  # the function answered; it refused this request
+            return CheckoutResult(error=f"Checkout function rejected the request: {e}")
+        breaker.record_failure()
+        return CheckoutResult(error=f"Checkout function failed: {e}")
+    except (RequestException, ValueError) as e:
+        breaker.record_failure()
+        return CheckoutResult(error=f"Could not reach checkout function: {e}")
+    breaker.record_success()
+    if not checkout_url:
+        return CheckoutResult(error="No checkout URL returned.")
+    return CheckoutResult(url=checkout_url)
+
+
+def submit_checkout(anon_key: str, items: List[dict] = COFFEE, url: str = CHECKOUT_URL) -> Future:
+    """Run create_checkout_session on the worker pool; the Future resolves to a CheckoutResult."""
+    return _executor.submit(create_checkout_session, anon_key, items, url)
+
+
+# === Local stub of the edge function ===
+def serve_stub(port: int = 8787, delay: float = 0.0, status: int = 200):
+    """
+    Answer POSTs like the Supabase function after ``delay`` seconds, or with ``status`` when
+    it is not 200. ``port=0`` picks a free port (see ``server.server_address``); the server
+    counts the POSTs it received in ``server.calls``.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            self.server.calls += 1
+            time.sleep(delay)
+            if status != 200:
+                self.send_response(status)
+                self.end_headers()
+                return
+            port = self.server.server_address[1]
+            payload = json.dumps({"url": f"http://127.0.0.1:{port}/checkout/{len(body.get('items', []))}"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.calls = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Checkout client utilities.")
+    parser.add_argument("--stub", action="store_true", help="Serve a local stand-in for the edge function")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--fail", action="store_true", help="Answer every call with 503")
+    parser.add_argument("--status", type=int, default=200, help="Answer every call with this status")
+    args = parser.parse_args()
+    if args.stub:
+        serve_stub(args.port, args.delay, 503 if args.fail else args.status)
+        print(f"✅ Stub checkout function on http://127.0.0.1:{args.port} (CHECKOUT_URL=http://127.0.0.1:{args.port})")
+        threading.Event().wait()
+    else:
+        print(create_checkout_session(os.getenv("SUPABASE_ANON_KEY", "")))
@@ -0,0 +1,127 @@
+import re
+import threading
+import weakref
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+_RANGE_CODE = re.compile(r"^(\d+)-(\d+)$")
+
+
+class CodeInfo(NamedTuple):
+    code: str
+    name: str
+    level: str
+    parent: Optional[str]
+    ancestors: List[str]
+
+
+class CodeIndex:
+    """
+    Exact-code lookup and prefix ranges over a NAICS snapshot.
+
+    ``find`` is a dict probe. Codes are also kept sorted, and NAICS codes extend
+    their parent's code, so "everything under 3111" is one contiguous slice found
+    with two binary searches. Range sectors ("31-33") also answer to each
+    two-digit code they cover.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self._nodes: Dict[str, int] = {code: i for i, code in enumerate(snapshot.codes)}
+        self._aliases: Dict[str, int] = {}
+        for root in snapshot.roots:
+            match = _RANGE_CODE.match(snapshot.codes[root])
+            if match:
+                for code in range(int(match.group(1)), int(match.group(2)) + 1):
+                    self._aliases[str(code)] = int(root)
+
+        order = np.argsort(np.asarray(snapshot.codes, dtype=str), kind="stable")
+        self.sorted_codes = np.asarray(snapshot.codes, dtype=str)[order]
+        self.sorted_nodes = order.astype(np.int32)
+        self.sorted_codes.flags.writeable = False
+        self.sorted_nodes.flags.writeable = False
+
+        # Bulk lookups search codes and range-sector aliases together
+        lookup_codes = np.concatenate([self.sorted_codes, np.asarray(list(self._aliases), dtype=str)])
+        lookup_nodes = np.concatenate([self.sorted_nodes, np.asarray(list(self._aliases.values()), dtype=np.int32)])
+        lookup_order = np.argsort(lookup_codes, kind="stable")
+        self._lookup_codes = lookup_codes[lookup_order]
+        self._lookup_nodes = lookup_nodes[lookup_order]
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, code) -> bool:
+        return self.find(code) is not None
+
+    def find(self, code) -> Optional[int]:
+        code = str(code).strip()
+        node = self._nodes.get(code)
+        return node if node is not None else self._aliases.get(code)
+
+    def info(self, code) -> Optional[CodeInfo]:
+        node = self.find(code)
+        if node is None:
+            return None
+        snapshot = self.snapshot
+        parent = int(snapshot.parents[node])
+        return CodeInfo(
+            code=snapshot.codes[node],
+            name=snapshot.names[node],
+            level=snapshot.level_names[snapshot.levels[node]],
+            parent=snapshot.codes[parent] if parent >= 0 else None,
+            ancestors=self.ancestors(code),
+        )
+
+    def ancestors(self, code) -> List[str]:
+        """Ancestor codes from the sector down to the direct parent ([] if unknown)."""
+        node = self.find(code)
+        if node is None:
+            return []
+        return [self.snapshot.codes[a] for a in self.snapshot.ancestors(node)]
+
+    def prefix_range(self, prefix: str) -> np.ndarray:
+        """Nodes whose code starts with ``prefix``, in code order (two binary searches)."""
+        prefix = str(prefix).strip()
+        node = self._nodes.get(prefix)
+        if node is not None:
+            # A known code's subtree is already contiguous in the pre-order snapshot
+            return np.arange(node, int(self.snapshot.subtree_end[node]), dtype=np.int32)
+        lo = np.searchsorted(self.sorted_codes, prefix, side="left")
+        hi = np.searchsorted(self.sorted_codes, prefix + "\uffff", side="left")
+        return self.sorted_nodes[lo:hi]
+
+    def under(self, prefix: str, include_self: bool = False) -> List[str]:
+        """Codes under ``prefix`` ("3111" → 31111x national industries ...)."""
+        prefix = str(prefix).strip()
+        codes = [self.snapshot.codes[i] for i in self.prefix_range(prefix)]
+        if not include_self and codes and codes[0] == prefix:
+            codes = codes[1:]
+        return codes
+
+    def find_many(self, codes: Iterable) -> np.ndarray:
+        """Vectorized ``find``: node index per input code, -1 where the code is unknown."""
+        values = np.char.strip(np.asarray(codes if isinstance(codes, np.ndarray) else list(codes), dtype=str))
+        if not len(values):
+            return np.empty(0, dtype=np.int32)
+        pos = np.searchsorted(self._lookup_codes, values)
+        pos = np.minimum(pos, len(self._lookup_codes) - 1)
+        return np.where(self._lookup_codes[pos] == values, self._lookup_nodes[pos], -1).astype(np.int32)
+
+    def validate(self, codes: Iterable) -> np.ndarray:
+        """Boolean mask of which codes exist; suited to validating millions of stored codes at once."""
+        return self.find_many(codes) >= 0
+
+
+_indexes: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_code_index(snapshot) -> CodeIndex:
+    """One CodeIndex per snapshot, shared by every session in the process."""
+    with _lock:
+        index = _indexes.get(snapshot)
+        if index is None:
+            index = _indexes[snapshot] = CodeIndex(snapshot)
+        return index
@@ -0,0 +1,207 @@
+import re
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+from rapidfuzz import fuzz, process, utils as fuzz_utils
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from utils.batch_classifier import build_corpus
+
+CROSSWALK_TABLE = "naics_gics_crosswalk"
+TOP_K = 5
+CHUNK_SIZE = 4_096
+FUZZY_WEIGHT = 0.3   # the rest goes to IDF-weighted token overlap
+CONTEXT_WEIGHT = 0.5  # ancestor titles count, but less than the node's own title
+# Below these a "match" is noise: fuzzy similarity alone tops out at FUZZY_WEIGHT * 100, so
+# 111160 Rice Farming, which shares no word with any GICS title, scored "Marine" at 16.8
+MIN_SCORE = 25.0
+MIN_RELATIVE_SCORE = 0.7  # also drop matches far behind the node's best one
+
+# Words that carry no industry meaning in either taxonomy's titles
+STOPWORDS = frozenset({
+    "and", "or", "of", "the", "for", "in", "on", "to", "with", "except", "other", "all",
+    "related", "activities", "general", "miscellaneous", "products",
+})
+
+# On SQLite, WITHOUT ROWID keeps each NAICS code's top-k rows clustered on the
+# primary key, so a lookup is one index range scan.
+_CREATE_SQL = f"""
+CREATE TABLE {CROSSWALK_TABLE} (
+    naics_code TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    gics_id INTEGER NOT NULL,
+    gics_name TEXT NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (naics_code, rank)
+)"""
+
+
+class CrosswalkMatch(NamedTuple):
+    naics_code: str
+    rank: int
+    gics_id: int
+    gics_name: str
+    score: float
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def _tokens(name: str) -> set:
+    return {_stem(w) for w in re.findall(r"[a-z0-9]+", name.lower()) if w not in STOPWORDS}
+
+
+class _TokenWeights:
+    """IDF weights over both taxonomies' titles; "food" counts for more than "manufactur"."""
+
+    def __init__(self, documents: List[set]):
+        frequency = {}
+        for tokens in documents:
+            for token in tokens:
+                frequency[token] = frequency.get(token, 0) + 1
+        self.idf = {t: float(np.log((1 + len(documents)) / (1 + f))) + 1 for t, f in frequency.items()}
+
+    def vector(self, snapshot, node: int) -> Dict[str, float]:
+        """
+        Token weights for a node's title plus, down-weighted, its ancestors' titles. Weights
+        add up along the path, so "food" under Food Products outweighs it under
+        Consumer Staples Distribution & Retail.
+        """
+        vector = {}
+        for ancestor in snapshot.ancestors(node):
+            for token in _tokens(snapshot.names[ancestor]):
+                vector[token] = vector.get(token, 0.0) + CONTEXT_WEIGHT * self.idf.get(token, 1.0)
+        for token in _tokens(snapshot.names[node]):
+            vector[token] = vector.get(token, 0.0) + self.idf.get(token, 1.0)
+        return vector
+
+
+def _norm(vector: Dict[str, float]) -> float:
+    return float(np.sqrt(sum(w * w for w in vector.values()))) or 1.0
+
+
+def _overlap(naics_vectors: List[dict], gics_vectors: List[dict]) -> np.ndarray:
+    """IDF-weighted cosine overlap (0-100) of each NAICS node against every GICS node."""
+    vocabulary = {t: i for i, t in enumerate(sorted(set().union(*gics_vectors)))}
+    gics_matrix = np.zeros((len(vocabulary), len(gics_vectors)), dtype=np.float32)
+    for col, vector in enumerate(gics_vectors):
+        for token, weight in vector.items():
+            gics_matrix[vocabulary[token], col] = weight
+    gics_matrix /= np.array([_norm(vector) for vector in gics_vectors], dtype=np.float32)
+
+    scores = np.zeros((len(naics_vectors), len(gics_vectors)), dtype=np.float32)
+    for row, vector in enumerate(naics_vectors):
+        shared = [(vocabulary[t], w) for t, w in vector.items() if t in vocabulary]
+        if shared:
+            rows, row_weights = zip(*shared)
+            scores[row] = np.asarray(row_weights, dtype=np.float32) @ gics_matrix[list(rows)] / _norm(vector)
+    return scores * 100
+
+
+def score_crosswalk(naics_snapshot, gics_snapshot, top_k: int = TOP_K) -> List[dict]:
+    """
+    Score every NAICS node against every GICS sub-industry and keep the top ``top_k``.
+
+    The score blends rapidfuzz token_set_ratio (one cdist per chunk) with IDF-weighted
+    token overlap that also sees ancestor titles, so a shared common word like
+    "Manufacturing" alone does not outrank a title sharing a rarer one. A match must share
+    a word, score at least MIN_SCORE and be within MIN_RELATIVE_SCORE of the node's best;
+    a node with no such match gets no rows.
+    """
+    gics = build_corpus(gics_snapshot, leaf_only=True)
+    weights = _TokenWeights([_tokens(name) for name in (*naics_snapshot.names, *gics_snapshot.names)])
+    deepest = len(gics_snapshot.level_names) - 1
+    gics_vectors = [weights.vector(gics_snapshot, node) for node in range(len(gics_snapshot))
+                    if gics_snapshot.levels[node] == deepest]
+
+    k = min(top_k, len(gics.names))
+    rows = []
+    for start in range(0, len(naics_snapshot), CHUNK_SIZE):
+        nodes = range(start, min(start + CHUNK_SIZE, len(naics_snapshot)))
+        names = [naics_snapshot.names[i] for i in nodes]
+        fuzzy = process.cdist([fuzz_utils.default_process(n) for n in names], gics.processed,
+                              scorer=fuzz.token_set_ratio, dtype=np.uint8, workers=-1)
+        overlap = _overlap([weights.vector(naics_snapshot, node) for node in nodes], gics_vectors)
+        scores = FUZZY_WEIGHT * fuzzy + (1 - FUZZY_WEIGHT) * overlap
+        floor = np.maximum(MIN_SCORE, MIN_RELATIVE_SCORE * scores.max(axis=1, keepdims=True))
+        scores[(scores < floor) | (overlap <= 0)] = -1
+        top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        for row, node in enumerate(nodes):
+            kept = [col for col in top[row] if scores[row, col] >= 0]
+            ranked = sorted(kept, key=lambda col: (-float(scores[row, col]), col))
+            for rank, col in enumerate(ranked, start=1):
+                rows.append({
+                    "naics_code": naics_snapshot.codes[node],
+                    "rank": rank,
+                    "gics_id": int(gics.codes[col]),
+                    "gics_name": gics.names[col],
+                    "score": round(float(scores[row, col]), 2),
+                })
+    return rows
+
+
+def build_crosswalk(engine, naics_snapshot, gics_snapshot, top_k: int = TOP_K) -> int:
+    """(Re)create the crosswalk table in the NAICS database. Returns the number of rows stored."""
+    rows = score_crosswalk(naics_snapshot, gics_snapshot, top_k)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {CROSSWALK_TABLE}"))
+        conn.execute(text(_CREATE_SQL + (" WITHOUT ROWID" if engine.dialect.name == "sqlite" else "")))
+        conn.execute(text(f"CREATE INDEX ix_{CROSSWALK_TABLE}_gics ON {CROSSWALK_TABLE} (gics_id, score)"))
+        if rows:
+            conn.execute(
+                text(f"INSERT INTO {CROSSWALK_TABLE} (naics_code, rank, gics_id, gics_name, score) "
+                     f"VALUES (:naics_code, :rank, :gics_id, :gics_name, :score)"),
+                rows,
+            )
+    return len(rows)
+
+
+def lookup_crosswalk(conn, naics_code: str) -> List[CrosswalkMatch]:
+    """GICS sub-industries for one NAICS code, best first (primary-key range scan)."""
+    try:
+        rows = conn.execute(
+            text(f"SELECT naics_code, rank, gics_id, gics_name, score FROM {CROSSWALK_TABLE} "
+                 f"WHERE naics_code = :code ORDER BY rank"),
+            {"code": str(naics_code)},
+        ).all()
+    except OperationalError:
+        return []
+    return [CrosswalkMatch(*row) for row in rows]
+
+
+def reverse_crosswalk(conn, gics_id: int, limit: int = 20) -> List[CrosswalkMatch]:
+    """NAICS codes whose top-k include this GICS sub-industry, highest score first."""
+    try:
+        rows = conn.execute(
+            text(f"SELECT naics_code, rank, gics_id, gics_name, score FROM {CROSSWALK_TABLE} "
+                 f"WHERE gics_id = :gics_id ORDER BY score DESC LIMIT :limit"),
+            {"gics_id": int(gics_id), "limit": limit},
+        ).all()
+    except OperationalError:
+        return []
+    return [CrosswalkMatch(*row) for row in rows]
+
+
+if __name__ == "__main__":
+    from sqlalchemy import create_engine
+
+    from utils.db import GICS_DB_PATH, NAICS_DB_PATH, get_engine
+    from utils.hierarchy_snapshot import build_gics_snapshot, build_naics_snapshot
+    from utils.hot_reload import staged_database
+    from utils.snapshot_file import export_snapshot_file
+
+    # Written to a staged copy of naics.db that is swapped in on success
+    with staged_database(f"sqlite:///{NAICS_DB_PATH}") as staged:
+        naics_writer = create_engine(staged.url)
+        try:
+            stored = build_crosswalk(naics_writer, build_naics_snapshot(naics_writer),
+                                     build_gics_snapshot(get_engine(GICS_DB_PATH)))
+        finally:
+            naics_writer.dispose()
+        export_snapshot_file(sources=staged.sources())
+    print(f"✅ Stored {stored} NAICS → GICS crosswalk rows")
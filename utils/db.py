@@ -0,0 +1,108 @@
+import hashlib
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Tuple
+
+from utils.profiling import CountingConnection, instrument_engine
+
+NAICS_DB_PATH = os.path.abspath(os.getenv("NAICS_DB_PATH", "naics.db"))
+GICS_DB_PATH = os.path.abspath(os.getenv("GICS_DB_PATH", "gics.db"))
+
+READ_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 268435456",  # 256 MB: reads come straight from the page cache
+    "PRAGMA cache_size = -65536",    # 64 MB per connection
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+def database_version(database_path: str) -> str:
+    """Cheap version stamp for a SQLite file; changes whenever the file is rewritten or swapped."""
+    try:
+        stat = os.stat(database_path)
+    except FileNotFoundError:
+        return "missing"
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}-{stat.st_ino:x}"
+
+
+_fingerprints: Dict[str, Tuple[str, str]] = {}  # path → (database_version, content hash)
+
+
+def database_fingerprint(database_path: str) -> str:
+    """
+    Content stamp that survives copies and checkouts: a hash of the file's bytes, so two
+    files share it only if they are identical. Hashed once per database_version.
+    """
+    version = database_version(database_path)
+    if version == "missing":
+        return version
+    cached = _fingerprints.get(database_path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    digest = hashlib.blake2b(digest_size=16)
+    try:
+        with open(database_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return "missing"
+    _fingerprints[database_path] = (version, digest.hexdigest())
+    return digest.hexdigest()
+
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+_engines: Dict[str, Tuple[str, "Engine"]] = {}
+_lock = threading.Lock()
+
+
+def _create_read_engine(path: str) -> "Engine":
+    from sqlalchemy import create_engine, event  # first engine pays the SQLAlchemy import
+
+    # immutable=1 lets SQLite skip locking and change detection entirely. That is only safe
+    # because engines are keyed on the file version: a reload gets a fresh engine.
+    engine = create_engine(
+        f"sqlite:///file:{path}?mode=ro&immutable=1&uri=true",
+        connect_args={"check_same_thread": False, "factory": CountingConnection},
+        pool_size=5,
+        max_overflow=10,
+        pool_pre_ping=False,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _tune(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        for pragma in READ_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+    instrument_engine(engine)
+    return engine
+
+
+def get_engine(path: str) -> "Engine":
+    """
+    Process-wide read-only engine for a SQLite file, created once per data version.
+    When the file changes the old engine is disposed and a new one takes its place.
+    """
+    version = database_version(path)
+    cached = _engines.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _lock:
+        cached = _engines.get(path)
+        if cached is None or cached[0] != version:
+            if cached is not None:
+                cached[1].dispose(close=False)  # in-flight connections finish on their own
+            _engines[path] = (version, _create_read_engine(path))
+        return _engines[path][1]
+
+
+def release_engine(path: str) -> None:
+    """Drop the read engine for ``path`` (e.g. a staged file about to be renamed)."""
+    with _lock:
+        cached = _engines.pop(path, None)
+    if cached is not None:
+        cached[1].dispose(close=False)
+
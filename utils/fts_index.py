@@ -0,0 +1,124 @@
+from typing import List, NamedTuple, Optional
+
+FTS_TABLE = "search_index"
+
+# The trigram tokenizer indexes every 3-character substring, so MATCH keeps the
+# `ILIKE '%word%'` semantics of the original search while using the index.
+_CREATE_SQL = f"""
+CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+    name,
+    code UNINDEXED,
+    level UNINDEXED,
+    ancestors UNINDEXED,
+    tokenize = 'trigram'
+)
+"""
+
+MIN_TRIGRAM = 3
+
+
+class SearchHit(NamedTuple):
+    code: str
+    level: int
+    name: str
+    ancestors: List[str]  # ancestor codes, sector first
+    rank: float
+
+
+def build_search_index(engine, snapshot) -> int:
+    """(Re)create the FTS5 table from a hierarchy snapshot. Returns the number of rows indexed."""
+    from sqlalchemy import text
+
+    rows = [
+        {
+            "name": snapshot.names[node],
+            "code": snapshot.codes[node],
+            "level": int(snapshot.levels[node]),
+            "ancestors": " ".join(snapshot.codes[a] for a in snapshot.ancestors(node)),
+        }
+        for node in range(len(snapshot))
+    ]
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+        conn.execute(text(_CREATE_SQL))
+        if rows:
+            conn.execute(
+                text(f"INSERT INTO {FTS_TABLE} (name, code, level, ancestors) VALUES (:name, :code, :level, :ancestors)"),
+                rows,
+            )
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+    return len(rows)
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def match_search_index(conn, words: List[str], phrase: Optional[str] = None) -> Optional[List[SearchHit]]:
+    """
+    Single indexed query for names containing every word in ``words``.
+
+    Hits containing the whole ``phrase`` sort first, then by FTS5 rank. Words shorter
+    than a trigram cannot use MATCH and are checked with LIKE on the candidate rows.
+    Returns None when the database has no search index, so callers can fall back.
+    """
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    long_words = [w for w in words if len(w) >= MIN_TRIGRAM]
+    short_words = [w for w in words if len(w) < MIN_TRIGRAM]
+
+    clauses, params = [], {}
+    if long_words:
+        clauses.append(f"{FTS_TABLE} MATCH :match")
+        params["match"] = " AND ".join(_quote(w) for w in long_words)
+    for i, word in enumerate(short_words):
+        clauses.append(f"name LIKE :w{i} ESCAPE '\\'")
+        params[f"w{i}"] = f"%{_escape_like(word)}%"
+    if not clauses:
+        return []
+
+    phrase_order = ""
+    if phrase:
+        phrase_order = "(name LIKE :phrase ESCAPE '\\') DESC, "
+        params["phrase"] = f"%{_escape_like(phrase)}%"
+    rank = "rank" if long_words else "0"
+
+    sql = (
+        f"SELECT code, level, name, ancestors, {rank} FROM {FTS_TABLE} "
+        f"WHERE {' AND '.join(clauses)} ORDER BY {phrase_order}{rank}"
+    )
+    try:
+        rows = conn.execute(text(sql), params).all()
+    except OperationalError:
+        return None
+    return [
+        SearchHit(code, int(level), name, ancestors.split() if ancestors else [], score)
+        for code, level, name, ancestors, score in rows
+    ]
+
+
+if __name__ == "__main__":
+    import os
+    from sqlalchemy import create_engine
+    from utils.db import GICS_DB_PATH, NAICS_DB_PATH
+    from utils.hierarchy_snapshot import build_naics_snapshot, build_gics_snapshot
+    from utils.hot_reload import merged_sources, staged_databases
+    from utils.snapshot_file import export_snapshot_file
+
+    # Reindex staged copies and swap them in together; the running app keeps reading the live files
+    targets = [(path, builder) for path, builder in ((NAICS_DB_PATH, build_naics_snapshot),
+                                                     (GICS_DB_PATH, build_gics_snapshot)) if os.path.exists(path)]
+    with staged_databases(*(f"sqlite:///{path}" for path, _ in targets)) as staged_files:
+        for staged, (path, builder) in zip(staged_files, targets):
+            engine = create_engine(staged.url)
+            try:
+                count = build_search_index(engine, builder(engine))
+            finally:
+                engine.dispose()
+            print(f"✅ Indexed {count} names in {path}")
+        export_snapshot_file(sources=merged_sources(staged_files))
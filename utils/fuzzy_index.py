@@ -0,0 +1,91 @@
+import math
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+NGRAM = 2
+FUZZY_CUTOFF = 80
+PARALLEL_THRESHOLD = 20_000  # below this, thread start-up costs more than it saves
+
+
+def _ngrams(text: str) -> set:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+class FuzzyIndex:
+    """
+    Lowercased name corpus for the "did you mean" tier.
+
+    A bigram inverted index discards names that cannot reach the partial_ratio
+    cutoff, then rapidfuzz scores the survivors in one cdist call.
+    """
+
+    def __init__(self, snapshot, cutoff: float = FUZZY_CUTOFF,
+                 postings: Optional[Dict[str, np.ndarray]] = None, lengths: Optional[np.ndarray] = None):
+        self.cutoff = cutoff
+        self.names = snapshot.names_lower
+        self.levels = snapshot.levels
+        if postings is not None and lengths is not None:
+            # Prebuilt (e.g. mapped from a snapshot file)
+            self.postings, self.lengths = postings, lengths
+            return
+        self.lengths = np.fromiter((len(n) for n in self.names), dtype=np.int32, count=len(self.names))
+
+        grams: Dict[str, list] = {}
+        for node, name in enumerate(self.names):
+            for gram in _ngrams(name):
+                grams.setdefault(gram, []).append(node)
+        self.postings = {gram: np.asarray(nodes, dtype=np.int32) for gram, nodes in grams.items()}
+
+    def _min_shared_ngrams(self, query: str) -> int:
+        # partial_ratio > cutoff allows fewer than (1 - cutoff/100) * 2 * len(query) indels,
+        # and every indel destroys at most NGRAM of the query's distinct n-grams.
+        max_edits = math.ceil((1 - self.cutoff / 100) * 2 * len(query)) - 1
+        return len(_ngrams(query)) - NGRAM * max_edits
+
+    def candidates(self, query: str) -> np.ndarray:
+        required = self._min_shared_ngrams(query)
+        if required <= 0:
+            return np.arange(len(self.names), dtype=np.int32)
+        lists = [self.postings[g] for g in _ngrams(query) if g in self.postings]
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.names)) if lists else np.zeros(len(self.names), dtype=np.int64)
+        # partial_ratio aligns the shorter string, so names shorter than the query are always scored
+        return np.flatnonzero((shared >= required) | (self.lengths < len(query))).astype(np.int32)
+
+    def search(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Node ids scoring above the cutoff and their scores, best first (deeper levels win ties)."""
+        from rapidfuzz import fuzz, process  # deferred until the first fuzzy search
+
+        query = query.lower()
+        nodes = self.candidates(query)
+        if not len(nodes):
+            return nodes, np.empty(0, dtype=np.float32)
+        choices = [self.names[i] for i in nodes]
+        workers = -1 if len(choices) >= PARALLEL_THRESHOLD else 1
+        scores = process.cdist([query], choices, scorer=fuzz.partial_ratio,
+                               score_cutoff=self.cutoff, dtype=np.float32, workers=workers)[0]
+        keep = scores > self.cutoff
+        nodes, scores = nodes[keep], scores[keep]
+        order = np.lexsort((nodes, -self.levels[nodes], -scores))
+        return nodes[order], scores[order]
+
+
+_indexes: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_fuzzy_index(snapshot) -> FuzzyIndex:
+    """One FuzzyIndex per snapshot, shared by every session in the process."""
+    with _lock:
+        index = _indexes.get(snapshot)
+        if index is None:
+            index = _indexes[snapshot] = FuzzyIndex(snapshot)
+        return index
+
+
+def register_fuzzy_index(snapshot, index: FuzzyIndex) -> None:
+    """Install a prebuilt index so get_fuzzy_index skips building one."""
+    with _lock:
+        _indexes[snapshot] = index
@@ -0,0 +1,258 @@
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.db import database_version, get_engine
+
+
+# (model, key column, parent key column) from the top level down. The ORM models (and
+# SQLAlchemy) are imported on first use: mapped snapshots never need them.
+def naics_levels() -> tuple:
+    from models import naics_models
+    return (
+        (naics_models.Sector, "code", None),
+        (naics_models.IndustryGroup, "code", "sector_code"),
+        (naics_models.Industry, "code", "industry_group_code"),
+        (naics_models.SubIndustry, "code", "industry_code"),
+        (naics_models.NationalIndustry, "code", "sub_industry_code"),
+    )
+
+
+def gics_levels() -> tuple:
+    from models import models as gics_models
+    return (
+        (gics_models.Sector, "id", None),
+        (gics_models.IndustryGroup, "id", "sector_id"),
+        (gics_models.Industry, "id", "industry_group_id"),
+        (gics_models.SubIndustry, "id", "industry_id"),
+    )
+
+GICS_LEVEL_NAMES = ("sector", "industry_group", "industry", "sub_industry")
+NAICS_LEVEL_NAMES = GICS_LEVEL_NAMES + ("national_industry",)
+
+
+def _frozen(values, dtype) -> np.ndarray:
+    arr = np.asarray(values, dtype=dtype)
+    arr.flags.writeable = False
+    return arr
+
+
+class HierarchySnapshot:
+    """
+    Immutable, array-backed copy of one taxonomy tree.
+
+    Nodes are stored in depth-first pre-order, so node ``i`` and all of its
+    descendants occupy the contiguous range ``[i, subtree_end[i])``. Children are
+    kept in CSR form: the children of ``i`` are
+    ``child_index[child_offsets[i]:child_offsets[i + 1]]``.
+    """
+
+    def __init__(self, taxonomy: str, codes: Sequence[str], names: Sequence[str],
+                 levels: Sequence[int], parents: Sequence[int], level_names: Sequence[str],
+                 version: str = ""):
+        self.taxonomy = taxonomy
+        self.version = version
+        self.level_names = tuple(level_names)
+        self.codes: Tuple[str, ...] = tuple(codes)
+        self.names: Tuple[str, ...] = tuple(names)
+        self.names_lower: Tuple[str, ...] = tuple(name.lower() for name in names)
+        self.levels = _frozen(levels, np.int8)
+        self.parents = _frozen(parents, np.int32)
+
+        n = len(self.codes)
+        child_counts = np.bincount(self.parents[self.parents >= 0], minlength=n)
+        offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(child_counts, out=offsets[1:])
+        # Pre-order means a stable sort by parent keeps siblings in display order.
+        child_index = np.argsort(self.parents, kind="stable")[n - int(child_counts.sum()):]
+        self.child_offsets = _frozen(offsets, np.int32)
+        self.child_index = _frozen(child_index, np.int32)
+        self.roots = _frozen(np.flatnonzero(self.parents < 0), np.int32)
+
+        subtree_end = np.arange(1, n + 1, dtype=np.int32)
+        for i in range(n - 1, -1, -1):
+            parent = self.parents[i]
+            if parent >= 0 and subtree_end[i] > subtree_end[parent]:
+                subtree_end[parent] = subtree_end[i]
+        self.subtree_end = _frozen(subtree_end, np.int32)
+        self._index: Optional[Dict[Tuple[int, str], int]] = None
+
+    @classmethod
+    def from_arrays(cls, taxonomy: str, codes: Sequence[str], names: Sequence[str], names_lower: Sequence[str],
+                    arrays: Dict[str, np.ndarray], level_names: Sequence[str], version: str = "") -> "HierarchySnapshot":
+        """
+        Wrap precomputed arrays (levels, parents, child_offsets, child_index, roots,
+        subtree_end) without copying them, e.g. views into a memory-mapped file.
+        """
+        snapshot = cls.__new__(cls)
+        snapshot.taxonomy = taxonomy
+        snapshot.version = version
+        snapshot.level_names = tuple(level_names)
+        snapshot.codes, snapshot.names, snapshot.names_lower = codes, names, names_lower
+        for name in ("levels", "parents", "child_offsets", "child_index", "roots", "subtree_end"):
+            setattr(snapshot, name, arrays[name])
+        snapshot._index = None
+        return snapshot
+
+    def _lookup(self) -> Dict[Tuple[int, str], int]:
+        # Built on first lookup; racing threads build identical dicts
+        if self._index is None:
+            self._index = {(int(level), code): i for i, (level, code) in enumerate(zip(self.levels, self.codes))}
+        return self._index
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def children(self, node: int) -> np.ndarray:
+        return self.child_index[self.child_offsets[node]:self.child_offsets[node + 1]]
+
+    def descendants(self, node: int) -> range:
+        return range(node + 1, int(self.subtree_end[node]))
+
+    def ancestors(self, node: int) -> List[int]:
+        """Ancestors of ``node`` ordered from the sector down to its direct parent."""
+        chain = []
+        parent = int(self.parents[node])
+        while parent >= 0:
+            chain.append(parent)
+            parent = int(self.parents[parent])
+        return chain[::-1]
+
+    def sector_of(self, node: int) -> int:
+        while self.parents[node] >= 0:
+            node = int(self.parents[node])
+        return node
+
+    def find(self, code: str, level: Optional[int] = None) -> Optional[int]:
+        """Node index for ``code`` (NAICS codes are unique, GICS ids need ``level``)."""
+        index = self._lookup()
+        if level is not None:
+            return index.get((level, str(code)))
+        for lvl in range(len(self.level_names)):
+            node = index.get((lvl, str(code)))
+            if node is not None:
+                return node
+        return None
+
+    def level_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.levels, minlength=len(self.level_names))
+        return {name: int(count) for name, count in zip(self.level_names, counts)}
+
+
+def build_snapshot(engine, taxonomy: str, level_specs, level_names: Sequence[str],
+                   version: str = "") -> HierarchySnapshot:
+    """Read every level with one SELECT each and lay the tree out in pre-order."""
+    from sqlalchemy import select
+
+    rows_by_level = []
+    with engine.connect() as conn:
+        for model, key_attr, parent_attr in level_specs:
+            columns = [getattr(model, key_attr), model.name]
+            if parent_attr:
+                columns.append(getattr(model, parent_attr))
+            rows = conn.execute(select(*columns).order_by(getattr(model, key_attr))).all()
+            rows_by_level.append(rows)
+    return snapshot_from_rows(taxonomy, rows_by_level, level_names, version)
+
+
+def snapshot_from_rows(taxonomy: str, rows_by_level: Sequence[Sequence[tuple]], level_names: Sequence[str],
+                       version: str = "") -> HierarchySnapshot:
+    """Lay out (key, name[, parent key]) rows, top level first, as a pre-order snapshot."""
+    children: Dict[Tuple[int, str], List[tuple]] = {}
+    for level, rows in enumerate(rows_by_level[1:], start=1):
+        for row in rows:
+            if row[2] is not None:
+                children.setdefault((level - 1, str(row[2])), []).append(row)
+
+    codes, names, levels, parents = [], [], [], []
+
+    def visit(level: int, row, parent: int):
+        node = len(codes)
+        codes.append(str(row[0]))
+        names.append(row[1])
+        levels.append(level)
+        parents.append(parent)
+        for child in children.get((level, str(row[0])), ()):
+            visit(level + 1, child, node)
+
+    for row in rows_by_level[0]:
+        visit(0, row, -1)
+
+    return HierarchySnapshot(taxonomy, codes, names, levels, parents, level_names, version=version)
+
+
+def build_naics_snapshot(engine, version: str = "") -> HierarchySnapshot:
+    return build_snapshot(engine, "naics", naics_levels(), NAICS_LEVEL_NAMES, version)
+
+
+def build_gics_snapshot(engine, version: str = "") -> HierarchySnapshot:
+    return build_snapshot(engine, "gics", gics_levels(), GICS_LEVEL_NAMES, version)
+
+
+RELOAD_RETRY_SECONDS = 30.0  # a version that failed to load is retried at most this often
+
+
+class SnapshotCache:
+    """
+    Holds one snapshot per database file. The first get() builds it; when the file is later
+    swapped for a new version, get() keeps returning the current snapshot while a background
+    thread builds (and ``prepare`` warms) the new one, then switches over in one assignment.
+    Requests already holding the old snapshot finish on it.
+    """
+
+    def __init__(self, database_path: str, builder, prepare=None, retry_after: float = RELOAD_RETRY_SECONDS):
+        self.database_path = database_path
+        self.builder = builder
+        self.prepare = prepare  # e.g. build search indexes before a reloaded snapshot goes live
+        self.retry_after = retry_after
+        self._snapshot: Optional[HierarchySnapshot] = None
+        self._pending: Optional[str] = None
+        self._failed: Optional[Tuple[str, float]] = None  # (version, when it may be retried)
+        self._lock = threading.Lock()
+
+    def get(self) -> HierarchySnapshot:
+        version = database_version(self.database_path)
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self.builder(get_engine(self.database_path), version)
+                snapshot = self._snapshot
+        elif snapshot.version != version:
+            self._refresh(version)
+        return snapshot
+
+    def engine_for(self, snapshot: HierarchySnapshot):
+        """The read engine if the file on disk is still the snapshot's version, else None (mid-swap)."""
+        if database_version(self.database_path) != snapshot.version:
+            return None
+        return get_engine(self.database_path)
+
+    def _refresh(self, version: str) -> None:
+        with self._lock:
+            if self._pending == version:
+                return
+            if self._failed is not None and self._failed[0] == version and time.monotonic() < self._failed[1]:
+                return  # this version just failed to load; don't start a thread per request
+            self._pending = version
+        threading.Thread(target=self._rebuild, args=(version,), name="snapshot-reload", daemon=True).start()
+
+    def _rebuild(self, version: str) -> None:
+        try:
+            snapshot = self.builder(get_engine(self.database_path), version)
+            if self.prepare is not None:
+                self.prepare(snapshot)
+        except Exception as e:  # keep serving the current snapshot; retried after retry_after seconds
+            print(f"⚠️ Reloading {self.database_path} failed: {e}; retrying in {self.retry_after:.0f}s")
+            snapshot = None
+        with self._lock:
+            if snapshot is None:
+                self._failed = (version, time.monotonic() + self.retry_after)
+            else:
+                self._failed = None
+                if database_version(self.database_path) == version:
+                    self._snapshot = snapshot
+            if self._pending == version:
+                self._pending = None
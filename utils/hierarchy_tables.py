@@ -0,0 +1,171 @@
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import Index, inspect, text
+from sqlalchemy.exc import OperationalError
+
+NODES_TABLE = "hierarchy_nodes"
+CLOSURE_TABLE = "hierarchy_closure"
+
+# node_id is the snapshot's pre-order position, so ordering by it yields the display order.
+_CREATE_NODES_SQL = f"""
+CREATE TABLE {NODES_TABLE} (
+    node_id INTEGER PRIMARY KEY,
+    level INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    parent_id INTEGER
+)"""
+
+# One row per (ancestor, descendant) pair including each node with itself at depth 0.
+# The primary key answers "subtree of X"; the (descendant_id, depth) index answers
+# "ancestors of X". On SQLite, WITHOUT ROWID stores rows in primary-key order.
+_CREATE_CLOSURE_SQL = f"""
+CREATE TABLE {CLOSURE_TABLE} (
+    ancestor_id INTEGER NOT NULL,
+    descendant_id INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+)"""
+
+_NODE_ID_SQL = f"(SELECT node_id FROM {NODES_TABLE} WHERE level = :level AND key = :key)"
+
+SUBTREE_SQL = (
+    f"SELECT n.node_id, n.level, n.key, n.name, n.parent_id, c.depth "
+    f"FROM {CLOSURE_TABLE} c JOIN {NODES_TABLE} n ON n.node_id = c.descendant_id "
+    f"WHERE c.ancestor_id = {_NODE_ID_SQL} AND c.depth <= :max_depth ORDER BY c.descendant_id"
+)
+
+ANCESTORS_SQL = (
+    f"SELECT n.node_id, n.level, n.key, n.name, n.parent_id, c.depth "
+    f"FROM {CLOSURE_TABLE} c JOIN {NODES_TABLE} n ON n.node_id = c.ancestor_id "
+    f"WHERE c.descendant_id = {_NODE_ID_SQL} AND c.depth > 0 ORDER BY c.depth DESC"
+)
+
+MAX_DEPTH = 99  # deeper than either taxonomy
+
+
+class HierarchyRow(NamedTuple):
+    node_id: int
+    level: int
+    key: str
+    name: str
+    parent_id: Optional[int]
+    depth: int  # distance from the node the query started at
+
+
+def ensure_foreign_key_indexes(engine, base) -> List[str]:
+    """
+    Create an index on every foreign-key column of ``base``'s tables that the database
+    lacks (ix_<table>_<column>, the name ``index=True`` gives on new databases).
+    Returns the names of the indexes created.
+    """
+    created = []
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        tables = set(inspector.get_table_names())
+        for table in base.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            indexed = {tuple(index["column_names"])[:1] for index in inspector.get_indexes(table.name)}
+            for column in table.columns:
+                if column.foreign_keys and (column.name,) not in indexed:
+                    name = f"ix_{table.name}_{column.name}"
+                    Index(name, column).create(conn)
+                    created.append(name)
+    return created
+
+
+def build_hierarchy_tables(engine, snapshot) -> int:
+    """(Re)create the node and closure tables from a hierarchy snapshot. Returns the closure row count."""
+    nodes = [
+        {"node_id": node, "level": int(snapshot.levels[node]), "key": snapshot.codes[node],
+         "name": snapshot.names[node], "parent_id": int(snapshot.parents[node]) if snapshot.parents[node] >= 0 else None}
+        for node in range(len(snapshot))
+    ]
+    closure = []
+    for node in range(len(snapshot)):
+        chain = snapshot.ancestors(node)
+        closure.append({"ancestor_id": node, "descendant_id": node, "depth": 0})
+        for depth, ancestor in enumerate(reversed(chain), start=1):
+            closure.append({"ancestor_id": ancestor, "descendant_id": node, "depth": depth})
+
+    without_rowid = " WITHOUT ROWID" if engine.dialect.name == "sqlite" else ""
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {CLOSURE_TABLE}"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {NODES_TABLE}"))
+        conn.execute(text(_CREATE_NODES_SQL))
+        conn.execute(text(f"CREATE UNIQUE INDEX ix_{NODES_TABLE}_level_key ON {NODES_TABLE} (level, key)"))
+        conn.execute(text(_CREATE_CLOSURE_SQL + without_rowid))
+        conn.execute(text(f"CREATE INDEX ix_{CLOSURE_TABLE}_descendant ON {CLOSURE_TABLE} (descendant_id, depth)"))
+        if nodes:
+            conn.execute(
+                text(f"INSERT INTO {NODES_TABLE} (node_id, level, key, name, parent_id) "
+                     f"VALUES (:node_id, :level, :key, :name, :parent_id)"),
+                nodes,
+            )
+            conn.execute(
+                text(f"INSERT INTO {CLOSURE_TABLE} (ancestor_id, descendant_id, depth) "
+                     f"VALUES (:ancestor_id, :descendant_id, :depth)"),
+                closure,
+            )
+        if engine.dialect.name == "sqlite":
+            conn.execute(text(f"ANALYZE {NODES_TABLE}"))
+            conn.execute(text(f"ANALYZE {CLOSURE_TABLE}"))
+    return len(closure)
+
+
+# === Repository ===
+def fetch_subtree(conn, level: int, key: str, max_depth: int = MAX_DEPTH) -> List[HierarchyRow]:
+    """A node and its descendants (to ``max_depth`` levels below it) in pre-order, in one statement."""
+    try:
+        rows = conn.execute(text(SUBTREE_SQL), {"level": level, "key": str(key), "max_depth": max_depth}).all()
+    except OperationalError:
+        return []
+    return [HierarchyRow(*row) for row in rows]
+
+
+def fetch_ancestors(conn, level: int, key: str) -> List[HierarchyRow]:
+    """Ancestors of a node from the sector down to its parent, in one statement."""
+    try:
+        rows = conn.execute(text(ANCESTORS_SQL), {"level": level, "key": str(key)}).all()
+    except OperationalError:
+        return []
+    return [HierarchyRow(*row) for row in rows]
+
+
+# === Query-plan guard ===
+GUARDED_QUERIES = {
+    "subtree": (SUBTREE_SQL, {"level": 0, "key": "", "max_depth": MAX_DEPTH}),
+    "ancestors": (ANCESTORS_SQL, {"level": 0, "key": ""}),
+}
+
+
+def query_plan(conn, sql: str, params: dict) -> List[str]:
+    """SQLite's EXPLAIN QUERY PLAN detail lines for one statement."""
+    return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params)]
+
+
+def _foreign_key_queries(base) -> dict:
+    """Child lookups through every foreign key of ``base``'s tables ("industry groups of sector X")."""
+    return {
+        f"{table.name}.{column.name}": (f"SELECT * FROM {table.name} WHERE {column.name} = :value", {"value": ""})
+        for table in base.metadata.sorted_tables
+        for column in table.columns if column.foreign_keys
+    }
+
+
+def full_scans(conn, base=None) -> dict:
+    """
+    Guarded queries whose plan scans a table (or sorts in a temp b-tree) instead of
+    searching an index, as {query: [plan lines]}. ``base`` adds the foreign-key child
+    lookups of its tables. Empty means every lookup is an index search.
+    """
+    queries = dict(GUARDED_QUERIES)
+    if base is not None:
+        queries.update(_foreign_key_queries(base))
+    problems = {}
+    for name, (sql, params) in queries.items():
+        plan = query_plan(conn, sql, params)
+        if any(line.startswith("SCAN") or "TEMP B-TREE" in line for line in plan):
+            problems[name] = plan
+    return problems
@@ -0,0 +1,158 @@
+"""
+Refresh taxonomy data under a running app and API.
+
+Loaders never write to the live SQLite file. ``staged_database`` copies it to a new
+versioned file (``naics.db.<stamp>.staging``), the loader writes there, and on success
+the copy is renamed over the live path in one atomic step. Readers that already have
+the old file open keep reading it; new connections see the new one. The version stamp
+(mtime, size, inode) changes with the rename, which is what SnapshotCache and get_engine
+watch for.
+
+Content hashes decide what a load actually touches: ``diff_rows`` compares per-row
+hashes of the stored and incoming rows, so only inserted, updated and deleted rows are
+written, and a load that changes nothing discards its staged copy instead of swapping.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Hashable, Iterator, List, NamedTuple, Optional, Tuple
+
+from utils.db import release_engine
+
+
+# === Content hashes ===
+def row_hash(*values) -> str:
+    """Stable hash of one row's content (None and "" hash differently)."""
+    digest = hashlib.blake2b(digest_size=12)
+    for value in values:
+        digest.update(b"\x00" if value is None else b"\x01" + str(value).encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+def hash_rows(rows: Dict[Hashable, tuple]) -> Dict[Hashable, str]:
+    """{key: row_hash(*row)} for a {key: row values} mapping."""
+    return {key: row_hash(*(row if isinstance(row, tuple) else (row,))) for key, row in rows.items()}
+
+
+def table_hash(rows: Dict[Hashable, tuple]) -> str:
+    """One hash for a whole table; equal hashes mean equal contents regardless of row order."""
+    digest = hashlib.blake2b(digest_size=16)
+    for key, value in sorted((str(key), value) for key, value in hash_rows(rows).items()):
+        digest.update(f"{key}\x1e{value}\x1f".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RowDiff(NamedTuple):
+    inserted: Tuple[Hashable, ...]
+    updated: Tuple[Hashable, ...]
+    deleted: Tuple[Hashable, ...]
+
+    def __bool__(self) -> bool:
+        return bool(self.inserted or self.updated or self.deleted)
+
+    def summary(self) -> str:
+        return f"+{len(self.inserted)} ~{len(self.updated)} -{len(self.deleted)}"
+
+
+def diff_rows(stored: Dict[Hashable, str], incoming: Dict[Hashable, str]) -> RowDiff:
+    """Keys to insert, update (hash changed) and delete to turn ``stored`` into ``incoming``."""
+    return RowDiff(
+        inserted=tuple(key for key in incoming if key not in stored),
+        updated=tuple(key for key, digest in incoming.items() if key in stored and stored[key] != digest),
+        deleted=tuple(key for key in stored if key not in incoming),
+    )
+
+
+# === Build into a versioned file, then swap ===
+def sqlite_path(database_url: str) -> Optional[str]:
+    """Absolute file path of a sqlite:/// URL; None for other databases and in-memory SQLite."""
+    prefix = "sqlite:///"
+    if not database_url.startswith(prefix) or database_url[len(prefix):] in ("", ":memory:"):
+        return None
+    return os.path.abspath(database_url[len(prefix):].split("?")[0])
+
+
+class StagedDatabase:
+    """Where a loader writes: ``url`` points at the staged copy (or the live database if it cannot be staged)."""
+
+    def __init__(self, database_url: str, path: Optional[str]):
+        self.path = path
+        self.staged_path = f"{path}.{time.time_ns():x}.staging" if path else None
+        self.url = f"sqlite:///{self.staged_path}" if path else database_url
+        self.keep = True
+
+    def discard(self) -> None:
+        """Throw the staged copy away on exit instead of swapping it in (nothing changed)."""
+        self.keep = False
+
+    def sources(self) -> Dict[str, str]:
+        """{live path: staged path}, for steps that should read the new data before the swap."""
+        return {self.path: self.staged_path} if self.path else {}
+
+
+def _copy_database(source: str, target: str) -> None:
+    """Consistent copy through SQLite's backup API, safe while readers have the source open."""
+    src = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+@contextmanager
+def staged_database(database_url: str) -> Iterator[StagedDatabase]:
+    """
+    Yield a StagedDatabase holding a fresh copy of the live SQLite file. On a clean exit
+    the copy atomically replaces the live file (unless discarded); on an exception it is
+    deleted and the live file is untouched. Other databases are written in place, where
+    the loaders' own transactions already keep readers consistent.
+    """
+    staged = StagedDatabase(database_url, sqlite_path(database_url))
+    if staged.path is None:
+        yield staged
+        return
+    if os.path.exists(staged.path):
+        _copy_database(staged.path, staged.staged_path)
+    try:
+        yield staged
+    except BaseException:
+        _remove(staged.staged_path)
+        raise
+    finally:
+        release_engine(staged.staged_path)
+    if staged.keep:
+        os.replace(staged.staged_path, staged.path)
+    else:
+        _remove(staged.staged_path)
+
+
+@contextmanager
+def staged_databases(*database_urls: str) -> Iterator[List[StagedDatabase]]:
+    """
+    staged_database for several files: every copy is written before any is swapped, and the
+    swaps run back to back on a clean exit. An exception discards all of them.
+    """
+    with ExitStack() as stack:
+        yield [stack.enter_context(staged_database(url)) for url in database_urls]
+
+
+def merged_sources(staged_files) -> Dict[str, str]:
+    """StagedDatabase.sources() of several staged files in one mapping."""
+    sources = {}
+    for staged in staged_files:
+        if staged.keep:
+            sources.update(staged.sources())
+    return sources
+
+
+def _remove(path: str) -> None:
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,28 @@
+from html import escape
+
+from utils.search_results import highlight_spans
+
+LEVEL_ICONS = ("📁", "📂", "🏭", "🏷", "🔹")
+
+def iter_hits_html(snapshot, matches, with_code=True):
+    """
+    Yield one block per ranked match: its ancestor path on a gray line, then the
+    highlighted title. Only the given page is rendered, never the sectors around it.
+    """
+    yield "<div>"
+    for match in matches:
+        path = " › ".join(escape(snapshot.names[a]) for a in snapshot.ancestors(match.node))
+        icon = LEVEL_ICONS[min(match.level, len(LEVEL_ICONS) - 1)]
+        label = highlight_spans(match.name, match.spans)
+        if with_code:
+            label = f"{escape(match.code)} - {label}"
+        yield "<div style='margin-bottom:0.6rem'>"
+        if path:
+            yield f"<div style='color: gray; font-size: 0.8em;'>{path}</div>"
+        level = escape(snapshot.level_names[match.level].replace("_", " "))
+        yield f"<div>{icon} {label} <span style='color: gray; font-size: 0.8em;'>({level})</span></div>"
+        yield "</div>"
+    yield "</div>"
+
+def generate_hits_html(snapshot, matches, with_code=True):
+    return "".join(iter_hits_html(snapshot, matches, with_code))
@@ -1,67 +1,68 @@
-from bs4 import BeautifulSoup
+from html import escape
 
-def generate_naics_html(sectors, keyword):
-    def highlight(text, kw):
-        if not kw:
-            return text
-        kw_lower = kw.lower()
-        index = text.lower().find(kw_lower)
-        if index >= 0:
-            return (
-                text[:index] +
-                f"<span style='background-color: #ffff66;'>{text[index:index+len(kw)]}</span>" +
-                text[index+len(kw):]
-            )
-        return text
+from utils.search_results import find_spans, highlight_spans
 
-    keyword = keyword.strip().lower()
-    matched_codes = {"ig": set(), "ind": set(), "sub": set(), "sector": set()}
+def _highlight(text, keyword):
+    return highlight_spans(text, find_spans(text, [keyword]))
 
-    for sector in sectors:
-        if keyword and keyword in sector.name.lower():
-            matched_codes["sector"].add(sector.name)
-        for ig in sector.industry_groups:
-            if keyword and keyword in ig.name.lower():
-                matched_codes["ig"].add(ig.code)
-                matched_codes["sector"].add(sector.name)
-            for ind in ig.industries:
-                if keyword and keyword in ind.name.lower():
-                    matched_codes["ind"].add(ind.code)
-                    matched_codes["ig"].add(ig.code)
-                    matched_codes["sector"].add(sector.name)
-                for sub in ind.sub_industries:
-                    if keyword and keyword in sub.name.lower():
-                        matched_codes["sub"].add(sub.code)
-                        matched_codes["ind"].add(ind.code)
-                        matched_codes["ig"].add(ig.code)
-                        matched_codes["sector"].add(sector.name)
+def _matched_nodes(snapshot, sector, keyword):
+    """Nodes in the sector's subtree that match, plus all of their ancestors (one range scan)."""
+    matched = set()
+    if not keyword:
+        return matched
+    names_lower, parents = snapshot.names_lower, snapshot.parents
+    for node in range(sector, int(snapshot.subtree_end[sector])):
+        if keyword in names_lower[node]:
+            while node >= 0 and node not in matched:
+                matched.add(node)
+                node = int(parents[node])
+    return matched
 
-    html = "<div>"
-    for sector in sectors:
-        sector_hit = sector.name in matched_codes["sector"]
-        sector_label = f"<b>{sector.name}</b>" if sector_hit else sector.name
-        html += f"<details><summary>📁 {sector_label}</summary>"
+def _label(snapshot, node, matched, with_code=True):
+    text = f"{snapshot.codes[node]} - {snapshot.names[node]}" if with_code else snapshot.names[node]
+    return f"<b>{escape(text)}</b>" if node in matched else escape(text)
 
-        for ig in sector.industry_groups:
-            ig_hit = ig.code in matched_codes["ig"]
-            ig_text = f"{ig.code} - {ig.name}"
-            ig_label = f"<b>{ig_text}</b>" if ig_hit else ig_text
-            html += f"<details style='margin-left:20px'><summary>📂 {ig_label}</summary>"
+def iter_naics_html(snapshot, sector_ids, keyword, expanded=None):
+    """
+    Yield the NAICS tree as HTML chunks.
+    Sectors not in ``expanded`` (None expands all) are emitted as a single collapsed
+    placeholder line; their children are only produced once the sector is expanded.
+    """
+    keyword = keyword.strip().lower()
+    children = snapshot.children
 
-            for ind in ig.industries:
-                ind_hit = ind.code in matched_codes["ind"]
-                ind_text = f"{ind.code} - {ind.name}"
-                ind_label = f"<b>{ind_text}</b>" if ind_hit else ind_text
-                html += f"<details style='margin-left:40px'><summary>🏭 {ind_label}</summary>"
+    yield "<div>"
+    for sector in sector_ids:
+        matched = _matched_nodes(snapshot, sector, keyword)
+        sector_label = _label(snapshot, sector, matched, with_code=False)
 
-                for sub in ind.sub_industries:
-                    sub_text = f"{sub.code} - {sub.name}"
-                    sub_label = highlight(sub_text, keyword)
-                    html += f"<p style='margin-left:60px'>🏷 {sub_label}</p>"
+        if expanded is not None and sector not in expanded:
+            size = int(snapshot.subtree_end[sector]) - sector - 1
+            yield (f"<details><summary>📁 {sector_label} "
+                   f"<span style='color: gray; font-size: 0.85em;'>({size} codes, expand to load)</span>"
+                   f"</summary></details>")
+            continue
 
-                html += "</details>"
-            html += "</details>"
-        html += "</details>"
-    html += "</div>"
+        yield f"<details><summary>📁 {sector_label}</summary>"
+        for ig in children(sector):
+            yield f"<details style='margin-left:20px'><summary>📂 {_label(snapshot, ig, matched)}</summary>"
+            for ind in children(ig):
+                yield f"<details style='margin-left:40px'><summary>🏭 {_label(snapshot, ind, matched)}</summary>"
+                for sub in children(ind):
+                    sub_label = _highlight(f"{snapshot.codes[sub]} - {snapshot.names[sub]}", keyword)
+                    national = children(sub)
+                    if not len(national):
+                        yield f"<p style='margin-left:60px'>🏷 {sub_label}</p>"
+                        continue
+                    yield f"<details style='margin-left:60px'><summary>🏷 {sub_label}</summary>"
+                    for nat in national:
+                        nat_label = _highlight(f"{snapshot.codes[nat]} - {snapshot.names[nat]}", keyword)
+                        yield f"<p style='margin-left:80px'>🔹 {nat_label}</p>"
+                    yield "</details>"
+                yield "</details>"
+            yield "</details>"
+        yield "</details>"
+    yield "</div>"
 
-    return str(BeautifulSoup(html, "html.parser"))
\ No newline at end of file
+def generate_naics_html(snapshot, sector_ids, keyword, expanded=None):
+    return "".join(iter_naics_html(snapshot, sector_ids, keyword, expanded))
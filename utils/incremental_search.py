@@ -0,0 +1,118 @@
+import threading
+import weakref
+from typing import Dict, Sequence
+
+import numpy as np
+
+from utils.search_results import QueryCache
+
+
+class SubstringIndex:
+    """
+    Sorted suffixes of every distinct whitespace-separated token in the names.
+
+    A query word has no whitespace, so it occurs in a name exactly when it occurs
+    in one of the name's tokens, i.e. when it is a prefix of one of their suffixes.
+    All suffixes starting with the word form one contiguous slice of the sorted
+    array (two binary searches), which keeps the `word in name` semantics of the
+    scan and FTS5 tiers without touching every name.
+    """
+
+    def __init__(self, names_lower: Sequence[str]):
+        self.size = len(names_lower)
+        tokens: Dict[str, list] = {}
+        token_counts = np.zeros(self.size, dtype=np.int32)
+        for node, name in enumerate(names_lower):
+            words = name.split()
+            token_counts[node] = len(words)
+            for token in set(words):
+                tokens.setdefault(token, []).append(node)
+        self.token_counts = token_counts
+        self.avg_tokens = float(token_counts.mean()) if self.size else 0.0
+
+        vocabulary = sorted(tokens)
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int32)
+        np.cumsum([len(tokens[t]) for t in vocabulary], out=offsets[1:])
+        self.token_offsets = offsets
+        self.token_postings = (np.concatenate([np.asarray(tokens[t], dtype=np.int32) for t in vocabulary])
+                               if vocabulary else np.empty(0, dtype=np.int32))
+
+        suffixes = [(token[i:], token_id) for token_id, token in enumerate(vocabulary) for i in range(len(token))]
+        suffixes.sort()
+        self.suffixes = np.asarray([s for s, _ in suffixes], dtype=str)
+        self.suffix_tokens = np.asarray([t for _, t in suffixes], dtype=np.int32)
+
+    def containing(self, word: str) -> np.ndarray:
+        """Sorted node ids whose name contains ``word``."""
+        lo = np.searchsorted(self.suffixes, word, side="left")
+        hi = np.searchsorted(self.suffixes, word + "\uffff", side="left")
+        token_ids = np.unique(self.suffix_tokens[lo:hi])
+        if not len(token_ids):
+            return np.empty(0, dtype=np.int32)
+        starts, ends = self.token_offsets[token_ids], self.token_offsets[token_ids + 1]
+        return np.unique(np.concatenate([self.token_postings[s:e] for s, e in zip(starts, ends)]))
+
+    def matching_all(self, words: Sequence[str]) -> np.ndarray:
+        """Sorted node ids whose name contains every word (longest, usually rarest, word first)."""
+        if not words:
+            return np.arange(self.size, dtype=np.int32)
+        nodes = None
+        for word in sorted(set(words), key=len, reverse=True):
+            found = self.containing(word)
+            nodes = found if nodes is None else np.intersect1d(nodes, found, assume_unique=True)
+            if not len(nodes):
+                break
+        return nodes.astype(np.int32)
+
+
+_indexes: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_substring_index(snapshot) -> SubstringIndex:
+    """One SubstringIndex per snapshot, shared by every session in the process."""
+    with _lock:
+        index = _indexes.get(snapshot)
+        if index is None:
+            index = _indexes[snapshot] = SubstringIndex(snapshot.names_lower)
+        return index
+
+
+# Candidate sets of recent queries, shared by every session (a refinement in one
+# session can narrow the set another session's keystroke left behind)
+CANDIDATE_CACHE = QueryCache(maxsize=2048, ttl=300.0)
+
+
+def incremental_matches(snapshot, query: str, phrase: bool = False) -> np.ndarray:
+    """
+    Nodes whose lowercased name contains every word of the normalized ``query``
+    (and, with ``phrase``, the whole query), in node order.
+
+    If an earlier query that is a prefix of this one ("rice" → "rice mi" → "rice mill")
+    is still cached, its candidates are a superset of the answer: only they are
+    re-checked. Otherwise the substring index answers from scratch.
+    """
+    mode = "phrase" if phrase else "words"
+    key = (snapshot.taxonomy, snapshot.version, mode)
+    cached = CANDIDATE_CACHE.get((*key, query))
+    if cached is not None:
+        return cached
+
+    words = query.split()
+    names = snapshot.names_lower
+    for end in range(len(query) - 1, 0, -1):
+        previous = CANDIDATE_CACHE.peek((*key, query[:end]))
+        if previous is not None:
+            nodes = np.asarray([i for i in previous.tolist()
+                                if all(w in names[i] for w in words) and (not phrase or query in names[i])],
+                               dtype=np.int32)
+            break
+    else:
+        nodes = get_substring_index(snapshot).matching_all(words)
+        if phrase and len(words) > 1:
+            keep = np.fromiter((query in names[i] for i in nodes.tolist()), dtype=bool, count=len(nodes))
+            nodes = nodes[keep]
+
+    nodes.flags.writeable = False
+    CANDIDATE_CACHE.put((*key, query), nodes)
+    return nodes
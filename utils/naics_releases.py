@@ -0,0 +1,274 @@
+import re
+import threading
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.exc import OperationalError
+
+from models.naics_models import NaicsChange, NaicsNode, NaicsRelease
+from utils.db import database_version, get_engine
+from utils.hierarchy_snapshot import NAICS_LEVEL_NAMES, HierarchySnapshot, snapshot_from_rows
+from utils.hot_reload import table_hash
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+MAX_RELEASES = 62  # bits in a signed 64-bit integer, leaving the sign alone
+
+# Census change indicators in the structure files (newer release relative to the previous one)
+CHANGE_INDICATORS = {
+    "*": "title",
+    "**": "new",
+    "***": "content",
+    "****": "title_content",
+}
+
+PREVIOUS = ""  # from_release of indicator rows: "the release before, as declared by Census"
+
+
+class Change(NamedTuple):
+    code: str
+    sector_code: str
+    change: str
+    indicator: Optional[str]
+    old_name: Optional[str]
+    new_name: Optional[str]
+
+
+def release_from_csv(path: str) -> Optional[str]:
+    """The vintage named in a Census structure file's header ("2022 NAICS Code" → "2022")."""
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        head = "".join(f.readline() for _ in range(3))
+    match = re.search(r"(\d{4}) NAICS", head)
+    return match.group(1) if match else None
+
+
+def _release_order(release: str):
+    return (0, int(release)) if release.isdigit() else (1, release)
+
+
+def _sector_of(code: str, tree: Dict[str, tuple]) -> str:
+    while tree[code][1] is not None and tree[code][1] in tree:
+        code = tree[code][1]
+    return code
+
+
+def diff_releases(old: Dict[str, tuple], new: Dict[str, tuple],
+                  indicators: Optional[Dict[str, str]] = None) -> List[Change]:
+    """
+    Structural diff of two releases given as {code: (name, parent_code)}.
+    ``indicators`` are the newer release's Census change indicators; they flag
+    content changes that leave code and title untouched.
+    """
+    indicators = indicators or {}
+    changes = []
+    for code in new.keys() | old.keys():
+        indicator = indicators.get(code)
+        if code not in old:
+            kinds = ["added"]
+        elif code not in new:
+            kinds = ["removed"]
+        else:
+            kinds = []
+            if old[code][0] != new[code][0]:
+                kinds.append("renamed")
+            if old[code][1] != new[code][1]:
+                kinds.append("moved")
+            if indicator in ("***", "****"):
+                kinds.append("content")
+        if kinds:
+            tree = new if code in new else old
+            changes.append(Change(
+                code, _sector_of(code, tree), ",".join(kinds), indicator,
+                old[code][0] if code in old else None, new[code][0] if code in new else None,
+            ))
+    return changes
+
+
+def _release_tree(conn, bit: int) -> Dict[str, tuple]:
+    rows = conn.execute(
+        select(NaicsNode.code, NaicsNode.name, NaicsNode.parent_code).where(NaicsNode.releases.op("&")(1 << bit) != 0)
+    ).all()
+    return {code: (name, parent) for code, name, parent in rows}
+
+
+def _change_records(from_release: str, to_release: str, changes: List[Change]) -> List[dict]:
+    return [{"from_release": from_release, "to_release": to_release, **change._asdict()} for change in changes]
+
+
+def _release_records(df: "pd.DataFrame") -> Tuple[List[dict], Dict[str, str]]:
+    """NaicsNode records and {code: Census change indicator} for a parsed structure file."""
+    import pandas as pd  # loader-only; the API imports this module for reads
+
+    records = pd.DataFrame({
+        "code": df["code"],
+        "name": df["title"],
+        "level": df["level"].astype(int) - 2,
+        "parent_code": df["parent_code"].where(df["parent_code"].notna(), None),
+    }).to_dict("records")
+    indicators = {
+        code: indicator for code, indicator in zip(df["code"], df["change_indicator"])
+        if isinstance(indicator, str) and indicator in CHANGE_INDICATORS
+    }
+    return records, indicators
+
+
+def release_unchanged(conn, release: str, df: "pd.DataFrame") -> bool:
+    """Whether the store already holds ``release`` with exactly these rows and change indicators."""
+    records, indicators = _release_records(df)
+    bit = conn.execute(select(NaicsRelease.bit).where(NaicsRelease.release == release)).scalar()
+    if bit is None:
+        return False
+    tree = {r["code"]: (r["name"], r["parent_code"]) for r in records}
+    indicators = {code: indicator for code, indicator in indicators.items() if code in tree}
+    return (table_hash(_release_tree(conn, bit)) == table_hash(tree)
+            and table_hash(_stored_indicators(conn).get(release, {})) == table_hash(indicators))
+
+
+def store_release(engine, release: str, df: "pd.DataFrame", source: str = "") -> dict:
+    """
+    Add (or replace) one release in the versioned store.
+
+    Nodes whose (code, title, parent) already exist in another release are shared:
+    only the release bit is set. Diffs against every other stored release, plus the
+    release's own Census change indicators, are recomputed in the same transaction.
+    """
+    records, indicators = _release_records(df)
+
+    with engine.begin() as conn:
+        bits = dict(conn.execute(select(NaicsRelease.release, NaicsRelease.bit)).all())
+        if release in bits:
+            bit = bits[release]
+        else:
+            free = sorted(set(range(MAX_RELEASES)) - set(bits.values()))
+            if not free:
+                raise ValueError(f"The store already holds {MAX_RELEASES} NAICS releases")
+            bit = free[0]
+        mask = 1 << bit
+
+        # Replace this release's membership; definitions no release uses any more go away
+        conn.execute(update(NaicsNode).values(releases=NaicsNode.releases.op("&")(~mask)))
+        conn.execute(delete(NaicsNode).where(NaicsNode.releases == 0))
+        conn.execute(delete(NaicsRelease).where(NaicsRelease.release == release))
+        conn.execute(NaicsRelease.__table__.insert(), {
+            "release": release, "bit": bit, "source": source, "node_count": len(records),
+        })
+
+        existing = {
+            (code, name, parent): node_id
+            for node_id, code, name, parent in conn.execute(
+                select(NaicsNode.id, NaicsNode.code, NaicsNode.name, NaicsNode.parent_code)
+            )
+        }
+        shared = [{"node_id": existing[key]} for key in
+                  ((r["code"], r["name"], r["parent_code"]) for r in records) if key in existing]
+        new = [{**r, "releases": mask} for r in records if (r["code"], r["name"], r["parent_code"]) not in existing]
+        if shared:
+            conn.execute(
+                update(NaicsNode).where(NaicsNode.id == bindparam("node_id"))
+                .values(releases=NaicsNode.releases.op("|")(mask)),
+                shared,
+            )
+        if new:
+            conn.execute(NaicsNode.__table__.insert(), new)
+
+        # === Diff index ===
+        conn.execute(delete(NaicsChange).where(
+            (NaicsChange.from_release == release) | (NaicsChange.to_release == release)
+        ))
+        tree = {r["code"]: (r["name"], r["parent_code"]) for r in records}
+        change_rows = _change_records(PREVIOUS, release, [
+            Change(code, _sector_of(code, tree), CHANGE_INDICATORS[indicator], indicator, None, tree[code][0])
+            for code, indicator in indicators.items() if code in tree
+        ])
+        stored_indicators = _stored_indicators(conn)
+        for other, other_bit in bits.items():
+            if other == release:
+                continue
+            other_tree = _release_tree(conn, other_bit)
+            if _release_order(other) < _release_order(release):
+                change_rows += _change_records(other, release, diff_releases(other_tree, tree, indicators))
+            else:
+                change_rows += _change_records(
+                    release, other, diff_releases(tree, other_tree, stored_indicators.get(other)))
+        if change_rows:
+            conn.execute(NaicsChange.__table__.insert(), change_rows)
+
+    return {"release": release, "nodes": len(records), "shared": len(shared), "new": len(new),
+            "changes": len(change_rows)}
+
+
+def _stored_indicators(conn) -> Dict[str, Dict[str, str]]:
+    rows = conn.execute(
+        select(NaicsChange.to_release, NaicsChange.code, NaicsChange.indicator)
+        .where(NaicsChange.from_release == PREVIOUS)
+    ).all()
+    indicators: Dict[str, Dict[str, str]] = {}
+    for release, code, indicator in rows:
+        indicators.setdefault(release, {})[code] = indicator
+    return indicators
+
+
+def list_releases(conn) -> List[str]:
+    """Stored releases, oldest first ([] for a database without the versioned store)."""
+    try:
+        releases = conn.execute(select(NaicsRelease.release)).scalars().all()
+    except OperationalError:
+        return []
+    return sorted(releases, key=_release_order)
+
+
+def changes_between(conn, from_release: str, to_release: str, sector: Optional[str] = None) -> List[Change]:
+    """
+    Precomputed changes from one release to another, optionally only under one sector.
+    ``from_release=""`` returns the newer release's own Census change indicators.
+    Accepts "31" for the "31-33" range sector.
+    """
+    query = select(NaicsChange.code, NaicsChange.sector_code, NaicsChange.change, NaicsChange.indicator,
+                   NaicsChange.old_name, NaicsChange.new_name).where(
+        NaicsChange.from_release == from_release, NaicsChange.to_release == to_release)
+    if sector:
+        sectors = conn.execute(select(NaicsChange.sector_code).distinct().where(
+            NaicsChange.from_release == from_release, NaicsChange.to_release == to_release)).scalars().all()
+        query = query.where(NaicsChange.sector_code == _resolve_sector(sector, sectors))
+    return [Change(*row) for row in conn.execute(query.order_by(NaicsChange.sector_code, NaicsChange.code))]
+
+
+def _resolve_sector(sector: str, sectors: List[str]) -> str:
+    sector = sector.strip()
+    for candidate in sectors:
+        match = re.fullmatch(r"(\d{2})-(\d{2})", candidate)
+        if match and sector.isdigit() and int(match.group(1)) <= int(sector) <= int(match.group(2)):
+            return candidate
+    return sector
+
+
+def build_release_snapshot(engine, release: str, version: str = "") -> HierarchySnapshot:
+    """Snapshot of one stored release, for version-pinned browsing and search."""
+    with engine.connect() as conn:
+        bit = conn.execute(select(NaicsRelease.bit).where(NaicsRelease.release == release)).scalar()
+        if bit is None:
+            raise KeyError(release)
+        rows = conn.execute(
+            select(NaicsNode.level, NaicsNode.code, NaicsNode.name, NaicsNode.parent_code)
+            .where(NaicsNode.releases.op("&")(1 << bit) != 0).order_by(NaicsNode.code)
+        ).all()
+    rows_by_level: List[List[tuple]] = [[] for _ in NAICS_LEVEL_NAMES]
+    for level, code, name, parent in rows:
+        rows_by_level[level].append((code, name, parent))
+    return snapshot_from_rows("naics", rows_by_level, NAICS_LEVEL_NAMES, f"{version}@{release}")
+
+
+_snapshots: Dict[Tuple[str, str], HierarchySnapshot] = {}
+_lock = threading.Lock()
+
+
+def get_release_snapshot(database_path: str, release: str) -> HierarchySnapshot:
+    """Pinned snapshot per (database, release), rebuilt only when the database file changes."""
+    version = database_version(database_path)
+    key = (database_path, release)
+    with _lock:
+        snapshot = _snapshots.get(key)
+        if snapshot is None or snapshot.version != f"{version}@{release}":
+            snapshot = _snapshots[key] = build_release_snapshot(get_engine(database_path), release, version)
+        return snapshot
@@ -0,0 +1,184 @@
+import contextvars
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+METRIC_PREFIX = "gics_app"
+
+
+class SpanRecord(NamedTuple):
+    name: str
+    depth: int
+    ms: float
+    queries: int
+    rows: int
+
+
+class Profile:
+    """Timing spans and SQL counters for one Streamlit rerun or one API request."""
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.started = time.perf_counter()
+        self.spans: List[Optional[SpanRecord]] = []
+        self.queries = 0
+        self.rows = 0
+        self.sql_ms = 0.0
+        self._depth = 0
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def enter(self, name: str) -> Tuple[int, str, int, int, int]:
+        # Reserve the slot now so spans list in start order, parents before children
+        self.spans.append(None)
+        self._depth += 1
+        return len(self.spans) - 1, name, self._depth - 1, self.queries, self.rows
+
+    def exit(self, token, seconds: float) -> None:
+        index, name, depth, queries, rows = token
+        self._depth -= 1
+        self.spans[index] = SpanRecord(name, depth, seconds * 1000, self.queries - queries, self.rows - rows)
+
+    def records(self) -> List[SpanRecord]:
+        return [record for record in self.spans if record is not None]
+
+
+_current: contextvars.ContextVar[Optional[Profile]] = contextvars.ContextVar("profile", default=None)
+
+
+def start_profile(label: str = "") -> Profile:
+    """Begin a fresh profile for the current rerun / request; spans and queries below attach to it."""
+    profile = Profile(label)
+    _current.set(profile)
+    return profile
+
+
+def current_profile() -> Optional[Profile]:
+    return _current.get()
+
+
+# === Process-wide counters (exported in Prometheus text format) ===
+class MetricsRegistry:
+    """Monotonic counters and count/sum summaries, enough for a Prometheus scrape."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._types: Dict[str, str] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._types.setdefault(name, "counter")
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._types[name] = "summary"
+            self._values[(f"{name}_count", key)] = self._values.get((f"{name}_count", key), 0.0) + 1
+            self._values[(f"{name}_sum", key)] = self._values.get((f"{name}_sum", key), 0.0) + seconds
+
+    def render(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        with self._lock:
+            values = sorted(self._values.items())
+            types = dict(self._types)
+        lines = []
+        for name, kind in sorted(types.items()):
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in values:
+                if metric == name or (kind == "summary" and metric in (f"{name}_count", f"{name}_sum")):
+                    label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                    lines.append(f"{metric}{{{label_text}}} {value:g}" if label_text else f"{metric} {value:g}")
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+@contextmanager
+def span(name: str):
+    """Time a block; recorded on the current profile (if any) and in METRICS."""
+    profile = _current.get()
+    token = profile.enter(name) if profile is not None else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if token is not None:
+            profile.exit(token, elapsed)
+        METRICS.observe(f"{METRIC_PREFIX}_span_seconds", elapsed, span=name)
+
+
+# === SQL counters ===
+def _record_rows(count: int) -> None:
+    if count <= 0:
+        return
+    profile = _current.get()
+    if profile is not None:
+        profile.rows += count
+    METRICS.inc(f"{METRIC_PREFIX}_sql_rows_total", count)
+
+
+class CountingCursor(sqlite3.Cursor):
+    """sqlite3 cursor that counts fetched rows; DB-API has no hook SQLAlchemy could listen to."""
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            _record_rows(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany() if size is None else super().fetchmany(size)
+        _record_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        _record_rows(len(rows))
+        return rows
+
+
+class CountingConnection(sqlite3.Connection):
+    """Pass as ``connect_args={"factory": CountingConnection}`` to count rows read."""
+
+    def cursor(self, factory=CountingCursor):
+        return super().cursor(factory)
+
+
+def instrument_engine(engine) -> None:
+    """Count queries, SQL time and affected rows for every statement on ``engine``."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        profile = _current.get()
+        if profile is not None:
+            profile.queries += 1
+            profile.sql_ms += elapsed * 1000
+        METRICS.inc(f"{METRIC_PREFIX}_sql_queries_total")
+        METRICS.inc(f"{METRIC_PREFIX}_sql_seconds_total", elapsed)
+        _record_rows(cursor.rowcount)  # -1 for SELECT; fetched rows are counted by CountingCursor
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        # A failed statement never reaches after_cursor_execute; drop its start time so
+        # the stack does not grow on a pooled connection
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+        METRICS.inc(f"{METRIC_PREFIX}_sql_errors_total")
@@ -0,0 +1,98 @@
+import base64
+import binascii
+import math
+from bisect import bisect_right
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.incremental_search import get_substring_index
+from utils.search_results import MatchView, SearchResult
+
+# Okapi BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+PHRASE_BOOST = 1.5  # the words appear together, in order
+EXACT_BOOST = 2.0   # the title is exactly the query
+
+DEFAULT_PAGE_SIZE = 25
+
+
+def bm25_scores(snapshot, nodes: Sequence[int], query: str):
+    """
+    BM25 relevance of each node's name to the normalized ``query``.
+
+    Every level is one corpus: document frequency counts names at all levels, and
+    length normalization lets a short sector title outrank a long national-industry
+    title that merely mentions the word.
+    """
+    index = get_substring_index(snapshot)
+    names = snapshot.names_lower
+    words = query.split()
+    idf = {}
+    for word in set(words):
+        df = len(index.containing(word))
+        idf[word] = math.log(1 + (index.size - df + 0.5) / (df + 0.5))
+
+    nodes = np.asarray(nodes, dtype=np.int64)
+    norms = BM25_K1 * (1 - BM25_B + BM25_B * index.token_counts[nodes] / (index.avg_tokens or 1))
+    scores = np.zeros(len(nodes))
+    for word in set(words):
+        tf = np.fromiter((names[node].count(word) for node in nodes.tolist()), dtype=np.float64, count=len(nodes))
+        scores += words.count(word) * idf[word] * tf * (BM25_K1 + 1) / (tf + norms)
+    for i, node in enumerate(nodes.tolist()):
+        if names[node] == query:
+            scores[i] *= EXACT_BOOST
+        elif len(words) > 1 and query in names[node]:
+            scores[i] *= PHRASE_BOOST
+    return np.round(scores, 4).tolist()
+
+
+def _sort_key(match: MatchView) -> tuple:
+    return -match.score, match.node
+
+
+def rank_matches(matches: Sequence[MatchView], scores: Sequence[float]) -> Tuple[MatchView, ...]:
+    """Attach scores and order best first (pre-order, so ancestors first, on ties)."""
+    return tuple(sorted((m._replace(score=float(s)) for m, s in zip(matches, scores)), key=_sort_key))
+
+
+# === Cursor pagination ===
+class Page(NamedTuple):
+    matches: Tuple[MatchView, ...]
+    total: int
+    next_cursor: Optional[str]
+
+
+def encode_cursor(version: str, match: MatchView) -> str:
+    """Opaque keyset cursor: resume after (score, node) of ``match`` within data ``version``."""
+    raw = f"{version}|{match.score!r}|{match.node}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, float, int]:
+    """(version, score, node) of a cursor; ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        version, score, node = raw.rsplit("|", 2)
+        return version, float(score), int(node)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Malformed cursor")
+
+
+def paginate(result: SearchResult, version: str, limit: int = DEFAULT_PAGE_SIZE,
+             cursor: Optional[str] = None) -> Page:
+    """
+    One page of ranked matches. The cursor names the last match already seen, so
+    pages stay stable while the (immutable, versioned) result is cached; a cursor
+    from another data version raises ValueError.
+    """
+    start = 0
+    if cursor:
+        cursor_version, score, node = decode_cursor(cursor)
+        if cursor_version != version:
+            raise ValueError("Cursor belongs to an older version of the data; search again")
+        start = bisect_right([_sort_key(m) for m in result.matches], (-score, node))
+    matches = result.matches[start:start + limit]
+    more = start + limit < len(result.matches)
+    return Page(matches, len(result.matches), encode_cursor(version, matches[-1]) if more and matches else None)
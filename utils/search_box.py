@@ -0,0 +1,23 @@
+import os
+
+import streamlit.components.v1 as components
+
+SEARCH_DEBOUNCE_MS = int(os.getenv("SEARCH_DEBOUNCE_MS", "300"))
+
+_COMPONENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "components", "search_box")
+_search_box = components.declare_component("search_box", path=_COMPONENT_DIR)
+
+
+def search_box(label: str, value: str = "", key=None, placeholder: str = "",
+               debounce_ms: int = SEARCH_DEBOUNCE_MS, min_chars: int = 0) -> str:
+    """
+    Text input that searches as the user types.
+
+    The browser only sends the value after ``debounce_ms`` without a keystroke (or on
+    Enter / blur), and never sends the same value twice, so fast typing triggers one
+    rerun per pause rather than one per key. ``value`` seeds a new widget; change
+    ``key`` to replace the text of an existing one.
+    """
+    result = _search_box(label=label, value=value, placeholder=placeholder, debounce_ms=debounce_ms,
+                         min_chars=min_chars, key=key, default=value)
+    return (result or "").strip()
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+from html import escape
+from typing import Callable, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+Span = Tuple[int, int]
+
+
+class MatchView(NamedTuple):
+    """One matching node; ``spans`` are [start, end) offsets into the raw ``name``."""
+    node: int
+    code: str
+    level: int
+    name: str
+    spans: Tuple[Span, ...]
+    score: float = 0.0  # relevance within its result; matches are ranked best first
+
+
+class SearchResult(NamedTuple):
+    sectors: Tuple[int, ...]
+    matches: Tuple[MatchView, ...]
+    suggestion: Optional[str] = None
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def find_spans(name: str, terms: Sequence[str]) -> Tuple[Span, ...]:
+    """Merged spans of every case-insensitive occurrence of ``terms`` in ``name``."""
+    lowered = name.lower()
+    spans: List[Span] = []
+    for term in terms:
+        if not term:
+            continue
+        start = lowered.find(term)
+        while start >= 0:
+            spans.append((start, start + len(term)))
+            start = lowered.find(term, start + 1)
+    spans.sort()
+    merged: List[Span] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return tuple(merged)
+
+
+HIGHLIGHT = "<span style='background-color: #ffff66;'><b>{}</b></span>"
+
+
+def highlight_spans(text: str, spans: Sequence[Span]) -> str:
+    """HTML for ``text`` with each [start, end) span highlighted; every piece is escaped."""
+    parts, cursor = [], 0
+    for start, end in spans:
+        parts.append(escape(text[cursor:start]))
+        parts.append(HIGHLIGHT.format(escape(text[start:end])))
+        cursor = end
+    parts.append(escape(text[cursor:]))
+    return "".join(parts)
+
+
+class QueryCache:
+    """Thread-safe LRU cache with a per-entry time-to-live, shared by every session."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key: Hashable):
+        """Like ``get`` but without counting a hit or miss (for speculative probes)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            return entry[1]
+
+    def put(self, key: Hashable, value) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], object]):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+SEARCH_CACHE = QueryCache()
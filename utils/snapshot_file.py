@@ -0,0 +1,263 @@
+"""
+Single-file, memory-mappable snapshot of both taxonomies.
+
+Layout (little-endian, every section 8-byte aligned):
+
+    b"TAXSNAP\\0" | uint32 format | uint32 manifest length | manifest JSON | sections ...
+
+The manifest records, per taxonomy, the source database fingerprint, level names,
+stats and an (offset, dtype, length) entry per section. Strings live in
+offset-indexed tables: an ``<name>_offsets`` uint32 array plus a UTF-8
+``<name>_blob``. Numeric sections are used in place via ``np.frombuffer``, so every
+process mapping the file shares the same pages and nothing goes through the ORM.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+from collections.abc import Sequence
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.db import GICS_DB_PATH, NAICS_DB_PATH, database_fingerprint, database_version, get_engine
+from utils.fuzzy_index import FuzzyIndex, register_fuzzy_index
+from utils.hierarchy_snapshot import HierarchySnapshot, build_gics_snapshot, build_naics_snapshot
+from utils.taxonomy_stats import compute_stats, read_stats
+
+SNAPSHOT_PATH = os.path.abspath(os.getenv("SNAPSHOT_PATH", "taxonomy.snap"))
+MAGIC = b"TAXSNAP\0"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+_ALIGN = 8
+
+_TREE_ARRAYS = ("levels", "parents", "child_offsets", "child_index", "roots", "subtree_end")
+
+
+class StringTable(Sequence):
+    """Read-only sequence of strings decoded on access from an offsets array and a UTF-8 blob."""
+
+    def __init__(self, offsets: np.ndarray, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        index = int(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return str(self._blob[int(self._offsets[index]):int(self._offsets[index + 1])], "utf-8")
+
+    def __iter__(self):
+        blob, offsets = self._blob, self._offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield str(blob[start:end], "utf-8")
+
+
+# === Writing ===
+def _string_sections(prefix: str, strings) -> Dict[str, np.ndarray]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return {f"{prefix}_offsets": offsets, f"{prefix}_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8)}
+
+
+def _taxonomy_sections(snapshot: HierarchySnapshot) -> Dict[str, np.ndarray]:
+    sections = {name: np.ascontiguousarray(getattr(snapshot, name)) for name in _TREE_ARRAYS}
+    sections.update(_string_sections("codes", snapshot.codes))
+    sections.update(_string_sections("names", snapshot.names))
+    sections.update(_string_sections("names_lower", snapshot.names_lower))
+
+    # Fuzzy-tier bigram postings in CSR form
+    fuzzy = FuzzyIndex(snapshot)
+    grams = sorted(fuzzy.postings)
+    sections.update(_string_sections("grams", grams))
+    gram_offsets = np.zeros(len(grams) + 1, dtype=np.uint32)
+    np.cumsum([len(fuzzy.postings[g]) for g in grams], out=gram_offsets[1:])
+    sections["gram_offsets"] = gram_offsets
+    sections["gram_postings"] = (np.concatenate([fuzzy.postings[g] for g in grams]) if grams
+                                 else np.empty(0, dtype=np.int32)).astype(np.int32)
+    sections["name_lengths"] = fuzzy.lengths.astype(np.int32)
+    return sections
+
+
+def write_snapshot_file(path: str, snapshots: Dict[str, HierarchySnapshot], stats: Dict[str, dict],
+                        fingerprints: Dict[str, str]) -> int:
+    """
+    Write every snapshot to ``path`` atomically (temp file + rename), so processes
+    that still map the old file keep reading it. Returns the file size in bytes.
+    """
+    manifest = {"format": FORMAT_VERSION, "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "taxonomies": {}}
+    payload = []
+    for taxonomy, snapshot in snapshots.items():
+        entries = {}
+        for name, array in _taxonomy_sections(snapshot).items():
+            entries[name] = [array.dtype.str, len(array)]
+            payload.append((taxonomy, name, array))
+        manifest["taxonomies"][taxonomy] = {
+            "fingerprint": fingerprints[taxonomy],
+            "level_names": list(snapshot.level_names),
+            "count": len(snapshot),
+            "stats": stats.get(taxonomy),
+            "sections": entries,
+        }
+
+    # Section offsets follow the manifest, whose length depends on them: leave room for the digits
+    base = len(json.dumps(manifest)) + 16 * len(payload)
+    base = -(-(_HEADER.size + base) // _ALIGN) * _ALIGN
+    offset = base
+    for taxonomy, name, array in payload:
+        offset = -(-offset // _ALIGN) * _ALIGN
+        manifest["taxonomies"][taxonomy]["sections"][name].append(offset)
+        offset += array.nbytes
+    manifest_bytes = json.dumps(manifest).encode("utf-8").ljust(base - _HEADER.size)
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(manifest_bytes)))
+        f.write(manifest_bytes)
+        for taxonomy, name, array in payload:
+            offset = manifest["taxonomies"][taxonomy]["sections"][name][2]
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(array.tobytes())
+        size = f.tell()
+    os.replace(tmp_path, path)
+    return size
+
+
+# === Reading ===
+class SnapshotFile:
+    """A mapped snapshot file; taxonomies are exposed as HierarchySnapshot views into the mapping."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, file_format, manifest_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or file_format != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a format {FORMAT_VERSION} taxonomy snapshot")
+        self.manifest = json.loads(bytes(self._mmap[_HEADER.size:_HEADER.size + manifest_length]))
+        self._view = memoryview(self._mmap)
+        self._snapshots: Dict[Tuple[str, str], HierarchySnapshot] = {}
+        self._lock = threading.Lock()
+
+    def _section(self, taxonomy: str, name: str) -> np.ndarray:
+        dtype, length, offset = self.manifest["taxonomies"][taxonomy]["sections"][name]
+        return np.frombuffer(self._view, dtype=np.dtype(dtype), count=length, offset=offset)
+
+    def _strings(self, taxonomy: str, prefix: str) -> StringTable:
+        _, length, offset = self.manifest["taxonomies"][taxonomy]["sections"][f"{prefix}_blob"]
+        return StringTable(self._section(taxonomy, f"{prefix}_offsets"), self._view[offset:offset + length])
+
+    def fingerprint(self, taxonomy: str) -> Optional[str]:
+        entry = self.manifest["taxonomies"].get(taxonomy)
+        return entry["fingerprint"] if entry else None
+
+    def stats(self, taxonomy: str) -> Optional[dict]:
+        return self.manifest["taxonomies"].get(taxonomy, {}).get("stats")
+
+    def snapshot(self, taxonomy: str, version: str = "") -> HierarchySnapshot:
+        """View of one taxonomy; ``version`` is the caller's data version, used in cache keys."""
+        with self._lock:
+            if (taxonomy, version) not in self._snapshots:
+                self._snapshots[taxonomy, version] = self._build(taxonomy, version)
+            return self._snapshots[taxonomy, version]
+
+    def _build(self, taxonomy: str, version: str) -> HierarchySnapshot:
+        entry = self.manifest["taxonomies"][taxonomy]
+        snapshot = HierarchySnapshot.from_arrays(
+            taxonomy,
+            self._strings(taxonomy, "codes"),
+            self._strings(taxonomy, "names"),
+            self._strings(taxonomy, "names_lower"),
+            {name: self._section(taxonomy, name) for name in _TREE_ARRAYS},
+            entry["level_names"],
+            version=version,
+        )
+        grams = self._strings(taxonomy, "grams")
+        offsets = self._section(taxonomy, "gram_offsets").tolist()
+        postings_array = self._section(taxonomy, "gram_postings")
+        postings = {gram: postings_array[offsets[i]:offsets[i + 1]] for i, gram in enumerate(grams)}
+        register_fuzzy_index(snapshot, FuzzyIndex(snapshot, postings=postings,
+                                                  lengths=self._section(taxonomy, "name_lengths")))
+        return snapshot
+
+
+_files: Dict[str, Tuple[Tuple[int, int], SnapshotFile]] = {}
+_lock = threading.Lock()
+
+
+def open_snapshot_file(path: str = SNAPSHOT_PATH) -> Optional[SnapshotFile]:
+    """The mapped file at ``path`` (re-mapped when it is replaced), or None if absent or unreadable."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_ino)
+    with _lock:
+        cached = _files.get(path)
+        if cached is None or cached[0] != key:
+            try:
+                cached = _files[path] = (key, SnapshotFile(path))
+            except (OSError, ValueError, struct.error, json.JSONDecodeError):
+                return None
+        return cached[1]
+
+
+def _matching_file(taxonomy: str, database_path: str, path: str) -> Optional[SnapshotFile]:
+    snapshot_file = open_snapshot_file(path)
+    if snapshot_file is None or snapshot_file.fingerprint(taxonomy) != database_fingerprint(database_path):
+        return None
+    return snapshot_file
+
+
+def mapped_snapshot(taxonomy: str, database_path: str, version: str = "",
+                    path: str = SNAPSHOT_PATH) -> Optional[HierarchySnapshot]:
+    """The mapped snapshot for ``taxonomy`` if the file was exported from this database's contents."""
+    snapshot_file = _matching_file(taxonomy, database_path, path)
+    return snapshot_file.snapshot(taxonomy, version) if snapshot_file else None
+
+
+def mapped_stats(taxonomy: str, database_path: str, path: str = SNAPSHOT_PATH) -> Optional[dict]:
+    snapshot_file = _matching_file(taxonomy, database_path, path)
+    return snapshot_file.stats(taxonomy) if snapshot_file else None
+
+
+def mapped_or_built(taxonomy: str, database_path: str, builder):
+    """Wrap a snapshot builder so it maps the snapshot file when that matches the database."""
+    def build(engine, version: str = "") -> HierarchySnapshot:
+        return mapped_snapshot(taxonomy, database_path, version) or builder(engine, version)
+    return build
+
+
+def export_snapshot_file(path: str = SNAPSHOT_PATH, sources: Optional[Dict[str, str]] = None) -> int:
+    """
+    Loader step: snapshot both databases as they are now and write the mapped file.
+    ``sources`` maps a live database path to a staged copy to read instead, so the file
+    can be written before the copy is swapped in (a rename keeps the fingerprint).
+    """
+    sources = sources or {}
+    snapshots, stats, fingerprints = {}, {}, {}
+    for taxonomy, db_path, builder in (("naics", NAICS_DB_PATH, build_naics_snapshot),
+                                       ("gics", GICS_DB_PATH, build_gics_snapshot)):
+        db_path = sources.get(db_path, db_path)
+        if not os.path.exists(db_path):
+            continue
+        engine = get_engine(db_path)
+        snapshots[taxonomy] = snapshot = builder(engine, database_version(db_path))
+        stats[taxonomy] = read_stats(engine) or compute_stats(snapshot)
+        fingerprints[taxonomy] = database_fingerprint(db_path)
+    return write_snapshot_file(path, snapshots, stats, fingerprints)
+
+
+if __name__ == "__main__":
+    size = export_snapshot_file()
+    print(f"✅ Wrote {SNAPSHOT_PATH} ({size / 1024:.0f} KiB)")
@@ -0,0 +1,82 @@
+import json
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+METADATA_TABLE = "taxonomy_metadata"
+STATS_KEY = "stats"
+
+
+def compute_stats(snapshot) -> dict:
+    """Per-level counts, per-sector breakdowns and depth / fan-out distributions."""
+    level_names = snapshot.level_names
+    levels = snapshot.levels
+    child_counts = np.diff(snapshot.child_offsets)
+    is_leaf = child_counts == 0
+
+    sectors = []
+    for sector in snapshot.roots:
+        sector = int(sector)
+        span = levels[sector:int(snapshot.subtree_end[sector])]
+        counts = np.bincount(span, minlength=len(level_names))
+        sectors.append({
+            "code": snapshot.codes[sector],
+            "name": snapshot.names[sector],
+            "counts": {name: int(c) for name, c in zip(level_names, counts)},
+        })
+
+    fan_out = {}
+    for level, name in enumerate(level_names[:-1]):
+        fan = child_counts[levels == level]
+        if not len(fan):
+            continue
+        values, freq = np.unique(fan, return_counts=True)
+        fan_out[name] = {
+            "min": int(fan.min()),
+            "max": int(fan.max()),
+            "mean": round(float(fan.mean()), 2),
+            "median": float(np.median(fan)),
+            "histogram": {str(int(v)): int(f) for v, f in zip(values, freq)},
+        }
+
+    leaf_depths = np.bincount(levels[is_leaf], minlength=len(level_names))
+    return {
+        "taxonomy": snapshot.taxonomy,
+        "total": len(snapshot),
+        "level_counts": snapshot.level_counts(),
+        "sectors": sectors,
+        "leaf_depths": {name: int(c) for name, c in zip(level_names, leaf_depths)},
+        "fan_out": fan_out,
+        "computed_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def write_stats(engine, snapshot) -> dict:
+    """Materialize stats next to the data; loaders call this after every rewrite."""
+    from sqlalchemy import text
+
+    stats = compute_stats(snapshot)
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {METADATA_TABLE} (key TEXT PRIMARY KEY, value TEXT NOT NULL)"))
+        conn.execute(
+            text(f"INSERT INTO {METADATA_TABLE} (key, value) VALUES (:key, :value) "
+                 f"ON CONFLICT(key) DO UPDATE SET value = excluded.value"),
+            {"key": STATS_KEY, "value": json.dumps(stats)},
+        )
+    return stats
+
+
+def read_stats(engine) -> Optional[dict]:
+    """Stored stats in one read, or None if this database predates the metadata table."""
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    try:
+        with engine.connect() as conn:
+            value = conn.execute(
+                text(f"SELECT value FROM {METADATA_TABLE} WHERE key = :key"), {"key": STATS_KEY}
+            ).scalar()
+    except OperationalError:
+        return None
+    return json.loads(value) if value else None
@@ -0,0 +1,55 @@
+import json
+import os
+from typing import Sequence
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+TREE_FILTER_HEIGHT = int(os.getenv("TREE_FILTER_HEIGHT", "600"))
+
+_COMPONENT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "components", "tree_filter")
+_tree_filter = components.declare_component("tree_filter", path=_COMPONENT_DIR)
+
+
+def tree_payload(snapshot, with_code: bool = True) -> str:
+    """
+    The whole tree as one compact JSON string: parallel pre-order arrays of level,
+    code and name. Parents and children are implied by pre-order plus level, so the
+    browser rebuilds them in one pass.
+    """
+    return json.dumps({
+        "taxonomy": snapshot.taxonomy,
+        "version": snapshot.version,
+        "level_names": list(snapshot.level_names),
+        "with_code": with_code,
+        "level": snapshot.levels.tolist(),
+        "code": list(snapshot.codes),
+        "name": list(snapshot.names),
+    }, separators=(",", ":"), ensure_ascii=False)
+
+
+def tree_filter(trees: Sequence[tuple], key: str, height: int = TREE_FILTER_HEIGHT,
+                placeholder: str = "Filter by name or code") -> None:
+    """
+    Browse and filter whole trees in the browser, without reruns.
+
+    ``trees`` is a sequence of (label, version, payload) with payloads from tree_payload.
+    Each payload crosses the wire once per session and data version: later reruns send
+    only the version and the component reuses its copy (kept in sessionStorage across
+    remounts). A component that lost its copy asks for it back and the next rerun resends it.
+    """
+    sent = st.session_state.setdefault(f"{key}_sent", set())
+    # The component posts {"missing": [ids], "nonce": ...} when it lost a payload; that
+    # value arrives with this rerun, so just resend those payloads now
+    request = st.session_state.get(key)
+    if request and request.get("nonce") != st.session_state.get(f"{key}_nonce"):
+        st.session_state[f"{key}_nonce"] = request.get("nonce")
+        sent.difference_update(request.get("missing", []))
+
+    args = []
+    for label, version, payload in trees:
+        tree_id = f"{label}:{version}"
+        args.append({"id": tree_id, "label": label, "payload": None if tree_id in sent else payload})
+        sent.add(tree_id)
+
+    _tree_filter(trees=args, height=height, placeholder=placeholder, key=key, default=None)
@@ -0,0 +1,84 @@
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+ROOT_ID = "root_GICS"
+LEVEL_STYLE = (  # (id prefix, node size, color) per GICS level
+    ("sector", 20, "#FF9B9B"),
+    ("ig", 15, "#4B4BFF"),
+    ("ind", 10, "#9B9BFF"),
+    ("sub", 5, "#DEDEDE"),
+)
+LEVEL_SEPARATION = 150
+NODE_SEPARATION = 150
+LAYOUTS = ("Hierarchical", "Force Directed")
+# networkx switches to a scipy-backed O(n²) solver above 500 nodes; larger trees get a radial layout
+FORCE_LAYOUT_MAX_NODES = 500
+
+
+class TreeGraph(NamedTuple):
+    """Plain node/edge dicts plus precomputed positions for every layout."""
+    nodes: List[dict]
+    edges: List[Tuple[str, str]]
+    positions: Dict[str, Dict[str, Tuple[float, float]]]
+
+
+def _hierarchical_positions(snapshot) -> Dict[str, Tuple[float, float]]:
+    """Tidy top-down layout: leaves get evenly spaced slots, parents sit over their children."""
+    n = len(snapshot)
+    x = np.zeros(n)
+    is_leaf = np.diff(snapshot.child_offsets) == 0
+    x[is_leaf] = np.arange(int(is_leaf.sum())) * NODE_SEPARATION
+    # Reverse pre-order visits every child before its parent
+    for node in range(n - 1, -1, -1):
+        if not is_leaf[node]:
+            x[node] = x[snapshot.children(node)].mean()
+    positions = {ROOT_ID: (float(x[snapshot.roots].mean()) if len(snapshot.roots) else 0.0, 0.0)}
+    for node in range(n):
+        positions[_node_id(snapshot, node)] = (float(x[node]), (int(snapshot.levels[node]) + 1) * float(LEVEL_SEPARATION))
+    return positions
+
+
+def _radial_positions(tidy: Dict[str, Tuple[float, float]]) -> Dict[str, Tuple[float, float]]:
+    """Wrap the tidy layout around the root: x becomes the angle, depth the radius. O(n)."""
+    xs = [x for x, _ in tidy.values()]
+    low, width = min(xs), (max(xs) - min(xs)) or 1.0
+    positions = {}
+    for node_id, (x, y) in tidy.items():
+        angle = 2 * np.pi * (x - low) / width * (1 - 1 / max(len(tidy), 2))
+        positions[node_id] = (float(y * np.cos(angle)), float(y * np.sin(angle)))
+    return positions
+
+
+def _force_positions(nodes: List[dict], edges: List[Tuple[str, str]]) -> Dict[str, Tuple[float, float]]:
+    import networkx as nx  # ~100 ms to import; only the graph view needs it
+
+    graph = nx.Graph()
+    graph.add_nodes_from(node["id"] for node in nodes)
+    graph.add_edges_from(edges)
+    layout = nx.spring_layout(graph, seed=42, scale=60 * len(nodes) ** 0.5)
+    return {node_id: (float(x), float(y)) for node_id, (x, y) in layout.items()}
+
+
+def _node_id(snapshot, node: int) -> str:
+    return f"{LEVEL_STYLE[snapshot.levels[node]][0]}_{snapshot.codes[node]}"
+
+
+def build_tree_graph(snapshot) -> TreeGraph:
+    """Nodes, edges and both layouts for the GICS tree, computed once per snapshot."""
+    nodes = [{"id": ROOT_ID, "label": "GICS", "size": 25, "color": "#FF4B4B"}]
+    edges = []
+    for node in range(len(snapshot)):
+        _, size, color = LEVEL_STYLE[snapshot.levels[node]]
+        node_id = _node_id(snapshot, node)
+        nodes.append({"id": node_id, "label": snapshot.names[node], "size": size, "color": color})
+        parent = snapshot.parents[node]
+        edges.append((_node_id(snapshot, parent) if parent >= 0 else ROOT_ID, node_id))
+
+    tidy = _hierarchical_positions(snapshot)
+    if len(nodes) <= FORCE_LAYOUT_MAX_NODES:
+        spread = _force_positions(nodes, edges)
+    else:
+        spread = _radial_positions(tidy)
+    positions = {"Hierarchical": tidy, "Force Directed": spread}
+    return TreeGraph(nodes, edges, positions)
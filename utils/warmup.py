@@ -0,0 +1,47 @@
+"""
+Background warm-up: build what the first search would otherwise pay for, off the request path.
+
+Startup only maps the snapshots; the substring, fuzzy and code indexes and the rapidfuzz
+extension are built here on a daemon thread. Everything is cached per snapshot by its own
+module, so a search that arrives first simply builds (or waits on) the same object.
+"""
+import threading
+from typing import Callable, Iterable
+
+from utils.profiling import span
+
+WarmupSource = Callable[[], Iterable]  # returns the snapshots to warm
+
+
+def warm_snapshots(snapshots: Iterable) -> None:
+    """Build the per-snapshot search indexes and import the fuzzy matcher."""
+    from utils.code_index import get_code_index
+    from utils.fuzzy_index import get_fuzzy_index
+    from utils.incremental_search import get_substring_index
+
+    with span("warmup.rapidfuzz"):
+        import rapidfuzz.process  # noqa: F401  (compiled extension, ~10 ms on first import)
+    for snapshot in snapshots:
+        with span("warmup.indexes"):
+            get_substring_index(snapshot)
+            get_fuzzy_index(snapshot)
+            get_code_index(snapshot)
+
+
+def warm_snapshot(snapshot) -> None:
+    """SnapshotCache ``prepare`` hook: a reloaded snapshot goes live with its indexes already built."""
+    warm_snapshots([snapshot])
+
+
+def start_warmup(source: WarmupSource) -> threading.Thread:
+    """Run warm_snapshots(source()) on a daemon thread; failures are printed, never raised."""
+
+    def run():
+        try:
+            warm_snapshots(source())
+        except Exception as e:  # a failed warm-up only means the first search builds instead
+            print(f"⚠️ Warm-up failed: {e}")
+
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread